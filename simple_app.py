@@ -1,8 +1,7 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-from src.nfl_player_data import NFLPlayerData
-from src.player_similarity import PlayerSimilarityAnalyzer
+from src.data_watcher import DataWatcher
 
 # Page configuration
 st.set_page_config(
@@ -165,12 +164,16 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 @st.cache_resource
+def get_data_watcher():
+    """Load the data once per process and keep it current with the processed data file"""
+    # Built state is reused from the startup snapshot until the processed data changes;
+    # without one, percentile tables are built per position as they are first needed
+    return DataWatcher(persist_expanded=True, lazy_percentiles=True).start()
+
 def load_data():
-    """Load player data and similarity analyzer"""
+    """Load player data and similarity analyzer (the pair current when this run started)"""
     try:
-        player_data = NFLPlayerData()
-        analyzer = PlayerSimilarityAnalyzer(player_data)
-        return player_data, analyzer
+        return get_data_watcher().current()
     except Exception as e:
         st.error(f"Failed to load data: {str(e)}")
         return None, None
@@ -181,7 +184,7 @@ def format_player_name(name):
         return "Unknown Player"
     return name.title()
 
-def display_player_card(player_data, title="Player", player_name=None, card_type="default", player_metadata=None, analyzer=None):
+def display_player_card(player_data, title="Player", player_name=None, card_type="default", player_metadata=None, analyzer=None, years=None):
     """Display a player card with stats and percentiles"""
     # Handle different data structures
     if player_name is None:
@@ -214,8 +217,8 @@ def display_player_card(player_data, title="Player", player_name=None, card_type
     ras_score = None
     if analyzer and player_name != 'Unknown Player':
         try:
-            percentiles = analyzer.get_player_percentiles(player_name, position)
-            ras_score = analyzer.get_ras_score(player_name, position)
+            percentiles = analyzer.get_player_percentiles(player_name, position, years)
+            ras_score = analyzer.get_ras_score(player_name, position, years)
         except:
             pass
     
@@ -320,21 +323,17 @@ def main():
     st.markdown('<div class="search-container">', unsafe_allow_html=True)
     st.markdown("### 🔍 Search for a Player")
     
-    # Get all player names for search
-    all_players = player_data.get_player_names()
-    all_players.sort()
-    
     # Single autocomplete search bar
     search_term = st.text_input("Search players:", placeholder="Type a player name (e.g., Caleb Williams, Travis Hunter...)")
     
-    # Filter players based on search term
-    if search_term:
-        filtered_players = [name for name in all_players if search_term.lower() in name.lower()]
-        # Limit results for better performance
-        if len(filtered_players) > 50:
-            filtered_players = filtered_players[:50]
-    else:
-        filtered_players = all_players[:20]  # Show first 20 players when no search term
+    # Look up matches in the prebuilt search index (first 20 players when no search term)
+    filtered_players = player_data.search_players(search_term, limit=50 if search_term else 20)
+    
+    # Fall back to close spellings when nothing contains the search term
+    if search_term and not filtered_players:
+        filtered_players = player_data.fuzzy_search_players(search_term)
+        if filtered_players:
+            st.caption("No exact matches — showing close matches")
     
     # Player selection from filtered results
     if filtered_players:
@@ -343,6 +342,14 @@ def main():
         selected_player = None
         st.warning("No players found matching your search.")
     
+    # Era to compare against (percentiles and similar players are ranked within it), over the loaded draft classes
+    first_year = int(player_data.players['draft_year'].min())
+    last_year = int(player_data.players['draft_year'].max())
+    era_years = None
+    if first_year < last_year:
+        era = st.slider("Compare against draft classes:", first_year, last_year, (first_year, last_year))
+        era_years = None if era == (first_year, last_year) else era
+    
     st.markdown("</div>", unsafe_allow_html=True)
     
     # Display selected player and similar players
@@ -355,7 +362,8 @@ def main():
                 similar_players = analyzer.find_similar_players(
                     selected_player, 
                     num_similar=2, 
-                    same_position_only=True
+                    same_position_only=True,
+                    years=era_years
                 )
             
             if similar_players:
@@ -368,7 +376,7 @@ def main():
                 # Selected player in left column
                 with col1:
                     st.markdown('<div class="similarity-score">Selected Player</div>', unsafe_allow_html=True)
-                    display_player_card(player_stats, "Selected", selected_player, "selected", analyzer=analyzer)
+                    display_player_card(player_stats, "Selected", selected_player, "selected", analyzer=analyzer, years=era_years)
                 
                 # Similar players in right columns
                 for i, similar in enumerate(similar_players):
@@ -387,7 +395,7 @@ def main():
                             'draft_year': similar.get('draft_year', 'N/A'),
                             'draft_info': similar.get('Drafted (tm/rnd/yr)', '')
                         }
-                        display_player_card(similar['stats'], f"Similar Player {i+1}", similar['name'], "similar", player_metadata, analyzer=analyzer)
+                        display_player_card(similar['stats'], f"Similar Player {i+1}", similar['name'], "similar", player_metadata, analyzer=analyzer, years=era_years)
             else:
                 st.warning("No similar players found with the current criteria.")
         else:
@@ -406,7 +414,7 @@ def main():
             filter_position = st.selectbox("Position:", positions)
             
             # Draft year filter
-            years = ['All Years'] + [str(year) for year in range(2025, 1999, -1)]
+            years = ['All Years'] + [str(year) for year in range(last_year, first_year - 1, -1)]
             filter_year = st.selectbox("Draft Year:", years)
         
         with filter_col2:
@@ -429,65 +437,41 @@ def main():
         
         # Apply advanced filters
         if st.button("🔍 Apply Advanced Filters"):
-            # Filter players based on advanced criteria
-            filtered_players = []
-            
-            for player_name in all_players:
-                stats = player_data.get_player_stats(player_name)
-                if not stats:
-                    continue
-                
-                # Apply filters
-                if filter_position != 'All Positions' and stats.get('position') != filter_position:
-                    continue
-                
-                if filter_year != 'All Years' and str(stats.get('draft_year', '')) != filter_year:
-                    continue
-                
-                height = stats.get('height')
-                if height and (height < height_range[0] or height > height_range[1]):
-                    continue
-                
-                weight = stats.get('weight')
-                if weight and (weight < weight_range[0] or weight > weight_range[1]):
-                    continue
-                
-                forty = stats.get('forty_yard')
-                if forty and (forty < forty_range[0] or forty > forty_range[1]):
-                    continue
-                
-                filtered_players.append((player_name, stats))
-            
-            # Sort results
-            if sort_by == 'Name':
-                filtered_players.sort(key=lambda x: x[0])
-            elif sort_by == 'Draft Year':
-                filtered_players.sort(key=lambda x: x[1].get('draft_year', 0))
-            elif sort_by == 'Height':
-                filtered_players.sort(key=lambda x: x[1].get('height', 0))
-            elif sort_by == 'Weight':
-                filtered_players.sort(key=lambda x: x[1].get('weight', 0))
-            elif sort_by == '40-Yard Dash':
-                filtered_players.sort(key=lambda x: x[1].get('forty_yard', 10))
-            elif sort_by == 'Vertical Jump':
-                filtered_players.sort(key=lambda x: x[1].get('vertical_jump', 0))
-            
-            if sort_direction == 'Descending':
-                filtered_players.reverse()
+            # Filter and sort players based on advanced criteria
+            sort_columns = {
+                'Name': 'name',
+                'Draft Year': 'draft_year',
+                'Height': 'height',
+                'Weight': 'weight',
+                '40-Yard Dash': 'forty_yard',
+                'Vertical Jump': 'vertical_jump'
+            }
+            matches = player_data.query_players(
+                position=None if filter_position == 'All Positions' else filter_position,
+                draft_year=None if filter_year == 'All Years' else int(filter_year),
+                ranges={
+                    'height': height_range,
+                    'weight': weight_range,
+                    'forty_yard': forty_range
+                },
+                sort_by=sort_columns[sort_by],
+                ascending=sort_direction == 'Ascending'
+            )
+            filtered_players = [(stats['name'], stats) for stats in matches.iloc[:30].to_dict('records')]
             
             # Display filtered results
             if filtered_players:
                 st.markdown("### 📊 Filtered Results")
-                st.markdown(f"Found **{len(filtered_players)}** players matching your criteria.")
+                st.markdown(f"Found **{len(matches)}** players matching your criteria.")
                 
                 # Display results in a grid
                 cols = st.columns(3)
-                for i, (player_name, stats) in enumerate(filtered_players[:30]):  # Limit to 30 results
+                for i, (player_name, stats) in enumerate(filtered_players):  # Limited to 30 results
                     with cols[i % 3]:
                         if st.button(f"📋 {player_name}", key=f"filtered_{i}"):
                             st.session_state.selected_player = player_name
                             st.rerun()
-                        display_player_card(stats, "Player", player_name, analyzer=analyzer)
+                        display_player_card(stats, "Player", player_name, analyzer=analyzer, years=era_years)
             else:
                 st.warning("No players found matching your advanced filter criteria.")
     
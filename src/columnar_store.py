@@ -0,0 +1,482 @@
+import pandas as pd
+import numpy as np
+from typing import Dict, Iterator, Optional
+import hashlib
+import json
+import os
+import shutil
+
+# Bump when the on-disk layout changes; older stores are then ignored
+STORE_VERSION = 1
+SCHEMA_FILE = "schema.json"
+
+# Elements copied per step when finalizing column files, to keep memory flat
+COPY_BLOCK = 1 << 20
+
+# Text columns with more distinct values than this are stored as plain UTF-8 instead of a dictionary
+MAX_DICTIONARY_SIZE = 1 << 16
+
+
+def store_path_for(csv_file: str) -> str:
+    """Location of the columnar store that sits next to a processed CSV file"""
+    return os.path.splitext(csv_file)[0] + "_columns"
+
+
+def _file_hash(path: str) -> str:
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_signature(path: str) -> Dict:
+    """Size, mtime and SHA-256 of a file a store is built alongside (e.g. the processed CSV)"""
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': _file_hash(path)}
+
+
+def matches_source(signature: Optional[Dict], path: str) -> bool:
+    """Whether a file is unchanged since its signature was taken (same stats, or else same content)"""
+    if not signature:
+        return False
+    stat = os.stat(path)
+    if (signature.get('size'), signature.get('mtime_ns')) == (stat.st_size, stat.st_mtime_ns):
+        return True
+    return signature.get('size') == stat.st_size and signature.get('sha256') == _file_hash(path)
+
+
+def update_store_metadata(store_dir: str, metadata: Dict):
+    """Add values to a finished store's metadata, replacing its schema file atomically"""
+    schema_file = os.path.join(store_dir, SCHEMA_FILE)
+    with open(schema_file) as f:
+        schema = json.load(f)
+    schema['metadata'].update(metadata)
+    with open(schema_file + ".tmp", 'w') as f:
+        json.dump(schema, f, indent=2)
+    os.replace(schema_file + ".tmp", schema_file)
+
+
+def save_columnar(df: pd.DataFrame, store_dir: str, metadata: Optional[Dict] = None):
+    """
+    Save a DataFrame as a directory of .npy column files
+
+    Numeric columns are written with their own dtype. Text columns are
+    dictionary-encoded: an int32 code array plus a JSON list of the distinct
+    values, with -1 marking missing values. Categorical columns use the same
+    encoding but are loaded back as categoricals.
+
+    Args:
+        df: Data to save (the index is not stored)
+        store_dir: Directory to write; it is replaced atomically
+        metadata: Extra JSON-serializable values to keep in the schema
+    """
+    writer = ColumnarStoreWriter(store_dir)
+    writer.append(df)
+    writer.close(metadata)
+
+
+class ColumnarStoreWriter:
+    """
+    Build a columnar store by appending DataFrame chunks.
+
+    Each column is streamed to raw files as chunks arrive, so memory use is
+    bounded by the chunk size. Text dictionaries are capped too: a text column
+    that outgrows max_dictionary_size distinct values (e.g. names in a huge
+    pro-day export) switches to plain UTF-8 bytes plus row offsets.
+    A column that first shows up in a later chunk is backfilled with missing
+    values, which gives the same column order as pd.concat of the chunks.
+    close() turns the raw files into .npy files and swaps the store into place.
+    """
+
+    def __init__(self, store_dir: str, column_types: Optional[Dict[str, str]] = None,
+                 default_type: Optional[str] = None, max_dictionary_size: int = MAX_DICTIONARY_SIZE):
+        """
+        Args:
+            store_dir: Directory to write
+            column_types: Fixed types for some columns: a numpy dtype name, 'string' or 'category'
+            default_type: Type for the other columns (None infers it from the first chunk)
+            max_dictionary_size: Distinct values a text column may collect before it is stored plain
+        """
+        self.store_dir = store_dir
+        self.column_types = column_types or {}
+        self.default_type = default_type
+        self.max_dictionary_size = max_dictionary_size
+        self.rows = 0
+        self.columns = {}
+
+        self.tmp_dir = store_dir + ".tmp"
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+        os.makedirs(self.tmp_dir)
+
+    @classmethod
+    def resume(cls, store_dir: str, rows: int,
+               max_dictionary_size: int = MAX_DICTIONARY_SIZE) -> 'ColumnarStoreWriter':
+        """
+        A writer that continues from the first `rows` rows of an existing store
+
+        The kept rows are copied over as they are stored, without decoding them,
+        so only the rows appended afterwards cost any encoding. Text dictionaries
+        are cut back to the values the kept rows use (the first ones, as values
+        are numbered in order of appearance), so the finished store is the same
+        as one written from scratch. Categorical columns keep their categories.
+
+        Args:
+            store_dir: Existing store; it is replaced when the writer is closed
+            rows: Leading rows to keep
+            max_dictionary_size: As for a new writer
+        """
+        schema = read_store_schema(store_dir)
+        if schema is None or not 0 < rows <= schema['rows']:
+            raise ValueError(f"Cannot resume {store_dir} after {rows} rows")
+        writer = cls(store_dir, max_dictionary_size=max_dictionary_size)
+
+        for entry, values, categories in _open_columns(store_dir, schema, mmap=True):
+            column = {'name': entry['name'], 'id': f"{len(writer.columns):03d}", 'kind': entry['kind']}
+            if entry.get('encoding') == 'plain':
+                offsets, missing, text = values
+                column.update({'encoding': 'plain', 'bytes': int(offsets[rows])})
+                column['handle'] = open(writer._raw_path(column, ".utf8"), 'wb')
+                column['offsets'] = open(writer._raw_path(column, ".offsets"), 'wb')
+                column['missing'] = open(writer._raw_path(column, ".missing"), 'wb')
+                for handle, kept in ((column['handle'], text[:column['bytes']]),
+                                     (column['offsets'], offsets[:rows + 1]), (column['missing'], missing[:rows])):
+                    _copy_blocks(kept, handle)
+            else:
+                kept = values[:rows]
+                if entry['kind'] == 'numeric':
+                    column['dtype'] = entry['dtype']
+                    column['handle'] = open(writer._raw_path(column, ""), 'wb')
+                else:
+                    if entry['kind'] == 'string':
+                        # Drop the trailing NaN slot and the values only later rows used
+                        categories = categories[:int(kept.max(initial=-1)) + 1]
+                    column.update({'encoding': 'dictionary', 'dtype': entry['dtype'],
+                                   'dictionary': {value: code for code, value in enumerate(categories)}})
+                    column['handle'] = open(writer._raw_path(column, ".codes"), 'wb')
+                _copy_blocks(kept, column['handle'])
+            writer.columns[entry['name']] = column
+
+        writer.rows = rows
+        return writer
+
+    def _column_type(self, name: str, series: pd.Series) -> str:
+        """Storage type for a column, from the fixed types or the first chunk it appears in"""
+        if name in self.column_types:
+            return self.column_types[name]
+        if self.default_type is not None:
+            return self.default_type
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            return 'category'
+        if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+            if pd.api.types.is_extension_array_dtype(series.dtype):
+                # Nullable integer/float columns are stored as floats with NaN
+                return 'float64'
+            return series.dtype.name
+        return 'string'
+
+    def _raw_path(self, column: Dict, suffix: str) -> str:
+        """Path of one of a column's raw files in the temporary directory"""
+        return os.path.join(self.tmp_dir, column['id'] + suffix + ".raw")
+
+    def _add_column(self, name, series: pd.Series):
+        """Start a new column file, backfilled with missing values for the rows already written"""
+        column_type = self._column_type(name, series)
+        column = {'name': name, 'id': f"{len(self.columns):03d}"}
+        if column_type in ('string', 'category'):
+            column.update({'kind': column_type, 'encoding': 'dictionary', 'dtype': '<i4', 'dictionary': {}})
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                # Keep the declared category order, including unused categories
+                column['dictionary'] = {value: code for code, value in enumerate(series.cat.categories)}
+            column['handle'] = open(self._raw_path(column, ".codes"), 'wb')
+        else:
+            column.update({'kind': 'numeric', 'dtype': np.dtype(column_type).str})
+            column['handle'] = open(self._raw_path(column, ""), 'wb')
+
+        self.columns[name] = column
+        self._write_missing(column, self.rows)
+
+    def _write_missing(self, column: Dict, count: int):
+        """Append missing values to a column"""
+        if count <= 0:
+            return
+        if column.get('encoding') == 'plain':
+            while count > 0:
+                block = min(count, COPY_BLOCK)
+                self._write_plain(column, np.full(block, None, dtype=object))
+                count -= block
+            return
+        if column['kind'] == 'numeric':
+            if np.dtype(column['dtype']).kind != 'f':
+                raise ValueError(f"Column '{column['name']}' is missing values but is stored as {column['dtype']}")
+            missing = np.nan
+        else:
+            missing = -1
+        while count > 0:
+            block = min(count, COPY_BLOCK)
+            np.full(block, missing, dtype=column['dtype']).tofile(column['handle'])
+            count -= block
+
+    def _encode(self, column: Dict, series: pd.Series) -> np.ndarray:
+        """Dictionary-encode a text or categorical chunk with codes shared across chunks"""
+        codes, uniques = pd.factorize(series)
+        dictionary = column['dictionary']
+        for value in uniques:
+            if value not in dictionary:
+                dictionary[value] = len(dictionary)
+        # Chunk codes -> store codes; the extra slot is picked up by missing values (code -1)
+        store_codes = np.array([dictionary[value] for value in uniques] + [-1], dtype=np.int32)
+        return store_codes.take(codes)
+
+    def _write_plain(self, column: Dict, values: np.ndarray):
+        """Append text as UTF-8 bytes, their end offsets and a missing-value mask"""
+        missing = pd.isna(values)
+        encoded = [b'' if is_missing else str(value).encode('utf-8')
+                   for value, is_missing in zip(values, missing)]
+        ends = column['bytes'] + np.cumsum([len(value) for value in encoded], dtype=np.int64)
+        column['handle'].write(b''.join(encoded))
+        ends.tofile(column['offsets'])
+        np.asarray(missing, dtype=np.bool_).tofile(column['missing'])
+        if len(ends):
+            column['bytes'] = int(ends[-1])
+
+    def _switch_to_plain(self, column: Dict):
+        """Re-encode a text column whose dictionary grew too large as plain UTF-8"""
+        column['handle'].close()
+        codes_file = self._raw_path(column, ".codes")
+        values = np.array(list(column['dictionary']) + [None], dtype=object)
+
+        column.update({'encoding': 'plain', 'bytes': 0})
+        del column['dictionary'], column['dtype']
+        column['handle'] = open(self._raw_path(column, ".utf8"), 'wb')
+        column['offsets'] = open(self._raw_path(column, ".offsets"), 'wb')
+        column['missing'] = open(self._raw_path(column, ".missing"), 'wb')
+        # Row i spans bytes offsets[i]:offsets[i + 1]
+        np.zeros(1, dtype=np.int64).tofile(column['offsets'])
+
+        if self.rows:
+            codes = np.memmap(codes_file, dtype=np.int32, mode='r', shape=(self.rows,))
+            for start in range(0, self.rows, COPY_BLOCK):
+                self._write_plain(column, values.take(codes[start:start + COPY_BLOCK]))
+            del codes
+        os.remove(codes_file)
+
+    def append(self, df: pd.DataFrame):
+        """Append a chunk of rows (the index is not stored)"""
+        for i, name in enumerate(df.columns):
+            if name not in self.columns:
+                self._add_column(name, df.iloc[:, i])
+
+        present = set(df.columns)
+        for name, column in self.columns.items():
+            if name not in present:
+                self._write_missing(column, len(df))
+                continue
+
+            series = df[name]
+            if column['kind'] == 'numeric':
+                if column['dtype'] != series.dtype.str:
+                    series = pd.to_numeric(series, errors='coerce')
+                values = series.to_numpy(dtype=column['dtype'], na_value=np.nan)
+                np.ascontiguousarray(values).tofile(column['handle'])
+            elif column['encoding'] == 'plain':
+                self._write_plain(column, series.to_numpy(dtype=object))
+            else:
+                self._encode(column, series).tofile(column['handle'])
+
+        self.rows += len(df)
+
+        # A dictionary only pays off while values repeat
+        for column in self.columns.values():
+            if (column['kind'] == 'string' and column['encoding'] == 'dictionary'
+                    and len(column['dictionary']) > self.max_dictionary_size):
+                self._switch_to_plain(column)
+
+    def truncate(self, rows: int):
+        """Drop everything appended after the first `rows` rows (e.g. a file that failed halfway)"""
+        rows = min(self.rows, rows)
+        for column in self.columns.values():
+            column['handle'].flush()
+            if column.get('encoding') == 'plain':
+                for handle, size in ((column['offsets'], 8 * (rows + 1)), (column['missing'], rows)):
+                    handle.flush()
+                    handle.truncate(size)
+                    handle.seek(0, os.SEEK_END)
+                # The offset at the cut is where the kept text ends
+                with open(self._raw_path(column, ".offsets"), 'rb') as f:
+                    f.seek(8 * rows)
+                    column['bytes'] = int(np.frombuffer(f.read(8), dtype=np.int64)[0])
+                column['handle'].truncate(column['bytes'])
+            else:
+                column['handle'].truncate(rows * np.dtype(column['dtype']).itemsize)
+            column['handle'].seek(0, os.SEEK_END)
+        self.rows = rows
+
+    def _finish_array(self, raw_file: str, npy_file: str, dtype: str, length: int):
+        """Give a raw array file an .npy header, copying block by block"""
+        out = np.lib.format.open_memmap(npy_file, mode='w+', dtype=np.dtype(dtype), shape=(length,))
+        if length:
+            raw = np.memmap(raw_file, dtype=np.dtype(dtype), mode='r', shape=(length,))
+            for start in range(0, length, COPY_BLOCK):
+                out[start:start + COPY_BLOCK] = raw[start:start + COPY_BLOCK]
+            del raw
+        out.flush()
+        del out
+        os.remove(raw_file)
+
+    def close(self, metadata: Optional[Dict] = None):
+        """Finish the column files and atomically replace the store directory"""
+        columns = []
+        for column in self.columns.values():
+            column['handle'].close()
+            name = column['id']
+            entry = {'name': column['name'], 'kind': column['kind']}
+
+            if column['kind'] == 'numeric':
+                entry.update({'file': f"{name}.npy", 'dtype': column['dtype']})
+                self._finish_array(self._raw_path(column, ""), os.path.join(self.tmp_dir, entry['file']),
+                                   column['dtype'], self.rows)
+            elif column['encoding'] == 'plain':
+                column['offsets'].close()
+                column['missing'].close()
+                entry.update({'encoding': 'plain', 'file': f"{name}.utf8",
+                              'offsets_file': f"{name}.offsets.npy", 'missing_file': f"{name}.missing.npy"})
+                os.replace(self._raw_path(column, ".utf8"), os.path.join(self.tmp_dir, entry['file']))
+                self._finish_array(self._raw_path(column, ".offsets"),
+                                   os.path.join(self.tmp_dir, entry['offsets_file']), '<i8', self.rows + 1)
+                self._finish_array(self._raw_path(column, ".missing"),
+                                   os.path.join(self.tmp_dir, entry['missing_file']), '|b1', self.rows)
+            else:
+                entry.update({'encoding': 'dictionary', 'file': f"{name}.codes.npy", 'dtype': column['dtype'],
+                              'categories_file': f"{name}.categories.json"})
+                self._finish_array(self._raw_path(column, ".codes"), os.path.join(self.tmp_dir, entry['file']),
+                                   column['dtype'], self.rows)
+                with open(os.path.join(self.tmp_dir, entry['categories_file']), 'w') as f:
+                    json.dump(list(column['dictionary']), f)
+            columns.append(entry)
+
+        schema = {
+            'version': STORE_VERSION,
+            'rows': self.rows,
+            'columns': columns,
+            'metadata': metadata or {}
+        }
+        with open(os.path.join(self.tmp_dir, SCHEMA_FILE), 'w') as f:
+            json.dump(schema, f, indent=2)
+
+        # Swap the finished directory into place
+        old_dir = self.store_dir + ".old"
+        shutil.rmtree(old_dir, ignore_errors=True)
+        if os.path.exists(self.store_dir):
+            os.replace(self.store_dir, old_dir)
+        os.replace(self.tmp_dir, self.store_dir)
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def _copy_blocks(values: np.ndarray, handle):
+    """Write an array (e.g. a memory-mapped column) to a raw file block by block"""
+    for start in range(0, len(values), COPY_BLOCK):
+        np.ascontiguousarray(values[start:start + COPY_BLOCK]).tofile(handle)
+
+
+def read_store_schema(store_dir: str) -> Optional[Dict]:
+    """Read a store's schema, or None if the store is missing or from another version"""
+    schema_file = os.path.join(store_dir, SCHEMA_FILE)
+    if not os.path.exists(schema_file):
+        return None
+    try:
+        with open(schema_file) as f:
+            schema = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if schema.get('version') != STORE_VERSION:
+        return None
+    return schema
+
+
+def load_columnar(store_dir: str, mmap: bool = True) -> pd.DataFrame:
+    """
+    Load a DataFrame saved with save_columnar
+
+    Args:
+        store_dir: Store directory
+        mmap: Memory-map the numeric columns instead of reading them into memory
+
+    Returns:
+        DataFrame with the stored columns and a fresh RangeIndex
+    """
+    schema = read_store_schema(store_dir)
+    if schema is None:
+        raise FileNotFoundError(f"No columnar store found at {store_dir}")
+    columns = _open_columns(store_dir, schema, mmap)
+    return _decode_rows(columns, 0, schema['rows'])
+
+
+def iter_columnar(store_dir: str, chunksize: int) -> Iterator[pd.DataFrame]:
+    """Load a columnar store as a sequence of DataFrames of at most `chunksize` rows"""
+    schema = read_store_schema(store_dir)
+    if schema is None:
+        raise FileNotFoundError(f"No columnar store found at {store_dir}")
+    columns = _open_columns(store_dir, schema, mmap=True)
+    for start in range(0, schema['rows'], chunksize):
+        yield _decode_rows(columns, start, min(start + chunksize, schema['rows']))
+
+
+def _open_columns(store_dir: str, schema: Dict, mmap: bool) -> list:
+    """Open every column file of a store along with its dictionary"""
+    mmap_mode = 'r' if mmap else None
+    columns = []
+    for column in schema['columns']:
+        path = os.path.join(store_dir, column['file'])
+        if column.get('encoding') == 'plain':
+            offsets = np.load(os.path.join(store_dir, column['offsets_file']), mmap_mode=mmap_mode)
+            missing = np.load(os.path.join(store_dir, column['missing_file']), mmap_mode=mmap_mode)
+            # np.memmap refuses empty files
+            text = np.memmap(path, dtype=np.uint8, mode='r') if os.path.getsize(path) else np.zeros(0, np.uint8)
+            columns.append((column, (offsets, missing, text), None))
+            continue
+
+        values = np.load(path, mmap_mode=mmap_mode)
+        categories = None
+        if column['kind'] != 'numeric':
+            with open(os.path.join(store_dir, column['categories_file'])) as f:
+                categories = json.load(f)
+            if column['kind'] == 'string':
+                # Text is decoded with take(); the extra slot is picked up by missing values (code -1)
+                categories = np.array(categories + [np.nan], dtype=object)
+        columns.append((column, values, categories))
+    return columns
+
+
+def _decode_plain(offsets: np.ndarray, missing: np.ndarray, text: np.ndarray, start: int, stop: int) -> np.ndarray:
+    """Decode rows [start, stop) of a plain UTF-8 text column"""
+    first, last = int(offsets[start]), int(offsets[stop])
+    raw = text[first:last].tobytes()
+    bounds = (np.asarray(offsets[start:stop + 1]) - first).tolist()
+    values = np.array([raw[begin:end].decode('utf-8') for begin, end in zip(bounds[:-1], bounds[1:])]
+                      + [np.nan], dtype=object)
+    # Point missing rows at the trailing NaN slot
+    positions = np.arange(stop - start)
+    positions[np.asarray(missing[start:stop])] = stop - start
+    return values.take(positions)
+
+
+def _decode_rows(columns: list, start: int, stop: int) -> pd.DataFrame:
+    """Build a DataFrame from rows [start, stop) of opened columns"""
+    data = {}
+    for column, values, categories in columns:
+        if column.get('encoding') == 'plain':
+            data[column['name']] = _decode_plain(*values, start, stop)
+            continue
+
+        # Plain ndarray view so pandas doesn't carry the memmap subclass around
+        values = values[start:stop].view(np.ndarray)
+        if column['kind'] == 'numeric':
+            data[column['name']] = values
+        elif column['kind'] == 'category':
+            data[column['name']] = pd.Categorical.from_codes(values, categories)
+        else:
+            data[column['name']] = categories.take(values)
+
+    return pd.DataFrame(data, copy=False)
@@ -2,13 +2,122 @@ import pandas as pd
 import numpy as np
 import os
 import re
+import json
+import hashlib
 from typing import Dict, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
 import warnings
+from .columnar_store import (ColumnarStoreWriter, save_columnar, load_columnar, iter_columnar,
+                             read_store_schema, store_path_for, source_signature, matches_source,
+                             update_store_metadata)
 warnings.filterwarnings('ignore')
 
+# Excel turns heights like "5-11" into dates ("11-May"); the month carries the feet
+MONTH_TO_FEET = {
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+    'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12
+}
+
+# Position mappings
+POSITION_MAP = {
+    'QB': 'QB', 'QUARTERBACK': 'QB',
+    'RB': 'RB', 'RUNNING BACK': 'RB', 'HB': 'RB', 'TB': 'RB',
+    'WR': 'WR', 'WIDE RECEIVER': 'WR',
+    'TE': 'TE', 'TIGHT END': 'TE',
+    'OT': 'OT', 'OFFENSIVE TACKLE': 'OT', 'T': 'OT',
+    'OG': 'OG', 'OFFENSIVE GUARD': 'OG', 'G': 'OG',
+    'C': 'C', 'CENTER': 'C',
+    'DE': 'EDGE', 'DEFENSIVE END': 'EDGE', 'EDGE': 'EDGE',
+    'DT': 'DT', 'DEFENSIVE TACKLE': 'DT', 'NT': 'DT',
+    'LB': 'LB', 'LINEBACKER': 'LB', 'ILB': 'LB', 'OLB': 'LB',
+    'CB': 'CB', 'CORNERBACK': 'CB',
+    'S': 'S', 'SAFETY': 'S', 'FS': 'S', 'SS': 'S', 'SAF': 'S',
+    'K': 'K', 'KICKER': 'K',
+    'P': 'P', 'PUNTER': 'P'
+}
+
+# Patterns shared by the per-value and per-column cleaners
+NUMERIC_HEIGHT_PATTERN = r'[\d.]*\d[\d.]*'
+FEET_INCHES_PATTERN = r'(\d+)[\'\-](\d+)'
+EXCEL_HEIGHT_PATTERN = r'(\d+)-([A-Za-z]+)'
+TIME_PATTERN = r'\d+\.\d+'
+
+# Combine measurements produced by _clean_data
+COMBINE_STATS = ['height', 'weight', 'forty_yard', 'vertical_jump',
+                 'broad_jump', 'bench_press', 'shuttle', 'cone']
+
+# Pro Football Reference export columns and their standard names
+PFR_COLUMN_MAPPING = {
+    'Player': 'name',
+    'Pos': 'position',
+    'School': 'college',
+    'Ht': 'height',
+    'Wt': 'weight',
+    '40yd': 'forty_yard',
+    'Vertical': 'vertical_jump',
+    'Bench': 'bench_press',
+    'Broad Jump': 'broad_jump',
+    '3Cone': 'cone',
+    'Shuttle': 'shuttle'
+}
+HEADER_SEPARATOR_PATTERN = re.compile(r'[^a-z0-9]+')
+
+# Strategies accepted by handle_missing_data
+IMPUTATION_STRATEGIES = ('mean', 'median', 'year_window')
+
+# Names stay strings in the compact schema; Arrow-backed when pyarrow is installed
+try:
+    import pyarrow  # noqa: F401
+    _NAME_STORAGE = 'pyarrow'
+except ImportError:
+    _NAME_STORAGE = 'python'
+try:
+    # Missing values stay NaN, as in the pandas 3 default string dtype
+    COMPACT_NAME_DTYPE = pd.StringDtype(_NAME_STORAGE, na_value=np.nan)
+except TypeError:
+    COMPACT_NAME_DTYPE = pd.StringDtype(_NAME_STORAGE)
+
+
+def compact_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convert a player table to the compact schema
+    
+    Measurements become float32 and draft_year int16, names become
+    StringDtype, and every other text column (position, college, the
+    draft string, original_position, ...) becomes a categorical.
+    
+    Args:
+        df: Processed player data
+        
+    Returns:
+        The same rows with compact column dtypes
+    """
+    dtypes = {}
+    for column in df.columns:
+        series = df[column]
+        if column == 'name':
+            dtypes[column] = COMPACT_NAME_DTYPE
+        elif column in COMBINE_STATS:
+            dtypes[column] = 'float32'
+        elif column == 'draft_year':
+            # int16 has no missing value, so years with gaps stay floats
+            dtypes[column] = 'int16' if series.notna().all() else 'float32'
+        elif (pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series)) \
+                and not isinstance(series.dtype, pd.CategoricalDtype):
+            dtypes[column] = 'category'
+    return df.astype(dtypes) if dtypes else df
+
+
+# Bump when the processed output layout changes so old manifests trigger a rebuild
+MANIFEST_VERSION = 1
+# Fields every manifest entry needs for an incremental load
+MANIFEST_ENTRY_FIELDS = ('file', 'size', 'mtime_ns', 'sha256', 'rows')
+
 class NFLDataProcessor:
-    def __init__(self, data_folder: str = "data"):
+    def __init__(self, data_folder: str = "data", compact: bool = False):
         self.data_folder = data_folder
+        # Keep combined_data in the compact schema (see compact_dtypes)
+        self.compact = compact
         self.combined_data = None
         self.column_mappings = {
             # Name variations
@@ -36,98 +145,415 @@ class NFLDataProcessor:
             # 3-cone variations
             'cone': ['cone', '3_cone', 'three_cone', '3cone', 'three_cone_drill']
         }
+        
+        # Manifest entries (size, mtime, hash, rows) for the files behind combined_data, in row order
+        self.source_files = []
+        # Files added, changed or removed by the last load (every file after a full load)
+        self.changed_files = []
+        # Leading blocks of the previous output that the last incremental load kept as they were
+        self._kept_output = None
+        
+        # Resolved column mappings by header fingerprint and sniffed height column; per processor,
+        # since they depend on its column_mappings
+        self._schema_cache: Dict[Tuple[Tuple[str, ...], Optional[str]], Dict[str, str]] = {}
+        
+        # Lookup tables from raw cell values to cleaned values, filled as new values are seen
+        self._height_lookup = {}
+        self._time_lookup = {}
+        self._position_lookup = {}
     
-    def load_csv_files(self) -> pd.DataFrame:
-        """Load and combine all CSV files from the data folder"""
-        all_data = []
+    def load_csv_files(self, parallel: bool = False, max_workers: Optional[int] = None) -> pd.DataFrame:
+        """
+        Load and combine all CSV files from the data folder
+        
+        Args:
+            parallel: Read, standardize and clean each year file on its own worker process
+            max_workers: Number of worker processes in parallel mode (defaults to the CPU count)
+            
+        Returns:
+            Combined player data, ordered by year file
+        """
+        self.source_files = []
+        self.changed_files = []
+        self._kept_output = None
         
+        csv_files = self._find_csv_files()
+        if not csv_files:
+            return pd.DataFrame()
+        
+        if parallel:
+            all_data = self._load_files_parallel(csv_files, max_workers)
+        else:
+            all_data = self._load_files_serial(csv_files)
+        
+        if all_data:
+            self.combined_data = pd.concat(all_data, ignore_index=True)
+            if self.compact:
+                self.combined_data = compact_dtypes(self.combined_data)
+            print(f"🎉 Successfully combined {len(self.combined_data)} total players")
+            return self.combined_data
+        else:
+            print("❌ No data could be loaded")
+            return pd.DataFrame()
+    
+    def _find_csv_files(self) -> List[Tuple[str, int]]:
+        """Find the year files in the data folder, sorted by file name, with their draft years"""
         if not os.path.exists(self.data_folder):
             print(f"❌ Data folder '{self.data_folder}' not found!")
-            return pd.DataFrame()
+            return []
         
         # Look for files with pattern 20XXCombineData.csv or 20XXDraftClass.csv
         csv_files = [f for f in os.listdir(self.data_folder) if f.endswith('CombineData.csv') or f.endswith('DraftClass.csv')]
         
         if not csv_files:
             print(f"❌ No DraftClass CSV files found in '{self.data_folder}'")
-            return pd.DataFrame()
+            return []
         
         print(f"📁 Found {len(csv_files)} DraftClass CSV files to process...")
         
+        year_files = []
         for csv_file in sorted(csv_files):
-            file_path = os.path.join(self.data_folder, csv_file)
+            # Extract year from filename (e.g., "2024DraftClass.csv" or "2024CombineData.csv" -> 2024)
+            year_match = re.search(r'(\d{4})(?:DraftClass|CombineData)\.csv', csv_file)
+            if year_match:
+                year_files.append((csv_file, int(year_match.group(1))))
+            else:
+                print(f"⚠️  Could not extract year from filename: {csv_file}")
+        
+        return year_files
+    
+    def _read_csv_file(self, csv_file: str, year: int) -> pd.DataFrame:
+        """Read one year file and map it to the standard columns"""
+        df = pd.read_csv(os.path.join(self.data_folder, csv_file))
+        
+        # Standardize column names
+        df = self._standardize_columns(df)
+        
+        # Add draft year if not present
+        if 'draft_year' not in df.columns:
+            df['draft_year'] = year
+        
+        return df
+    
+    def _process_csv_file(self, csv_file: str, year: int) -> pd.DataFrame:
+        """Read, standardize and clean one year file (the unit of work for parallel mode)"""
+        return self._clean_data(self._read_csv_file(csv_file, year))
+    
+    def _load_files_serial(self, csv_files: List[Tuple[str, int]]) -> List[pd.DataFrame]:
+        """
+        Read every year file, then clean them together in one pass
+        
+        The column cleaners work once per distinct value, so one combined frame
+        costs little more than a single file. If cleaning the combined frame
+        fails, each file is cleaned on its own so the bad one is skipped and
+        reported, as in parallel mode.
+        """
+        raw_data = []
+        for csv_file, year in csv_files:
             try:
-                # Extract year from filename (e.g., "2024DraftClass.csv" or "2024CombineData.csv" -> 2024)
-                year_match = re.search(r'(\d{4})(?:DraftClass|CombineData)\.csv', csv_file)
-                if year_match:
-                    year = int(year_match.group(1))
-                else:
-                    print(f"⚠️  Could not extract year from filename: {csv_file}")
-                    continue
-                
-                # Load CSV
-                df = pd.read_csv(file_path)
-                print(f"✅ Loaded {csv_file} with {len(df)} players")
-                
-                # Standardize column names
-                df = self._standardize_columns(df)
-                
-                # Add draft year if not present
-                if 'draft_year' not in df.columns:
-                    df['draft_year'] = year
-                
-                # Clean and validate data
-                df = self._clean_data(df)
-                
-                all_data.append(df)
-                
+                raw_data.append((csv_file, year, self._read_csv_file(csv_file, year)))
+            except Exception as e:
+                print(f"❌ Error processing {csv_file}: {e}")
+        if not raw_data:
+            return []
+        
+        try:
+            combined = self._clean_data(pd.concat([df for _, _, df in raw_data], ignore_index=True))
+        except Exception:
+            all_data = []
+            for csv_file, year, df in raw_data:
+                try:
+                    df = self._clean_data(df)
+                    print(f"✅ Loaded {csv_file} with {len(df)} players")
+                    all_data.append(df)
+                    self._record_source_file(csv_file, year, len(df))
+                except Exception as e:
+                    print(f"❌ Error processing {csv_file}: {e}")
+            return all_data
+        
+        for csv_file, year, df in raw_data:
+            print(f"✅ Loaded {csv_file} with {len(df)} players")
+            self._record_source_file(csv_file, year, len(df))
+        return [combined]
+    
+    def _load_files_parallel(self, csv_files: List[Tuple[str, int]],
+                             max_workers: Optional[int] = None) -> List[pd.DataFrame]:
+        """Process the year files on a pool of worker processes, keeping the file order"""
+        max_workers = min(max_workers or os.cpu_count() or 1, len(csv_files))
+        print(f"⚙️  Processing files on {max_workers} worker processes...")
+        
+        all_data = []
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(self._process_csv_file, csv_file, year)
+                       for csv_file, year in csv_files]
+            
+            # Collect in submission order so the combined data stays ordered by year
+            for (csv_file, year), future in zip(csv_files, futures):
+                try:
+                    df = future.result()
+                    print(f"✅ Loaded {csv_file} with {len(df)} players")
+                    all_data.append(df)
+                    self._record_source_file(csv_file, year, len(df))
+                except Exception as e:
+                    print(f"❌ Error processing {csv_file}: {e}")
+        
+        return all_data
+    
+    def stream_csv_files(self, output_file: str = "data/processed_combine_data.csv",
+                         chunksize: int = 50000) -> int:
+        """
+        Process the year files chunk by chunk straight into the processed store
+        
+        Each file is read in chunks of `chunksize` rows, standardized and cleaned
+        per chunk, and appended to the columnar store, so peak memory is bounded
+        by the chunk size rather than the dataset. The CSV output is then written
+        from the store in the same chunks. Nothing is kept in combined_data.
+        
+        Args:
+            output_file: Processed CSV output; the store and manifest go next to it
+            chunksize: Rows per chunk
+            
+        Returns:
+            Number of rows written
+        """
+        self.source_files = []
+        self.changed_files = []
+        self._kept_output = None
+        
+        csv_files = self._find_csv_files()
+        if not csv_files:
+            return 0
+        
+        os.makedirs(os.path.dirname(output_file), exist_ok=True)
+        store_dir = store_path_for(output_file)
+        # Cleaned measurements are floats; every other column is stored as text
+        if self.compact:
+            column_types = {field: 'float32' for field in COMBINE_STATS}
+            column_types.update({'draft_year': 'int16', 'name': 'string'})
+            writer = ColumnarStoreWriter(store_dir, column_types, default_type='category')
+        else:
+            column_types = {field: 'float64' for field in COMBINE_STATS}
+            column_types['draft_year'] = 'int64'
+            writer = ColumnarStoreWriter(store_dir, column_types, default_type='string')
+        
+        for csv_file, year in csv_files:
+            rows_before = writer.rows
+            try:
+                column_mapping = None
+                for chunk in pd.read_csv(os.path.join(self.data_folder, csv_file), chunksize=chunksize):
+                    # The column layout is resolved once per file, from its first chunk
+                    if column_mapping is None:
+                        column_mapping = self._resolve_column_mapping(chunk)
+                    chunk = chunk.rename(columns=column_mapping)
+                    
+                    # Every row needs a draft year here, so gaps take the file's year
+                    if 'draft_year' in chunk.columns:
+                        chunk['draft_year'] = pd.to_numeric(chunk['draft_year'], errors='coerce').fillna(year)
+                    else:
+                        chunk['draft_year'] = year
+                    
+                    writer.append(self._clean_data(chunk))
             except Exception as e:
                 print(f"❌ Error processing {csv_file}: {e}")
+                writer.truncate(rows_before)
                 continue
+            
+            print(f"✅ Streamed {csv_file} with {writer.rows - rows_before} players")
+            self._record_source_file(csv_file, year, writer.rows - rows_before)
+        
+        writer.close()
+        print(f"💾 Columnar store saved to {store_dir}")
+        
+        # Export the CSV from the store without materializing the whole table
+        with open(output_file, 'w', newline='') as f:
+            for i, chunk in enumerate(iter_columnar(store_dir, chunksize)):
+                chunk.to_csv(f, index=False, header=(i == 0))
+        update_store_metadata(store_dir, {'source_csv': source_signature(output_file)})
+        print(f"💾 Processed data saved to {output_file}")
+        
+        self._write_manifest(output_file)
+        print(f"🎉 Successfully streamed {writer.rows} total players")
+        return writer.rows
+    
+    def load_csv_files_incremental(self, output_file: str = "data/processed_combine_data.csv",
+                                   parallel: bool = False, max_workers: Optional[int] = None) -> pd.DataFrame:
+        """
+        Load the combined data, re-cleaning only the year files that changed since the last save
+        
+        The manifest written next to the processed output records each source file's
+        size, mtime, content hash and row count. Files whose size and mtime still match
+        are trusted without hashing; their rows are sliced back out of the processed
+        output, and only added or changed files go through the cleaning pipeline. A
+        changed file that fails to process keeps its previous rows and manifest entry
+        (so it is retried next time); a new file that fails is left out.
+        
+        Args:
+            output_file: Processed output (and manifest location) from the previous run
+            parallel: Use worker processes if everything has to be rebuilt
+            max_workers: Number of worker processes for a parallel rebuild
+            
+        Returns:
+            Combined player data, ordered by year file
+        """
+        manifest = self._read_manifest(output_file)
+        if manifest is None:
+            print(f"📝 No usable manifest for {output_file}, rebuilding from scratch")
+            return self.load_csv_files(parallel=parallel, max_workers=max_workers)
+        previous = manifest['files']
+        
+        csv_files = self._find_csv_files()
+        if not csv_files:
+            return pd.DataFrame()
+        
+        # Row offsets of each file's block in the processed output
+        offsets = {}
+        start = 0
+        for entry in previous:
+            offsets[entry['file']] = start
+            start += entry['rows']
+        previous = {entry['file']: entry for entry in previous}
+        
+        self.source_files = []
+        self.changed_files = sorted(set(previous) - {csv_file for csv_file, _ in csv_files})
+        self._kept_output = None
+        processed = None
+        all_data = []
+        # Leading run of files whose blocks stay where they were in the output (see save_processed_data)
+        kept_files, kept_rows, csv_end = 0, 0, None
+        
+        for csv_file, year in csv_files:
+            old_entry = previous.get(csv_file)
+            entry = self._file_signature(csv_file, year, old_entry)
+            
+            unchanged = old_entry is not None and entry['sha256'] == old_entry['sha256']
+            if not unchanged:
+                try:
+                    df = self._process_csv_file(csv_file, year)
+                except Exception as e:
+                    if old_entry is None:
+                        print(f"❌ Error processing {csv_file}: {e}")
+                        continue
+                    # Keep the last good version's rows and manifest entry, so the next run retries the file
+                    print(f"❌ Error processing {csv_file}, keeping its previous rows: {e}")
+                    entry, unchanged = dict(old_entry), True
+                else:
+                    print(f"🔄 Reprocessed {csv_file} with {len(df)} players")
+                    all_data.append(df)
+                    entry['rows'] = len(df)
+                    self.changed_files.append(csv_file)
+            
+            if unchanged:
+                # Reuse the file's rows from the processed output
+                if processed is None:
+                    processed = self._read_processed_output(output_file)
+                    if len(processed) != start:
+                        print(f"⚠️  {output_file} does not match its manifest, rebuilding from scratch")
+                        return self.load_csv_files(parallel=parallel, max_workers=max_workers)
+                offset = offsets[csv_file]
+                all_data.append(processed.iloc[offset:offset + old_entry['rows']])
+                entry['rows'] = old_entry['rows']
+            
+            if (kept_files == len(self.source_files) and unchanged and offsets[csv_file] == kept_rows
+                    and 'csv_end' in old_entry):
+                kept_files, kept_rows, csv_end = kept_files + 1, kept_rows + entry['rows'], old_entry['csv_end']
+                entry['csv_end'] = csv_end
+            self.source_files.append(entry)
+        
+        if not self.changed_files:
+            print("✅ Processed data is up to date")
+        if kept_files:
+            self._kept_output = {'file': output_file, 'files': kept_files, 'rows': kept_rows,
+                                 'csv_end': csv_end, 'output': manifest.get('output')}
         
         if all_data:
             self.combined_data = pd.concat(all_data, ignore_index=True)
+            if self.compact:
+                self.combined_data = compact_dtypes(self.combined_data)
             print(f"🎉 Successfully combined {len(self.combined_data)} total players")
             return self.combined_data
         else:
             print("❌ No data could be loaded")
             return pd.DataFrame()
     
+    def _read_processed_output(self, output_file: str) -> pd.DataFrame:
+        """Read a previous processed output, preferring its columnar store while it was written with the CSV"""
+        store_dir = store_path_for(output_file)
+        schema = read_store_schema(store_dir)
+        if schema is not None and matches_source(schema['metadata'].get('source_csv'), output_file):
+            return load_columnar(store_dir)
+        return pd.read_csv(output_file)
+    
+    def _manifest_path(self, output_file: str) -> str:
+        """Location of the manifest that belongs to a processed output file"""
+        return os.path.splitext(output_file)[0] + "_manifest.json"
+    
+    def _read_manifest(self, output_file: str) -> Optional[Dict]:
+        """Read the manifest of a processed output file, or None if it can't be used"""
+        manifest_file = self._manifest_path(output_file)
+        if not os.path.exists(output_file) or not os.path.exists(manifest_file):
+            return None
+        try:
+            with open(manifest_file) as f:
+                manifest = json.load(f)
+            if manifest.get('version') != MANIFEST_VERSION:
+                return None
+            files = manifest['files']
+            if not all(all(field in entry for field in MANIFEST_ENTRY_FIELDS) and isinstance(entry['rows'], int)
+                       for entry in files):
+                return None
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            # Unreadable, or valid JSON in the wrong shape
+            return None
+        return manifest
+    
+    def _write_manifest(self, output_file: str, output: Optional[Dict] = None):
+        """
+        Write the manifest for a processed output, which lets the next run skip unchanged files
+        
+        Args:
+            output_file: Processed output the manifest belongs to
+            output: The output's signature and column layout, when its blocks can be kept by a
+                later save (entries then record where their block ends in the CSV)
+        """
+        if not self.source_files:
+            return
+        manifest_file = self._manifest_path(output_file)
+        manifest = {'version': MANIFEST_VERSION, 'files': self.source_files}
+        if output is not None:
+            manifest['output'] = output
+        with open(manifest_file + ".tmp", 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(manifest_file + ".tmp", manifest_file)
+    
+    def _file_signature(self, csv_file: str, year: int, previous: Optional[Dict] = None) -> Dict:
+        """Size, mtime and content hash of a source file (the hash is reused while size and mtime match)"""
+        stat = os.stat(os.path.join(self.data_folder, csv_file))
+        if previous is not None and previous['size'] == stat.st_size and previous['mtime_ns'] == stat.st_mtime_ns:
+            sha256 = previous['sha256']
+        else:
+            digest = hashlib.sha256()
+            with open(os.path.join(self.data_folder, csv_file), 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(block)
+            sha256 = digest.hexdigest()
+        return {
+            'file': csv_file,
+            'year': year,
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha256': sha256
+        }
+    
+    def _record_source_file(self, csv_file: str, year: int, rows: int):
+        """Add a fully loaded file to the manifest entries"""
+        entry = self._file_signature(csv_file, year)
+        entry['rows'] = rows
+        self.source_files.append(entry)
+        self.changed_files.append(csv_file)
+    
     def _standardize_columns(self, df: pd.DataFrame) -> pd.DataFrame:
         """Map various column names to standard format"""
-        # Create mapping from original to standard column names
-        column_mapping = {}
-        
-        # Map the specific columns from your CSV format
-        column_mapping.update({
-            'Player': 'name',
-            'Pos': 'position',
-            'School': 'college',
-            'Ht': 'height',
-            'Wt': 'weight',
-            '40yd': 'forty_yard',
-            'Vertical': 'vertical_jump',
-            'Bench': 'bench_press',
-            'Broad Jump': 'broad_jump',
-            '3Cone': 'cone',
-            'Shuttle': 'shuttle'
-        })
-        
-        # Special handling for 2001CombineData.csv format
-        # Check if we have the problematic height column (dates) and the correct height column
-        if 'Ht' in df.columns and len(df.columns) > 6:
-            # Look for the actual height column (should be the 6th column, index 5)
-            height_col_idx = 5
-            if height_col_idx < len(df.columns):
-                actual_height_col = df.columns[height_col_idx]
-                # If this column contains heights like "5-11", "6-0", etc., use it instead
-                sample_values = df[actual_height_col].dropna().head(10)
-                if any(str(val).count('-') == 1 and str(val).replace('-', '').isdigit() for val in sample_values):
-                    # This is the correct height column
-                    column_mapping[actual_height_col] = 'height'
-                    # Remove the old Ht mapping
-                    if 'Ht' in column_mapping:
-                        del column_mapping['Ht']
+        column_mapping = self._resolve_column_mapping(df)
         
         # Rename columns
         if column_mapping:
@@ -135,11 +561,74 @@ class NFLDataProcessor:
         
         return df
     
+    def _resolve_column_mapping(self, df: pd.DataFrame) -> Dict[str, str]:
+        """
+        Work out which of a file's columns map to which standard names
+        
+        Files are fingerprinted by their header row and by the height column
+        their values point to, which is sniffed for every file. The first file
+        with a given fingerprint is resolved through the Pro Football Reference
+        layout, then the alias table in column_mappings; every later file with
+        the same fingerprint reuses that mapping.
+        """
+        height_column = self._sniff_height_column(df)
+        fingerprint = (tuple(str(column) for column in df.columns), height_column)
+        column_mapping = self._schema_cache.get(fingerprint)
+        if column_mapping is None:
+            column_mapping = self._resolve_header(df, height_column)
+            self._schema_cache[fingerprint] = column_mapping
+        return dict(column_mapping)
+    
+    def _resolve_header(self, df: pd.DataFrame, height_column: Optional[str] = None) -> Dict[str, str]:
+        """Resolve a header that has not been seen before, with the height column found by sniffing"""
+        # Map the specific columns from your CSV format
+        column_mapping = {column: PFR_COLUMN_MAPPING[column] for column in df.columns
+                          if column in PFR_COLUMN_MAPPING}
+        
+        # Other layouts go through the aliases, for standard names that are still unclaimed
+        claimed = set(column_mapping.values()) | {column for column in df.columns if column in self.column_mappings}
+        for column in df.columns:
+            if column in column_mapping or column in self.column_mappings:
+                continue
+            header = self._normalize_header(column)
+            for standard, aliases in self.column_mappings.items():
+                if standard not in claimed and header in aliases:
+                    column_mapping[column] = standard
+                    claimed.add(standard)
+                    break
+        
+        if height_column is not None:
+            # This is the correct height column
+            column_mapping[height_column] = 'height'
+            # Remove the old Ht mapping
+            if column_mapping.get('Ht') == 'height':
+                del column_mapping['Ht']
+        
+        return column_mapping
+    
+    @staticmethod
+    def _sniff_height_column(df: pd.DataFrame) -> Optional[str]:
+        """The column that really holds heights in files like 2001CombineData.csv, whose 'Ht' has dates"""
+        # Check if we have the problematic height column (dates) and the correct height column
+        if 'Ht' in df.columns and len(df.columns) > 6:
+            # Look for the actual height column (should be the 6th column, index 5)
+            actual_height_col = df.columns[5]
+            # If this column contains heights like "5-11", "6-0", etc., use it instead
+            sample_values = df[actual_height_col].dropna().head(10)
+            if any(str(val).count('-') == 1 and str(val).replace('-', '').isdigit() for val in sample_values):
+                return actual_height_col
+        return None
+    
+    @staticmethod
+    def _normalize_header(column) -> str:
+        """Header in alias form: lower case, with runs of other characters turned into underscores"""
+        return HEADER_SEPARATOR_PATTERN.sub('_', str(column).strip().lower()).strip('_')
+    
     def _clean_data(self, df: pd.DataFrame) -> pd.DataFrame:
         """Clean and standardize data formats"""
         # Handle height conversions (various formats to inches)
         if 'height' in df.columns:
-            df['height'] = df['height'].apply(self._convert_height_to_inches)
+            df['height'] = self._convert_height_column(df['height'])
         
         # Handle weight (ensure it's numeric)
         if 'weight' in df.columns:
@@ -147,7 +636,7 @@ class NFLDataProcessor:
         
         # Handle 40-yard dash times
         if 'forty_yard' in df.columns:
-            df['forty_yard'] = df['forty_yard'].apply(self._clean_time)
+            df['forty_yard'] = self._clean_time_column(df['forty_yard'])
         
         # Handle other numeric fields
         numeric_fields = ['vertical_jump', 'broad_jump', 'bench_press', 'shuttle', 'cone']
@@ -157,10 +646,91 @@ class NFLDataProcessor:
         
         # Clean position names
         if 'position' in df.columns:
-            df['position'] = df['position'].apply(self._standardize_position)
+            df['position'] = self._standardize_position_column(df['position'])
         
         return df
     
+    def _clean_distinct_values(self, series: pd.Series, clean_values, lookup: Dict, missing=None) -> np.ndarray:
+        """
+        Run a column cleaner once per distinct value and broadcast the results.
+        
+        Combine columns repeat a small set of values (heights, positions, times),
+        so each raw value is cleaned once, remembered in a lookup table shared
+        across files, and mapped back onto the rows through the factorized codes.
+        """
+        codes, uniques = pd.factorize(series)
+        unseen = [val for val in uniques if val not in lookup]
+        if unseen:
+            lookup.update(zip(unseen, clean_values(pd.Series(unseen, dtype=object))))
+        # The extra slot is picked up by missing values (code -1)
+        cleaned = [lookup[val] for val in uniques] + [missing]
+        return np.array(cleaned, dtype=object).take(codes)
+    
+    def _plain_float_values(self, values: pd.Series) -> pd.Series:
+        """Keep numbers whose str() has no sign or exponent, which is what the text cleaners accept"""
+        numbers = values.to_numpy(dtype=float, na_value=np.nan)
+        plain = (numbers == 0) | ((numbers >= 1e-4) & (numbers < 1e16))
+        return pd.Series(np.where(plain, numbers, np.nan), index=values.index)
+    
+    def _convert_height_column(self, heights: pd.Series) -> pd.Series:
+        """Column-at-a-time version of _convert_height_to_inches"""
+        if pd.api.types.is_float_dtype(heights) or pd.api.types.is_integer_dtype(heights):
+            # Numbers are already in inches
+            return self._plain_float_values(heights)
+        cleaned = self._clean_distinct_values(heights, self._convert_height_values, self._height_lookup)
+        return pd.Series(cleaned, index=heights.index, dtype=float)
+    
+    def _convert_height_values(self, values: pd.Series) -> pd.Series:
+        """Convert distinct height values to inches"""
+        text = values.astype(str).str.strip()
+        inches = pd.Series(np.nan, index=values.index, dtype=float)
+        
+        # Already in inches (numeric)
+        is_numeric = text.str.fullmatch(NUMERIC_HEIGHT_PATTERN)
+        inches[is_numeric] = pd.to_numeric(text[is_numeric], errors='coerce')
+        remaining = ~is_numeric
+        
+        # Format: 6'2" or 6'2 or 6-2 or 6-0
+        feet_inches = text[remaining].str.extract(FEET_INCHES_PATTERN).dropna()
+        inches[feet_inches.index] = (feet_inches[0].astype(int) * 12
+                                     + feet_inches[1].astype(int))
+        remaining[feet_inches.index] = False
+        
+        # Handle Excel date format (e.g., "4-Jun" = 4'6", "11-May" = 5'11")
+        excel = text[remaining].str.extract(EXCEL_HEIGHT_PATTERN).dropna()
+        feet = excel[1].str.lower().map(MONTH_TO_FEET)
+        inches[excel.index] = feet * 12 + excel[0].astype(int)
+        
+        return inches
+    
+    def _clean_time_column(self, times: pd.Series) -> pd.Series:
+        """Column-at-a-time version of _clean_time"""
+        if pd.api.types.is_float_dtype(times):
+            return self._plain_float_values(times)
+        if pd.api.types.is_integer_dtype(times):
+            # Whole numbers have no decimal point, so they are not valid times
+            return pd.Series(np.nan, index=times.index, dtype=float)
+        cleaned = self._clean_distinct_values(times, self._clean_time_values, self._time_lookup)
+        return pd.Series(cleaned, index=times.index, dtype=float)
+    
+    def _clean_time_values(self, values: pd.Series) -> pd.Series:
+        """Convert distinct time values to floats"""
+        text = values.astype(str).str.strip().str.replace('"', '', regex=False).str.replace("'", '', regex=False)
+        is_time = text.str.fullmatch(TIME_PATTERN)
+        return pd.to_numeric(text.where(is_time), errors='coerce')
+    
+    def _standardize_position_column(self, positions: pd.Series) -> pd.Series:
+        """Column-at-a-time version of _standardize_position"""
+        # Missing positions become "Unknown"
+        standardized = self._clean_distinct_values(positions, self._standardize_position_values,
+                                                   self._position_lookup, missing="Unknown")
+        return pd.Series(standardized, index=positions.index)
+    
+    def _standardize_position_values(self, values: pd.Series) -> pd.Series:
+        """Standardize distinct position names"""
+        text = values.astype(str).str.strip().str.upper()
+        return text.map(POSITION_MAP).fillna(text)
+    
     def _convert_height_to_inches(self, height_val) -> Optional[float]:
         """Convert various height formats to inches"""
         if pd.isna(height_val):
@@ -173,30 +743,20 @@ class NFLDataProcessor:
             return float(height_str)
         
         # Format: 6'2" or 6'2 or 6-2 or 6-0
-        feet_inches_pattern = r'(\d+)[\'\-](\d+)'
-        match = re.search(feet_inches_pattern, height_str)
+        match = re.search(FEET_INCHES_PATTERN, height_str)
         if match:
             feet = int(match.group(1))
             inches = int(match.group(2))
             return feet * 12 + inches
         
         # Handle Excel date format (e.g., "4-Jun" = 4'6", "11-May" = 5'11")
-        excel_pattern = r'(\d+)-([A-Za-z]+)'
-        match = re.search(excel_pattern, height_str)
+        match = re.search(EXCEL_HEIGHT_PATTERN, height_str)
         if match:
             day = int(match.group(1))
             month = match.group(2).lower()
-            # Map months to feet (Jan=1, Feb=2, etc.)
-            month_to_feet = {
-                'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
-                'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12
-            }
-            if month in month_to_feet:
-                feet = month_to_feet[month]
-                inches = day
-                # Fix: The day should be inches, month should be feet
-                # But Excel format is actually "day-month" where day=inches, month=feet
-                return feet * 12 + inches
+            # Excel format is "day-month" where day=inches, month=feet
+            if month in MONTH_TO_FEET:
+                return MONTH_TO_FEET[month] * 12 + day
         
         return None
     
@@ -208,7 +768,7 @@ class NFLDataProcessor:
         time_str = str(time_val).strip().replace('"', '').replace("'", '')
         
         # Handle format like "4.45" or "4.4"
-        if re.match(r'^\d+\.\d+$', time_str):
+        if re.fullmatch(TIME_PATTERN, time_str):
             return float(time_str)
         
         return None
@@ -219,57 +779,92 @@ class NFLDataProcessor:
             return "Unknown"
         
         pos_str = str(pos).strip().upper()
+        return POSITION_MAP.get(pos_str, pos_str)
+    
+    def handle_missing_data(self, df: pd.DataFrame, strategy: str = 'mean',
+                            year_window: int = 2) -> pd.DataFrame:
+        """
+        Handle missing combine data using intelligent imputation
         
-        # Position mappings
-        position_map = {
-            'QB': 'QB', 'QUARTERBACK': 'QB',
-            'RB': 'RB', 'RUNNING BACK': 'RB', 'HB': 'RB', 'TB': 'RB',
-            'WR': 'WR', 'WIDE RECEIVER': 'WR',
-            'TE': 'TE', 'TIGHT END': 'TE',
-            'OT': 'OT', 'OFFENSIVE TACKLE': 'OT', 'T': 'OT',
-            'OG': 'OG', 'OFFENSIVE GUARD': 'OG', 'G': 'OG',
-            'C': 'C', 'CENTER': 'C',
-            'DE': 'EDGE', 'DEFENSIVE END': 'EDGE', 'EDGE': 'EDGE',
-            'DT': 'DT', 'DEFENSIVE TACKLE': 'DT', 'NT': 'DT',
-            'LB': 'LB', 'LINEBACKER': 'LB', 'ILB': 'LB', 'OLB': 'LB',
-            'CB': 'CB', 'CORNERBACK': 'CB',
-            'S': 'S', 'SAFETY': 'S', 'FS': 'S', 'SS': 'S', 'SAF': 'S',
-            'K': 'K', 'KICKER': 'K',
-            'P': 'P', 'PUNTER': 'P'
-        }
+        Each stat is filled in one grouped pass by position. Cells that were
+        filled are flagged in the uint8 `imputed_mask` column: bit i is set when
+        COMBINE_STATS[i] was imputed for that player.
         
-        return position_map.get(pos_str, pos_str)
-    
-    def handle_missing_data(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Handle missing combine data using intelligent imputation"""
-        print("🔧 Handling missing data...")
+        Args:
+            df: Cleaned combine data
+            strategy: 'mean' or 'median' of the player's position, or 'year_window'
+                for the position mean over draft years within `year_window` of the
+                player's class (falling back to the position mean)
+            year_window: Years on either side of the draft year for 'year_window'
+            
+        Returns:
+            DataFrame with missing stats filled in
+        """
+        if strategy not in IMPUTATION_STRATEGIES:
+            raise ValueError(f"Unknown imputation strategy '{strategy}', expected one of {IMPUTATION_STRATEGIES}")
+        print(f"🔧 Handling missing data ({strategy})...")
         
-        # Create a copy to work with
-        df_clean = df.copy()
+        # Filled columns are swapped in whole, so the caller's frame is left untouched
+        df_clean = df.copy(deep=False)
+        imputed_mask = np.zeros(len(df_clean), dtype=np.uint8)
         
-        # Calculate position-specific averages for missing data
-        combine_stats = ['height', 'weight', 'forty_yard', 'vertical_jump', 
-                        'broad_jump', 'bench_press', 'shuttle', 'cone']
+        for bit, stat in enumerate(COMBINE_STATS):
+            if stat not in df_clean.columns:
+                continue
+            missing = df_clean[stat].isna()
+            if not missing.any():
+                continue
+            
+            if strategy == 'year_window':
+                fill = self._year_window_means(df_clean, stat, year_window)
+            else:
+                fill = df_clean.groupby('position')[stat].transform(strategy)
+            
+            df_clean[stat] = df_clean[stat].fillna(fill)
+            imputed_mask |= (missing & fill.notna()).to_numpy().astype(np.uint8) << bit
         
-        for stat in combine_stats:
-            if stat in df_clean.columns:
-                # Calculate position averages
-                pos_averages = df_clean.groupby('position')[stat].mean()
-                
-                # Fill missing values with position averages
-                for pos in pos_averages.index:
-                    mask = (df_clean['position'] == pos) & (df_clean[stat].isna())
-                    df_clean.loc[mask, stat] = pos_averages[pos]
+        df_clean['imputed_mask'] = imputed_mask
         
         # Add a flag for players with complete vs. partial data
-        df_clean['has_complete_data'] = df_clean[combine_stats].notna().all(axis=1)
+        df_clean['has_complete_data'] = df_clean[COMBINE_STATS].notna().all(axis=1)
         
         print(f"📊 Data completeness:")
         print(f"   - Players with complete data: {df_clean['has_complete_data'].sum()}")
         print(f"   - Players with partial data: {(~df_clean['has_complete_data']).sum()}")
+        print(f"   - Imputed values: {int(np.unpackbits(imputed_mask).sum())}")
         
         return df_clean
     
+    def _year_window_means(self, df: pd.DataFrame, stat: str, window: int) -> pd.Series:
+        """Mean of a stat over the same position and draft years within `window`, per player"""
+        # Sums and counts per position x draft year, as dense matrices over every year in range
+        grouped = df.groupby(['position', 'draft_year'])[stat].agg(['sum', 'count'])
+        positions = grouped.index.get_level_values(0).unique()
+        years = grouped.index.get_level_values(1)
+        all_years = np.arange(int(years.min()), int(years.max()) + 1)
+        sums = grouped['sum'].unstack(fill_value=0).reindex(index=positions, columns=all_years, fill_value=0)
+        counts = grouped['count'].unstack(fill_value=0).reindex(index=positions, columns=all_years, fill_value=0)
+        
+        # Window totals from cumulative sums along the year axis
+        def window_totals(matrix: pd.DataFrame) -> np.ndarray:
+            cumulative = np.pad(np.cumsum(matrix.to_numpy(dtype=float), axis=1), ((0, 0), (1, 0)))
+            lo = np.clip(np.arange(len(all_years)) - window, 0, len(all_years))
+            hi = np.clip(np.arange(len(all_years)) + window + 1, 0, len(all_years))
+            return cumulative[:, hi] - cumulative[:, lo]
+        
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = window_totals(sums) / window_totals(counts)
+        
+        pos_index = positions.get_indexer(df['position'])
+        year_index = pd.Index(all_years).get_indexer(df['draft_year'])
+        found = (pos_index >= 0) & (year_index >= 0)
+        values = np.full(len(df), np.nan)
+        values[found] = means[pos_index[found], year_index[found]]
+        
+        # Positions with no data nearby fall back to their overall mean
+        fill = pd.Series(values, index=df.index)
+        return fill.fillna(df.groupby('position')[stat].transform('mean'))
+    
     def get_data_summary(self) -> Dict:
         """Get summary statistics of the loaded data"""
         if self.combined_data is None:
@@ -298,27 +893,112 @@ class NFLDataProcessor:
         return summary
     
     def save_processed_data(self, output_file: str = "data/processed_combine_data.csv"):
-        """Save the processed data to a CSV file"""
+        """
+        Save the processed data to a CSV file and a columnar store next to it
+        
+        After an incremental load, the leading year blocks it kept as they were
+        stay in place: the CSV is cut after them and the store resumed from them,
+        so only the blocks from the first changed file on are written (just the
+        new block when a draft class is added).
+        """
         if self.combined_data is not None:
             os.makedirs(os.path.dirname(output_file), exist_ok=True)
-            self.combined_data.to_csv(output_file, index=False)
+            store_dir = store_path_for(output_file)
+            kept_files, kept_rows, csv_end = self._kept_blocks(output_file) or (0, 0, 0)
+            
+            self._write_csv_blocks(output_file, kept_files, kept_rows, csv_end)
             print(f"💾 Processed data saved to {output_file}")
+            
+            # Binary copy with typed columns for fast, memory-mapped loading; the CSV's
+            # signature lets loaders tell when the CSV was changed after the store
+            signature = source_signature(output_file)
+            if kept_rows:
+                writer = ColumnarStoreWriter.resume(store_dir, kept_rows)
+                writer.append(self.combined_data.iloc[kept_rows:])
+                writer.close({'source_csv': signature})
+            else:
+                save_columnar(self.combined_data, store_dir, {'source_csv': signature})
+            print(f"💾 Columnar store saved to {store_dir}")
+            
+            self._write_manifest(output_file, {'signature': signature, 'layout': self._column_layout()})
+            self._kept_output = None
             return True
         return False
+    
+    def _kept_blocks(self, output_file: str) -> Optional[Tuple[int, int, int]]:
+        """(files, rows, CSV bytes) at the start of the output that can stay as they are, if any"""
+        kept = self._kept_output
+        if kept is None or kept['file'] != output_file or not kept['rows'] or not kept['output']:
+            return None
+        # The CSV and store must still be the ones the manifest describes, with the same columns
+        if not os.path.exists(output_file) or not matches_source(kept['output'].get('signature'), output_file):
+            return None
+        schema = read_store_schema(store_path_for(output_file))
+        if schema is None or not matches_source(schema['metadata'].get('source_csv'), output_file):
+            return None
+        if kept['output'].get('layout') != self._column_layout():
+            return None
+        return kept['files'], kept['rows'], kept['csv_end']
+    
+    def _column_layout(self) -> List[List[str]]:
+        """Names and dtypes of combined_data's columns, as JSON (categoricals with a hash of their categories)"""
+        layout = []
+        for column, dtype in self.combined_data.dtypes.items():
+            if isinstance(dtype, pd.CategoricalDtype):
+                categories = json.dumps(dtype.categories.tolist(), default=str).encode('utf-8')
+                layout.append([str(column), 'category', hashlib.sha256(categories).hexdigest()])
+            else:
+                layout.append([str(column), str(dtype)])
+        return layout
+    
+    def _write_csv_blocks(self, output_file: str, kept_files: int, kept_rows: int, csv_end: int):
+        """
+        Write the processed CSV one year block at a time, after the first `kept_files` blocks
+        
+        Each manifest entry records where its block ends in the CSV ('csv_end'),
+        which is where a later save can cut the file.
+        """
+        if sum(entry['rows'] for entry in self.source_files) != len(self.combined_data):
+            # Rows that are not laid out by source file are written in one go, and not kept next time
+            self.combined_data.to_csv(output_file, index=False)
+            for entry in self.source_files:
+                entry.pop('csv_end', None)
+            return
+        
+        if kept_files:
+            os.truncate(output_file, csv_end)
+        with open(output_file, 'a' if kept_files else 'w', newline='') as f:
+            if not kept_files:
+                self.combined_data.iloc[:0].to_csv(f, index=False)
+            start = kept_rows
+            for entry in self.source_files[kept_files:]:
+                self.combined_data.iloc[start:start + entry['rows']].to_csv(f, index=False, header=False)
+                start += entry['rows']
+                entry['csv_end'] = f.tell()
 
-def main():
+def main(parallel: bool = False, max_workers: Optional[int] = None, full_rebuild: bool = False,
+         stream: bool = False, chunksize: int = 50000, impute: str = 'mean', compact: bool = False):
     """Main function to process all CSV files"""
-    processor = NFLDataProcessor()
+    processor = NFLDataProcessor(compact=compact)
     
-    # Load and process all CSV files
-    data = processor.load_csv_files()
+    # Streaming writes the processed output directly and never holds the full table
+    if stream:
+        processor.stream_csv_files(chunksize=chunksize)
+        print("\n✅ Data processing complete!")
+        return
+    
+    # Load and process the CSV files (only new or changed ones unless a full rebuild is requested)
+    if full_rebuild:
+        data = processor.load_csv_files(parallel=parallel, max_workers=max_workers)
+    else:
+        data = processor.load_csv_files_incremental(parallel=parallel, max_workers=max_workers)
     
     if data.empty:
         print("❌ No data loaded. Please check your CSV files.")
         return
     
     # Handle missing data
-    processed_data = processor.handle_missing_data(data)
+    processed_data = processor.handle_missing_data(data, strategy=impute)
     
     # Get summary
     summary = processor.get_data_summary()
@@ -333,9 +1013,25 @@ def main():
         print(f"  {stat}: {info['complete']}/{summary['total_players']} ({info['percentage']}%)")
     
     # Save processed data
-    processor.save_processed_data()
+    if processor.changed_files:
+        processor.save_processed_data()
     
     print("\n✅ Data processing complete!")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Process the combine CSV files in the data folder")
+    parser.add_argument("--parallel", action="store_true", help="process year files on a process pool")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes for --parallel (default: CPU count)")
+    parser.add_argument("--full", action="store_true", help="reprocess every file instead of only new or changed ones")
+    parser.add_argument("--stream", action="store_true", help="process files in chunks with bounded memory")
+    parser.add_argument("--chunksize", type=int, default=50000, help="rows per chunk for --stream")
+    parser.add_argument("--impute", choices=IMPUTATION_STRATEGIES, default='mean',
+                        help="how missing stats are filled in")
+    parser.add_argument("--compact", action="store_true",
+                        help="store categoricals, float32 measurements and int16 years")
+    args = parser.parse_args()
+    
+    main(parallel=args.parallel, max_workers=args.workers, full_rebuild=args.full,
+         stream=args.stream, chunksize=args.chunksize, impute=args.impute, compact=args.compact) 
\ No newline at end of file
@@ -0,0 +1,101 @@
+import threading
+from typing import Tuple
+
+from .nfl_player_data import NFLPlayerData
+from .player_similarity import PlayerSimilarityAnalyzer
+from .snapshot import source_files, stat_signature, load_app_state
+
+
+class DataWatcher:
+    """
+    Keeps the app state current with the processed data file.
+
+    A background thread polls the source files' size and mtime. Once a
+    change has settled (the same on two polls in a row, so a file still
+    being written is not read), a new (player_data, analyzer) pair is built
+    off the request path and swapped in with a single reference assignment.
+    Callers take the pair once per request via current(), so a request
+    started before a swap finishes on the old pair.
+    """
+
+    def __init__(self, data_file: str = "data/processed_combine_data.csv", interval: float = 10.0,
+                 **options):
+        """
+        Args:
+            data_file: Processed CSV file to watch (along with its columnar store when present)
+            interval: Seconds between polls
+            **options: Passed on to load_app_state (compact, persist_expanded, lazy_percentiles,
+                snapshot_file)
+        """
+        self.data_file = data_file
+        self.interval = interval
+        self.options = options
+        # Number of swaps so far
+        self.version = 0
+        self._signature = self._read_signature()
+        self._state = load_app_state(data_file, **options)
+        self._pending = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _read_signature(self):
+        """Names, sizes and mtimes of the source files (None while they are unreadable)"""
+        try:
+            return stat_signature(source_files(self.data_file))
+        except OSError:
+            return None
+
+    def current(self) -> Tuple[NFLPlayerData, PlayerSimilarityAnalyzer]:
+        """The latest (player_data, analyzer) pair"""
+        return self._state
+
+    def check(self) -> bool:
+        """
+        Poll the source files once, rebuilding and swapping the state if they changed
+
+        Returns:
+            True if a new state was swapped in
+        """
+        signature = self._read_signature()
+        if signature is None or signature == self._signature:
+            self._pending = None
+            return False
+        if signature != self._pending:
+            # Wait for the next poll to see the change settle
+            self._pending = signature
+            return False
+
+        print(f"🔄 {self.data_file} changed, rebuilding player data")
+        try:
+            state = load_app_state(self.data_file, **self.options)
+        except Exception as e:
+            print(f"❌ Keeping the current player data, rebuild failed: {e}")
+            # Retry once the files change again rather than on every poll
+            self._signature = signature
+            self._pending = None
+            return False
+        self._state = state
+        self._signature = signature
+        self._pending = None
+        self.version += 1
+        print(f"✅ Swapped in player data version {self.version}")
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def start(self) -> 'DataWatcher':
+        """Start polling in a daemon thread"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="nfl-data-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop polling and wait for a rebuild in progress to finish"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -1,24 +1,92 @@
 import pandas as pd
 import numpy as np
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Sequence, Tuple
 import os
+from .columnar_store import (SCHEMA_FILE, load_columnar, matches_source, read_store_schema, save_columnar,
+                             store_path_for)
+from .data_processor import compact_dtypes
+from .player_search import PlayerSearchIndex
+from .player_store import Player, PlayerStore
+
+def partition_players(players: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, slice], Dict[str, np.ndarray]]:
+    """
+    Lay out a player table as contiguous per-position partitions
+    
+    Rows are stably sorted by position, so each partition keeps the table
+    order, and index labels are kept. Rows without a position go last.
+    
+    Args:
+        players: Player table with 'name' and 'position' columns
+        
+    Returns:
+        The partitioned table, the row slice of each position in it, and the
+        row positions of each name in it (in the original table order)
+    """
+    codes, positions = pd.factorize(players['position'], sort=True)
+    codes = np.where(codes < 0, len(positions), codes)
+    order = np.argsort(codes, kind='stable')
+    bounds = np.searchsorted(codes[order], np.arange(len(positions) + 1))
+    position_slices = {position: slice(int(bounds[i]), int(bounds[i + 1]))
+                       for i, position in enumerate(positions)}
+    
+    # Where each original row ended up, so a name's rows stay in original order
+    new_rows = np.empty(len(order), dtype=np.intp)
+    new_rows[order] = np.arange(len(order))
+    name_index = {name: new_rows[rows] for name, rows in players.groupby('name', sort=False).indices.items()}
+    
+    return players.take(order), position_slices, name_index
+
+
+# Bump when the expansion output changes so persisted expansions are rebuilt
+EXPANSION_VERSION = 1
+
+# How range filters treat a missing measurement
+MISSING_VALUE_MODES = ('include', 'exclude')
 
 class NFLPlayerData:
-    def __init__(self, data_file: str = "data/processed_combine_data.csv"):
+    def __init__(self, data_file: str = "data/processed_combine_data.csv", compact: bool = False,
+                 persist_expanded: bool = False):
         self.data_file = data_file
+        self.store_dir = store_path_for(data_file)
+        # Use the compact schema (categoricals, float32 measurements, int16 years) for the player table
+        self.compact = compact
+        # Keep the dual-position expansion as a columnar store so later starts can load it directly
+        self.persist_expanded = persist_expanded
+        self.expanded_store_dir = os.path.splitext(data_file)[0] + "_expanded_columns"
         self.players = self._load_data()
+        self._build_layout()
+    
+    def reload(self):
+        """Reload the processed data and rebuild the position partitions and lookup indexes"""
+        self.players = self._load_data()
+        self._build_layout()
     
     def _load_data(self) -> pd.DataFrame:
-        """Load player data from processed CSV file"""
-        if os.path.exists(self.data_file):
+        """Load player data from the processed columnar store, falling back to the CSV file"""
+        has_store = self._has_current_store()
+        if has_store or os.path.exists(self.data_file):
             try:
-                print(f"📊 Loading data from {self.data_file}")
-                players = pd.read_csv(self.data_file)
-                print(f"✅ Loaded {len(players)} players from processed data")
+                signature = self._source_signature(has_store)
+                players = self._load_expanded(signature) if self.persist_expanded else None
+                
+                if players is None:
+                    if has_store:
+                        print(f"📊 Loading data from {self.store_dir}")
+                        players = load_columnar(self.store_dir)
+                    else:
+                        print(f"📊 Loading data from {self.data_file}")
+                        players = pd.read_csv(self.data_file)
+                    print(f"✅ Loaded {len(players)} players from processed data")
+                    
+                    # Handle dual position players
+                    players = self._expand_dual_positions(players)
+                    print(f"📈 Expanded to {len(players)} total entries (including dual positions)")
+                    
+                    if self.persist_expanded:
+                        self._save_expanded(players, signature)
                 
-                # Handle dual position players
-                players = self._expand_dual_positions(players)
-                print(f"📈 Expanded to {len(players)} total entries (including dual positions)")
+                if self.compact:
+                    players = compact_dtypes(players)
                 
                 return players
             except Exception as e:
@@ -27,62 +95,264 @@ class NFLPlayerData:
         else:
             print(f"📁 Data file {self.data_file} not found")
             print("❌ No data available. Please ensure the processed CSV file exists.")
-            print("💡 Run 'python3 data_processor.py' to process your CSV files first.")
+            print("💡 Run 'python3 -m src.data_processor' to process your CSV files first.")
             raise FileNotFoundError(f"Data file {self.data_file} not found. Please process your CSV files first.")
     
+    def _has_current_store(self) -> bool:
+        """Whether there is a columnar store written together with the current processed CSV"""
+        schema = read_store_schema(self.store_dir)
+        if schema is None:
+            return False
+        if not os.path.exists(self.data_file):
+            # Deployed with the store alone
+            return True
+        if matches_source(schema['metadata'].get('source_csv'), self.data_file):
+            return True
+        print(f"⚠️  {self.data_file} changed after {self.store_dir} was written, loading the CSV")
+        return False
+    
+    def _source_signature(self, has_store: bool) -> Dict:
+        """Identify the processed data behind the expansion (the store is rewritten with a new schema file)"""
+        source = os.path.join(self.store_dir, SCHEMA_FILE) if has_store else self.data_file
+        stat = os.stat(source)
+        return {
+            'version': EXPANSION_VERSION,
+            'source': os.path.abspath(source),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns
+        }
+    
+    def _load_expanded(self, signature: Dict) -> Optional[pd.DataFrame]:
+        """Load the persisted expansion if it was built from the current processed data"""
+        schema = read_store_schema(self.expanded_store_dir)
+        if schema is None or schema['metadata'].get('expanded_from') != signature:
+            return None
+        print(f"📊 Loading expanded data from {self.expanded_store_dir}")
+        players = load_columnar(self.expanded_store_dir)
+        print(f"✅ Loaded {len(players)} total entries (including dual positions)")
+        return players
+    
+    def _save_expanded(self, players: pd.DataFrame, signature: Dict):
+        """Persist the expansion next to the processed data"""
+        try:
+            save_columnar(players, self.expanded_store_dir, {'expanded_from': signature})
+        except OSError as e:
+            print(f"⚠️  Could not save expanded data to {self.expanded_store_dir}: {e}")
+    
     def _expand_dual_positions(self, players_df: pd.DataFrame) -> pd.DataFrame:
         """Expand dual position players into separate entries for each position"""
-        expanded_players = []
+        positions = players_df['position']
+        is_dual = positions.str.contains('/', regex=False, na=False)
         
-        for _, player in players_df.iterrows():
-            position = player['position']
-            
-            # Check if player has dual positions (e.g., "CB/WR")
-            if '/' in str(position):
-                positions = [pos.strip() for pos in position.split('/')]
-                print(f"🔄 Expanding {player['name']}: {position} → {positions}")
-                
-                # Create separate entry for each position
-                for pos in positions:
-                    player_copy = player.copy()
-                    player_copy['position'] = pos
-                    player_copy['original_position'] = position  # Keep track of original
-                    expanded_players.append(player_copy)
-            else:
-                # Single position player
-                player_copy = player.copy()
-                player_copy['original_position'] = position
-                expanded_players.append(player_copy)
+        for name, position in zip(players_df.loc[is_dual, 'name'], positions[is_dual]):
+            print(f"🔄 Expanding {name}: {position} → {[pos.strip() for pos in position.split('/')]}")
+        
+        # Dual positions (e.g., "CB/WR") become one entry per position, keeping track of the original
+        expanded = players_df.assign(
+            position=positions.str.split('/').where(is_dual, positions),
+            original_position=positions
+        ).explode('position', ignore_index=True)
         
-        return pd.DataFrame(expanded_players)
+        if is_dual.any():
+            dual_rows = expanded['original_position'].str.contains('/', regex=False, na=False)
+            expanded.loc[dual_rows, 'position'] = expanded.loc[dual_rows, 'position'].str.strip()
+        expanded['position'] = expanded['position'].infer_objects()
+        
+        return expanded
     
-
+    def _build_layout(self):
+        """Partition the loaded table by position and index lookups into it"""
+        self.players, self.position_slices, self.name_index = partition_players(self.players)
+        # Rows of one (name, position) pair share a partition, where table order is kept
+        self.name_position_index = self.players.groupby(['name', 'position'], sort=False, observed=True).indices
+        # Partitioned rows in load order, for listings that keep the file order
+        self._load_order = np.argsort(self.players.index.to_numpy(), kind='stable')
+        # First entry of each name and of each (name, position) pair, for batch lookups in one index join
+        self._first_row_by_name = pd.Series([rows[0] for rows in self.name_index.values()],
+                                            index=pd.Index(list(self.name_index), dtype=object))
+        self._first_row_by_pair = pd.Series([rows[0] for rows in self.name_position_index.values()],
+                                            index=pd.MultiIndex.from_tuples(list(self.name_position_index)))
+        # Built on the first search / batch position lookup
+        self._search_index = None
+        self._positions_by_name = None
+        # Built on first use
+        self._player_store = None
+    
+    def get_player_store(self) -> PlayerStore:
+        """Compact array store of the player entries, in the partitioned table's row order"""
+        if self._player_store is None:
+            # Measurements keep the table's precision (float32 only with the compact schema)
+            self._player_store = PlayerStore(self.players, self.position_slices, self.name_index)
+        return self._player_store
+    
+    def rows_in_load_order(self) -> np.ndarray:
+        """Positions of the partitioned table's rows (and store rows) in the order they were loaded"""
+        return self._load_order
+    
+    def get_player(self, player_name: str, position: str = None) -> Optional[Player]:
+        """Lightweight view of a player's first entry (for a position, if given)"""
+        return self.get_player_store().find(player_name, position)
+    
+    def get_player_rows(self, player_name: str, position: str = None) -> pd.DataFrame:
+        """Get a player's entries (one per position for dual position players), optionally for one position"""
+        if position:
+            rows = self.name_position_index.get((player_name, position))
+        else:
+            rows = self.name_index.get(player_name)
+        if rows is None:
+            return self.players.iloc[:0]
+        return self.players.iloc[rows]
     
     def get_players_by_position(self, position: str = None) -> pd.DataFrame:
-        """Get players filtered by position"""
+        """Get players filtered by position (a slice of the partitioned table)"""
         if position:
-            return self.players[self.players['position'] == position]
+            rows = self.position_slices.get(position)
+            if rows is None:
+                return self.players.iloc[:0]
+            return self.players.iloc[rows]
         return self.players
     
     def get_player_names(self, position: str = None) -> List[str]:
         """Get list of player names, optionally filtered by position"""
+        if position:
+            return self.get_players_by_position(position)['name'].tolist()
+        return self.players['name'].to_numpy()[self._load_order].tolist()
+    
+    def search_players(self, query: str, limit: int = 50) -> List[str]:
+        """
+        Autocomplete player names for a search box
+        
+        Args:
+            query: Text typed so far; an empty query lists names alphabetically
+            limit: Maximum number of names to return
+            
+        Returns:
+            Distinct names, those starting with the query first, then by most recent draft year
+        """
+        search_index = self._get_search_index()
+        if not query.strip():
+            return search_index.prefix_names(limit)
+        return search_index.search(query, limit)
+    
+    def fuzzy_search_players(self, query: str, limit: int = 10, max_distance: int = None) -> List[str]:
+        """
+        Find player names close to a misspelled query (e.g. "Jamarr Chase" finds "Ja'Marr Chase")
+        
+        Args:
+            query: Text typed so far
+            limit: Maximum number of names to return
+            max_distance: Edit budget (default grows with the query length)
+            
+        Returns:
+            Distinct names, closest first, then by most recent draft year
+        """
+        return self._get_search_index().fuzzy_search(query, limit, max_distance)
+    
+    def _get_search_index(self) -> PlayerSearchIndex:
+        """Name search index, built on the first search"""
+        if self._search_index is None:
+            years = self.players.groupby('name', sort=False, observed=True)['draft_year'].max()
+            self._search_index = PlayerSearchIndex(years.index.tolist(), years.tolist())
+        return self._search_index
+    
+    def query_players(self, position: str = None, draft_year: int = None,
+                      ranges: Dict[str, Tuple[Optional[float], Optional[float]]] = None,
+                      sort_by: str = None, ascending: bool = True, missing: str = 'include') -> pd.DataFrame:
+        """
+        Filter players by position, draft year and measurement ranges
+        
+        Filters are vectorized masks over the position's partition, so no
+        per-player lookups are made.
+        
+        Args:
+            position: Only this position's entries (one per position for dual position players)
+            draft_year: Only this draft class
+            ranges: Column -> (min, max), inclusive; either bound may be None
+            sort_by: Column to sort by; missing values sort last either way
+            ascending: Sort direction
+            missing: 'include' keeps entries missing a ranged measurement, 'exclude' drops them
+            
+        Returns:
+            Matching player entries, in table order unless sorted
+        """
+        if missing not in MISSING_VALUE_MODES:
+            raise ValueError(f"Unknown missing value mode '{missing}', expected one of {MISSING_VALUE_MODES}")
+        
         players = self.get_players_by_position(position)
-        return players['name'].tolist()
+        mask = np.ones(len(players), dtype=bool)
+        if draft_year is not None:
+            mask &= players['draft_year'].to_numpy() == draft_year
+        
+        for column, (low, high) in (ranges or {}).items():
+            values = players[column].to_numpy(dtype=float, na_value=np.nan)
+            in_range = np.ones(len(players), dtype=bool)
+            if low is not None:
+                in_range &= values >= low
+            if high is not None:
+                in_range &= values <= high
+            if missing == 'include':
+                in_range |= np.isnan(values)
+            mask &= in_range
+        
+        result = players.iloc[np.flatnonzero(mask)]
+        if sort_by:
+            result = result.sort_values(sort_by, ascending=ascending, na_position='last', kind='stable')
+        return result
     
     def get_player_stats(self, player_name: str) -> Dict:
         """Get statistics for a specific player"""
-        player = self.players[self.players['name'] == player_name]
-        if player.empty:
+        rows = self.name_index.get(player_name)
+        if rows is None:
             return None
-        return player.iloc[0].to_dict()
+        return self.players.iloc[rows[0]].to_dict()
+    
+    def get_player_stats_batch(self, player_names: Sequence[str],
+                               positions: Optional[Sequence[Optional[str]]] = None) -> pd.DataFrame:
+        """
+        Get many players' entries in one call
+        
+        Args:
+            player_names: Names to look up (repeats are returned again)
+            positions: Position for each name (e.g. 'WR' for a dual position player);
+                None, or a None entry, takes the player's first entry as get_player_stats does
+                
+        Returns:
+            One row per requested name, in request order, keyed by a leading 'requested_name'
+            column; unknown names and pairs get a row that is empty apart from the key
+        """
+        names = pd.Index(list(player_names), dtype=object)
+        rows = self._first_row_by_name.reindex(names).to_numpy(dtype=float, copy=True)
+        if positions is not None:
+            positions = pd.Index(list(positions), dtype=object)
+            if len(positions) != len(names):
+                raise ValueError(f"Got {len(names)} names but {len(positions)} positions")
+            has_position = positions.notna()
+            pairs = pd.MultiIndex.from_arrays([names[has_position], positions[has_position]])
+            rows[has_position] = self._first_row_by_pair.reindex(pairs).to_numpy(dtype=float)
+        found = ~np.isnan(rows)
+        entries = self.players.iloc[rows[found].astype(np.intp)].set_axis(np.flatnonzero(found))
+        entries = entries.reindex(pd.RangeIndex(len(names)))
+        entries.insert(0, 'requested_name', names.to_numpy())
+        return entries
+    
+    def get_player_positions_batch(self, player_names: Sequence[str]) -> Dict[str, List[str]]:
+        """Get all positions for many players at once (unknown names get an empty list)"""
+        if self._positions_by_name is None:
+            # Each name's distinct positions in load order, as get_player_positions lists them
+            in_load_order = self.players.iloc[self._load_order]
+            self._positions_by_name = in_load_order.groupby('name', sort=False)['position'].unique()
+        names = pd.Index(list(player_names), dtype=object)
+        found = self._positions_by_name.index.get_indexer(names)
+        position_lists = self._positions_by_name.to_numpy()
+        return {name: position_lists[i].tolist() if i >= 0 else [] for name, i in zip(names, found)}
     
     def get_all_positions(self) -> List[str]:
         """Get list of all available positions"""
-        return sorted(self.players['position'].unique().tolist())
+        return sorted(self.position_slices)
     
     def get_player_positions(self, player_name: str) -> List[str]:
         """Get all positions for a specific player (handles dual positions)"""
-        player_entries = self.players[self.players['name'] == player_name]
+        player_entries = self.get_player_rows(player_name)
         if player_entries.empty:
             return []
         
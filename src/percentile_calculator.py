@@ -1,7 +1,10 @@
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Tuple
+import threading
+from typing import Dict, List, Optional, Tuple, Union
 import warnings
+from .nfl_player_data import partition_players
+from .player_store import Player, PlayerStore
 warnings.filterwarnings('ignore')
 
 class PercentileCalculator:
@@ -10,10 +13,30 @@ class PercentileCalculator:
     Handles "lower is better" metrics (40-yard, shuttle, cone) by inverting percentiles.
     """
     
-    def __init__(self, players_df: pd.DataFrame):
-        self.players_df = players_df.copy()
+    def __init__(self, players_df: Union[pd.DataFrame, PlayerStore], position_slices: Optional[Dict[str, slice]] = None,
+                 name_index: Optional[Dict[str, np.ndarray]] = None, lazy: bool = False):
+        """
+        Args:
+            players_df: Player table, or a PlayerStore (e.g. NFLPlayerData.get_player_store())
+            position_slices: Row slice of each position, when players_df is already
+                partitioned by position (as NFLPlayerData.players is)
+            name_index: Row positions of each name in players_df, to go with position_slices
+            lazy: Build each position's tables on first use instead of all of them
+                up front (see warm_up to build the rest in the background)
+        """
+        if isinstance(players_df, PlayerStore):
+            store = players_df
+        else:
+            if position_slices is None or name_index is None:
+                players_df, position_slices, name_index = partition_players(players_df)
+            store = PlayerStore(players_df, position_slices, name_index)
+        self.store = store
         self.percentile_cache = {}
         
+        # Each position's rows are a contiguous block, and each player's rows are indexed by name
+        self.position_slices = store.position_slices
+        self.name_index = store.name_index
+        
         # Define which metrics are "lower is better"
         self.lower_is_better = ['forty_yard', 'shuttle', 'cone']
         
@@ -23,8 +46,73 @@ class PercentileCalculator:
             'broad_jump', 'bench_press', 'shuttle', 'cone'
         ]
         
-        # Calculate percentiles for all positions
-        self._calculate_all_percentiles()
+        # Per-year counts behind era windows; window tables are built on first use
+        self.year_counts = {}
+        self.window_cache = {}
+        # Every entry's own percentiles and RAS score, so reads are row lookups
+        self.entry_percentiles = np.full((len(store), len(self.combine_metrics)), np.nan)
+        self.entry_ras = np.zeros(len(store))
+        
+        # Positions whose tables are built; builds, add_players and reads pairing rows
+        # with the entry matrices happen under the lock
+        self.lazy = lazy
+        self._built = set()
+        self._lock = threading.RLock()
+        self._warm_up_thread = None
+        if not lazy:
+            self.warm_up()
+    
+    def __getstate__(self) -> Dict:
+        # A consistent copy of the tables built so far (a warm-up may still be running)
+        with self._lock:
+            state = self.__dict__.copy()
+            for name in ['percentile_cache', 'year_counts', 'window_cache', '_built']:
+                state[name] = state[name].copy()
+            state['entry_percentiles'] = self.entry_percentiles.copy()
+            state['entry_ras'] = self.entry_ras.copy()
+        del state['_lock'], state['_warm_up_thread']
+        return state
+    
+    def __setstate__(self, state: Dict):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+        self._warm_up_thread = None
+    
+    def _ensure_position(self, position: str) -> bool:
+        """
+        Build a position's tables if they are not built yet
+        
+        Returns:
+            True if the position has entries (and so, now, tables)
+        """
+        if position in self._built:
+            return True
+        if position not in self.position_slices:
+            return False
+        with self._lock:
+            if position not in self._built:
+                self._calculate_position(position)
+                # Marked only once complete, so readers that skip the lock never see a partial build
+                self._built.add(position)
+        return True
+    
+    def warm_up(self, background: bool = False) -> Optional[threading.Thread]:
+        """
+        Build the tables of every position not built yet
+        
+        Args:
+            background: Build in a daemon thread and return right away
+            
+        Returns:
+            The warm-up thread when building in the background
+        """
+        if background:
+            self._warm_up_thread = threading.Thread(target=self.warm_up, name="percentile-warm-up", daemon=True)
+            self._warm_up_thread.start()
+            return self._warm_up_thread
+        for position in list(self.position_slices):
+            self._ensure_position(position)
+        return None
     
     def _calculate_position_weights(self, position: str) -> Dict[str, float]:
         """Calculate feature weights based on position importance"""
@@ -94,61 +182,463 @@ class PercentileCalculator:
         
         return weights
     
-    def _calculate_all_percentiles(self):
-        """Calculate position-specific percentiles for all metrics"""
-        positions = self.players_df['position'].unique()
+    def _calculate_position(self, position: str):
+        """
+        Calculate a position's percentile tables, year counts, and its entries' percentiles and RAS scores
+        
+        Entry percentiles are looked up in the position's tables, which give
+        each value the rank(pct=True) of the position's values (rounded as
+        returned, NaN where a measurement is missing).
+        """
+        rows = self.position_slices[position]
+        self.percentile_cache[position] = {}
+        entry_percentiles = np.full((rows.stop - rows.start, len(self.combine_metrics)), np.nan)
+        
+        for i, metric in enumerate(self.combine_metrics):
+            if metric in self.store.metric_columns:
+                # Get non-null values for this metric and position
+                block = np.asarray(self.store.metric_column(metric)[rows], dtype=float)
+                metric_data = pd.Series(block).dropna()
+                
+                if len(metric_data) > 0:
+                    values, counts = np.unique(metric_data.values, return_counts=True)
+                    cache = self._metric_cache(metric, metric_data, values, counts)
+                    self.percentile_cache[position][metric] = cache
+                    present = ~np.isnan(block)
+                    entry_percentiles[present, i] = np.round(
+                        cache['percentiles'][np.searchsorted(values, block[present])], 1)
+        
+        self.entry_percentiles[rows] = entry_percentiles
+        self.entry_ras[rows] = self._ras_scores(entry_percentiles, self._weight_vector(position))
+        self.year_counts[position] = self._year_counts(self.store, rows, self.percentile_cache[position])
+    
+    def _metric_cache(self, metric: str, metric_data: pd.Series, values: np.ndarray, counts: np.ndarray) -> Dict:
+        """
+        Percentile mapping of one metric at one position
+        
+        Args:
+            metric: Combine metric
+            metric_data: The position's non-null values of the metric
+            values: Its distinct values in ascending order (for binary search)
+            counts: How often each distinct value occurs
+        """
+        return {
+            'values': values,
+            'counts': counts,
+            'percentiles': self._rank_percentiles(metric, counts),
+            'count': len(metric_data),
+            'min_value': metric_data.min(),
+            'max_value': metric_data.max(),
+            'mean_value': metric_data.mean(),
+            'std_value': metric_data.std()
+        }
+    
+    def _rank_percentiles(self, metric: str, counts: np.ndarray) -> np.ndarray:
+        """Percentile of each distinct value from how often each occurs (values ascending)"""
+        # Percentiles as rank(pct=True) gives them: tied values share their average rank
+        below = np.cumsum(counts) - counts
+        percentiles = (below + (counts + 1) / 2) / counts.sum() * 100
+        
+        # For "lower is better" metrics, invert the percentile
+        if metric in self.lower_is_better:
+            percentiles = 100 - percentiles
+        return percentiles
+    
+    def _draft_years(self, rows: slice, store: Optional[PlayerStore] = None) -> np.ndarray:
+        """Draft years of entries as floats (NaN when unknown, or the table has no draft years)"""
+        store = self.store if store is None else store
+        if 'draft_year' not in store.identities:
+            return np.full(rows.stop - rows.start, np.nan)
+        return np.asarray(store.identity_column('draft_year', rows), dtype=float)
+    
+    def _year_counts(self, store: PlayerStore, rows: slice, position_cache: Dict) -> Dict:
+        """
+        Cumulative counts of each distinct value by draft year, for era windows
+        
+        For each metric, cumulative[i, k] counts the position's entries drafted
+        in the first i of its draft years with the k-th distinct value, so the
+        counts of any year window are the difference of two rows. Entries
+        without a draft year are left out of windows.
+        
+        Returns:
+            {'years': sorted draft years, 'cumulative': metric -> counts}
+        """
+        draft_years = self._draft_years(rows, store)
+        dated = ~np.isnan(draft_years)
+        years = np.unique(draft_years[dated])
+        cumulative = {}
+        for metric, cache in position_cache.items():
+            block = np.asarray(store.metric_column(metric)[rows], dtype=float)
+            present = dated & ~np.isnan(block)
+            n_values = len(cache['values'])
+            cells = (np.searchsorted(years, draft_years[present]) * n_values
+                     + np.searchsorted(cache['values'], block[present]))
+            counts = np.bincount(cells, minlength=len(years) * n_values).reshape(len(years), n_values)
+            cumulative[metric] = np.vstack([np.zeros((1, n_values), dtype=np.int32),
+                                            np.cumsum(counts, axis=0, dtype=np.int32)])
+        return {'years': years, 'cumulative': cumulative}
+    
+    def _year_bounds(self, position: str, years: Tuple[Optional[int], Optional[int]]) -> Tuple[int, int]:
+        """Rows of a position's cumulative counts that bound a (first, last) draft year window"""
+        first, last = years
+        draft_years = self.year_counts[position]['years']
+        lo = 0 if first is None else int(np.searchsorted(draft_years, first, side='left'))
+        hi = len(draft_years) if last is None else int(np.searchsorted(draft_years, last, side='right'))
+        return lo, max(lo, hi)
+    
+    def _metric_table(self, position: str, metric: str,
+                      years: Optional[Tuple[Optional[int], Optional[int]]] = None) -> Optional[Dict]:
+        """
+        Sorted values and percentiles of a metric at a position, optionally within a draft year window
         
-        for position in positions:
-            pos_data = self.players_df[self.players_df['position'] == position]
-            self.percentile_cache[position] = {}
+        A window's table comes from the difference of two rows of cumulative
+        counts, and is kept for later lookups in the same window.
+        
+        Returns:
+            Dict with 'values' and 'percentiles', or None without data
+        """
+        self._ensure_position(position)
+        metric_cache = self.percentile_cache.get(position, {}).get(metric)
+        if not metric_cache or years is None:
+            return metric_cache
+        
+        lo, hi = self._year_bounds(position, years)
+        key = (position, metric, lo, hi)
+        table = self.window_cache.get(key)
+        if table is None:
+            cumulative = self.year_counts[position]['cumulative'][metric]
+            counts = cumulative[hi] - cumulative[lo]
+            present = counts > 0
+            if not present.any():
+                return None
+            table = {'values': metric_cache['values'][present],
+                     'percentiles': self._rank_percentiles(metric, counts[present])}
+            self.window_cache[key] = table
+        return table
+    
+    def _in_years(self, rows: slice, years: Tuple[Optional[int], Optional[int]]) -> np.ndarray:
+        """Which entries in rows were drafted within a (first, last) window"""
+        first, last = years
+        draft_years = self._draft_years(rows)
+        with np.errstate(invalid='ignore'):
+            return ((draft_years >= (-np.inf if first is None else first))
+                    & (draft_years <= (np.inf if last is None else last)))
+    
+    def _window_percentiles(self, position: str, rows: slice,
+                            years: Tuple[Optional[int], Optional[int]]) -> np.ndarray:
+        """Percentile rows of entries against a position's entries drafted within a window"""
+        percentiles = np.full((rows.stop - rows.start, len(self.combine_metrics)), np.nan)
+        for i, metric in enumerate(self.combine_metrics):
+            if metric not in self.store.metric_columns:
+                continue
+            block = np.asarray(self.store.metric_column(metric)[rows], dtype=float)
+            present = ~np.isnan(block)
+            percentile = self.percentile_of(position, metric, block[present], years=years)
+            if percentile is not None:
+                percentiles[present, i] = np.round(percentile, 1)
+        return percentiles
+    
+    def _weight_vector(self, position: str) -> np.ndarray:
+        """A position's weight for each combine metric"""
+        weights = self._calculate_position_weights(position)
+        return np.array([weights.get(metric, 1.0) for metric in self.combine_metrics])
+    
+    def _ras_scores(self, percentiles: np.ndarray, weights: np.ndarray) -> np.ndarray:
+        """
+        RAS scores of entries from their percentile rows (0 without percentiles)
+        
+        Accumulated metric by metric, in the same order get_ras_score always
+        summed them, so scores round the same way.
+        """
+        weighted_sum = np.zeros(len(percentiles))
+        total_weight = np.zeros(len(percentiles))
+        for i in range(len(self.combine_metrics)):
+            available = ~np.isnan(percentiles[:, i])
+            weighted_sum += np.where(available, percentiles[:, i] * weights[..., i], 0.0)
+            total_weight += np.where(available, weights[..., i], 0.0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(total_weight > 0, np.round(weighted_sum / total_weight, 1), 0.0)
+    
+    def add_players(self, players: pd.DataFrame) -> pd.DataFrame:
+        """
+        Add entries (e.g. a new draft class) without re-ranking the existing ones
+        
+        The new measurements are merged into each receiving position's sorted
+        distinct values and counts, and that position's percentile tables,
+        entry percentiles and RAS scores are refreshed from them. Positions
+        without new entries are untouched. The result matches building the
+        calculator from the combined table. The calculator moves to a new
+        store; the store (and NFLPlayerData) it was built from is not changed.
+        
+        Args:
+            players: New entries, with the player table's columns
             
-            for metric in self.combine_metrics:
-                if metric in pos_data.columns:
-                    # Get non-null values for this metric and position
-                    metric_data = pos_data[metric].dropna()
+        Returns:
+            Existing entries whose percentiles moved, one row per entry and metric:
+            name, position, metric, old_percentile, new_percentile (NaN when the
+            entry has no value)
+        """
+        with self._lock:
+            # Lazily built positions that gain entries need their tables to merge into
+            for position in players['position'].dropna().unique():
+                self._ensure_position(position)
+            
+            # The grown state is built aside and published in one step below, so readers
+            # never pair the new store with the old entry matrices or tables
+            store, old_rows = self.store.append(players)
+            n_metrics = len(self.combine_metrics)
+            previous = np.full((len(store), n_metrics), np.nan)
+            previous[old_rows] = self.entry_percentiles
+            entry_percentiles = previous.copy()
+            entry_ras = np.zeros(len(store))
+            entry_ras[old_rows] = self.entry_ras
+            percentile_cache = dict(self.percentile_cache)
+            year_counts = dict(self.year_counts)
+            
+            added_counts = players['position'].value_counts()
+            for position, added in added_counts.items():
+                rows = store.position_slices[position]
+                cache = dict(percentile_cache.get(position, {}))
+                
+                for i, metric in enumerate(self.combine_metrics):
+                    if metric not in store.metric_columns:
+                        continue
+                    block = np.asarray(store.metric_column(metric)[rows], dtype=float)
+                    # New entries sit at the end of their position's block
+                    new_values = block[len(block) - added:]
+                    new_values = new_values[~np.isnan(new_values)]
+                    if len(new_values) == 0:
+                        continue
                     
-                    if len(metric_data) > 0:
-                        # Calculate percentiles
-                        percentiles = metric_data.rank(pct=True) * 100
-                        
-                        # For "lower is better" metrics, invert the percentile
-                        if metric in self.lower_is_better:
-                            percentiles = 100 - percentiles
-                        
-                        # Store the percentile mapping
-                        self.percentile_cache[position][metric] = {
-                            'values': metric_data.values,
-                            'percentiles': percentiles.values,
-                            'min_value': metric_data.min(),
-                            'max_value': metric_data.max(),
-                            'mean_value': metric_data.mean(),
-                            'std_value': metric_data.std()
-                        }
+                    values, counts = np.unique(new_values, return_counts=True)
+                    if metric in cache:
+                        values, merged = np.unique(np.concatenate([cache[metric]['values'], values]),
+                                                   return_inverse=True)
+                        counts = np.bincount(merged, weights=np.concatenate([cache[metric]['counts'], counts]),
+                                             minlength=len(values)).astype(np.int64)
+                    cache[metric] = self._metric_cache(metric, pd.Series(block).dropna(), values, counts)
+                    
+                    present = ~np.isnan(block)
+                    column = np.full(len(block), np.nan)
+                    column[present] = np.round(cache[metric]['percentiles'][np.searchsorted(values, block[present])], 1)
+                    entry_percentiles[rows, i] = column
+                
+                percentile_cache[position] = cache
+                entry_ras[rows] = self._ras_scores(entry_percentiles[rows], self._weight_vector(position))
+                year_counts[position] = self._year_counts(store, rows, cache)
+            
+            self.__dict__.update({
+                'store': store,
+                'position_slices': store.position_slices,
+                'name_index': store.name_index,
+                'percentile_cache': percentile_cache,
+                'year_counts': year_counts,
+                'window_cache': {},
+                'entry_percentiles': entry_percentiles,
+                'entry_ras': entry_ras,
+                '_built': self._built | set(added_counts.index),
+            })
+            
+            # Report existing entries whose percentiles changed
+            before, after = previous[old_rows], entry_percentiles[old_rows]
+            moved = (before != after) & ~(np.isnan(before) & np.isnan(after))
+            entries, metrics = np.nonzero(moved)
+            rows = old_rows[entries]
+            return pd.DataFrame({
+                'name': store.identity_column('name', rows),
+                'position': store.identity_column('position', rows),
+                'metric': np.array(self.combine_metrics, dtype=object)[metrics],
+                'old_percentile': before[entries, metrics],
+                'new_percentile': after[entries, metrics]
+            })
+    
+    def _entry_percentiles(self, row: int) -> Dict[str, float]:
+        """Percentiles of one entry within its own position"""
+        return self._percentile_dict(self.entry_percentiles[row])
     
-    def get_player_percentiles(self, player_name: str, position: str = None) -> Dict[str, float]:
+    def _percentile_dict(self, percentiles: np.ndarray) -> Dict[str, float]:
+        """Metric -> percentile for a percentile row, without the missing metrics"""
+        return {metric: percentile for metric, percentile in zip(self.combine_metrics, percentiles)
+                if not np.isnan(percentile)}
+    
+    def _weighted_score(self, percentiles: Dict[str, float], position: str) -> float:
+        """Weighted average of percentiles with a position's weights"""
+        if not percentiles:
+            return 0.0
+        
+        # Get position-specific weights
+        weights = self._calculate_position_weights(position)
+        
+        # Calculate weighted average
+        weighted_sum = 0.0
+        total_weight = 0.0
+        
+        for metric, percentile in percentiles.items():
+            weight = weights.get(metric, 1.0)
+            weighted_sum += percentile * weight
+            total_weight += weight
+        
+        if total_weight == 0:
+            return 0.0
+        
+        # Calculate weighted Athlete Score
+        athlete_score = weighted_sum / total_weight
+        return round(athlete_score, 1)
+    
+    def _get_player_row(self, player_name: str) -> Optional[Player]:
+        """First entry for a player, or None if the player is unknown"""
+        return self.store.find(player_name)
+    
+    def percentile_of(self, position: str, metric: str, value, interpolate: bool = False,
+                      years: Optional[Tuple[Optional[int], Optional[int]]] = None):
+        """
+        Position-specific percentile of any value of a metric, by binary search
+        
+        Args:
+            position: Position to compare against
+            metric: Combine metric
+            value: A value, or an array of values (need not appear in the data)
+            interpolate: Interpolate linearly between the percentiles of the neighboring
+                values instead of taking the closest one (ties go to the lower value);
+                values outside the observed range get the end percentiles
+            years: Only compare against entries drafted in this (first, last) window,
+                inclusive; either end may be None (e.g. (2015, None))
+                
+        Returns:
+            The percentile (an array for an array of values), or None when the
+            position has no data for the metric (in the window)
+        """
+        metric_cache = self._metric_table(position, metric, years)
+        if not metric_cache:
+            return None
+        values = metric_cache['values']
+        percs = metric_cache['percentiles']
+        value = np.asarray(value, dtype=float)
+        
+        if interpolate:
+            percentile = np.interp(value, values, percs)
+        else:
+            # values[above - 1] < value <= values[above]
+            above = np.searchsorted(values, value)
+            lower = np.clip(above - 1, 0, len(values) - 1)
+            upper = np.minimum(above, len(values) - 1)
+            closest = np.where(np.abs(values[upper] - value) < np.abs(value - values[lower]), upper, lower)
+            percentile = percs[closest]
+        
+        return percentile[()] if percentile.ndim == 0 else percentile
+    
+    def evaluate_measurements(self, measurements: Dict[str, float], position: str,
+                              interpolate: bool = False,
+                              years: Optional[Tuple[Optional[int], Optional[int]]] = None) -> Dict:
+        """
+        Percentiles and RAS score of hypothetical measurements (e.g. a prospect's projections)
+
+        Args:
+            measurements: Combine metric -> value; other keys and missing values are ignored
+            position: Position to compare against
+            interpolate: Passed on to percentile_of
+            years: Rank against the position's entries drafted in this (first, last)
+                window only (either end may be None); all years if None
+
+        Returns:
+            {'percentiles': {metric: percentile}, 'ras_score': float}, ranked the
+            way get_player_percentiles ranks a player against another position
+        """
+        row = pd.DataFrame([{metric: measurements.get(metric) for metric in self.combine_metrics}])
+        result = self.evaluate_measurements_batch(row, position, interpolate, years).iloc[0]
+        return {
+            'percentiles': {metric: result[metric] for metric in self.combine_metrics if not pd.isna(result[metric])},
+            'ras_score': result['ras_score']
+        }
+
+    def evaluate_measurements_batch(self, measurements: pd.DataFrame, position: str = None,
+                                    interpolate: bool = False,
+                                    years: Optional[Tuple[Optional[int], Optional[int]]] = None) -> pd.DataFrame:
+        """
+        Percentiles and RAS scores of many hypothetical measurement lines at once
+
+        Each metric is one vectorized binary search over the position's sorted
+        values, so a projection grid of thousands of lines costs a handful of
+        array operations.
+
+        Args:
+            measurements: One line per row, with combine metric columns (missing
+                columns and NaN values count as not measured)
+            position: Position to compare every line against; if None, each
+                line's own 'position' column is used
+            interpolate: Passed on to percentile_of
+            years: Rank against the position's entries drafted in this (first, last)
+                window only (either end may be None); all years if None
+
+        Returns:
+            DataFrame on measurements' index with a percentile column per combine
+            metric (NaN where not measured or the position has no data) and ras_score
+        """
+        n = len(measurements)
+        if position is not None:
+            positions = pd.Series(position, index=measurements.index)
+        elif 'position' in measurements.columns:
+            positions = measurements['position']
+        else:
+            raise ValueError("Give a position or a 'position' column")
+
+        percentiles = np.full((n, len(self.combine_metrics)), np.nan)
+        ras_scores = np.zeros(n)
+        for line_position, lines in positions.groupby(positions, sort=False).indices.items():
+            if not self._ensure_position(line_position):
+                continue
+            for i, metric in enumerate(self.combine_metrics):
+                if metric not in measurements.columns:
+                    continue
+                values = pd.to_numeric(measurements[metric].iloc[lines], errors='coerce').to_numpy(dtype=float)
+                present = ~np.isnan(values)
+                percentile = self.percentile_of(line_position, metric, values[present], interpolate, years)
+                if percentile is not None:
+                    column = np.full(len(lines), np.nan)
+                    column[present] = np.round(percentile, 1)
+                    percentiles[lines, i] = column
+            ras_scores[lines] = self._ras_scores(percentiles[lines], self._weight_vector(line_position))
+
+        result = pd.DataFrame(percentiles, columns=self.combine_metrics, index=measurements.index)
+        result['ras_score'] = ras_scores
+        return result
+
+    def get_player_percentiles(self, player_name: str, position: str = None,
+                               years: Optional[Tuple[Optional[int], Optional[int]]] = None) -> Dict[str, float]:
         """
         Get position-specific percentiles for a player
         
         Args:
             player_name: Name of the player
             position: Position to use (if None, will use player's position)
+            years: Rank against the position's entries drafted in this (first, last)
+                window only (either end may be None); all years if None
             
         Returns:
             Dictionary with metric names as keys and percentiles as values
         """
         # Get player data
-        player_data = self.players_df[self.players_df['name'] == player_name]
+        player = self._get_player_row(player_name)
         
-        if player_data.empty:
+        if player is None:
             return {}
         
-        player = player_data.iloc[0]
         if position is None:
             position = player['position']
         
-        if position not in self.percentile_cache:
+        if not self._ensure_position(position):
             return {}
         
+        # The player's entry at this position has its percentiles precomputed
+        # (its row and the entry matrix are read together, under the lock add_players publishes with)
+        with self._lock:
+            rows = self.store.rows_for(player_name, position)
+            if len(rows):
+                if years is None:
+                    return self._entry_percentiles(rows[0])
+                player = self.store.player(rows[0])
+        
+        # Otherwise rank the entry (the first one, if none is at this position) against the position
         percentiles = {}
         
         for metric in self.combine_metrics:
@@ -156,75 +646,56 @@ class PercentileCalculator:
                 player_value = player[metric]
                 
                 # Find the percentile for this value
-                metric_cache = self.percentile_cache[position].get(metric)
-                if metric_cache:
-                    # Find closest value and get its percentile
-                    values = metric_cache['values']
-                    percs = metric_cache['percentiles']
-                    
-                    # Find the index of the closest value
-                    closest_idx = np.argmin(np.abs(values - player_value))
-                    percentile = percs[closest_idx]
-                    
+                percentile = self.percentile_of(position, metric, player_value, years=years)
+                if percentile is not None:
                     percentiles[metric] = round(percentile, 1)
         
         return percentiles
     
-    def get_ras_score(self, player_name: str, position: str = None) -> float:
+    def get_ras_score(self, player_name: str, position: str = None,
+                      years: Optional[Tuple[Optional[int], Optional[int]]] = None) -> float:
         """
         Calculate weighted Athlete Score for a player using position-specific weights
         
         Args:
             player_name: Name of the player
             position: Position to use (if None, will use player's position)
+            years: Rank against the position's entries drafted in this (first, last)
+                window only (either end may be None); all years if None
             
         Returns:
             Weighted Athlete Score (weighted average of available percentiles)
         """
-        percentiles = self.get_player_percentiles(player_name, position)
-        
-        if not percentiles:
+        player = self._get_player_row(player_name)
+        if player is None:
             return 0.0
         
         # Get player position for weights
         if position is None:
-            player_data = self.players_df[self.players_df['name'] == player_name]
-            if player_data.empty:
-                return 0.0
-            position = player_data.iloc[0]['position']
-        
-        # Get position-specific weights
-        weights = self._calculate_position_weights(position)
-        
-        # Calculate weighted average
-        weighted_sum = 0.0
-        total_weight = 0.0
-        
-        for metric, percentile in percentiles.items():
-            weight = weights.get(metric, 1.0)
-            weighted_sum += percentile * weight
-            total_weight += weight
-        
-        if total_weight == 0:
-            return 0.0
+            position = player['position']
         
-        # Calculate weighted Athlete Score
-        athlete_score = weighted_sum / total_weight
-        return round(athlete_score, 1)
+        with self._lock:
+            rows = self.store.rows_for(player_name, position)
+            if len(rows) and years is None and self._ensure_position(position):
+                return self.entry_ras[rows[0]]
+        return self._weighted_score(self.get_player_percentiles(player_name, position, years), position)
     
-    def get_percentile_explanation(self, player_name: str, position: str = None) -> str:
+    def get_percentile_explanation(self, player_name: str, position: str = None,
+                                   years: Optional[Tuple[Optional[int], Optional[int]]] = None) -> str:
         """
         Get a human-readable explanation of a player's percentiles
         
         Args:
             player_name: Name of the player
             position: Position to use (if None, will use player's position)
+            years: Rank against the position's entries drafted in this (first, last)
+                window only (either end may be None); all years if None
             
         Returns:
             String explanation of the player's athletic profile
         """
-        percentiles = self.get_player_percentiles(player_name, position)
-        ras_score = self.get_ras_score(player_name, position)
+        percentiles = self.get_player_percentiles(player_name, position, years)
+        ras_score = self.get_ras_score(player_name, position, years)
         
         if not percentiles:
             return "No percentile data available for this player."
@@ -257,7 +728,7 @@ class PercentileCalculator:
         Returns:
             Dictionary with metric statistics for the position
         """
-        if position not in self.percentile_cache:
+        if not self._ensure_position(position):
             return {}
         
         stats = {}
@@ -267,13 +738,14 @@ class PercentileCalculator:
                 'max': cache['max_value'],
                 'mean': cache['mean_value'],
                 'std': cache['std_value'],
-                'count': len(cache['values'])
+                'count': cache['count']
             }
         
         return stats
     
     def get_similar_percentile_players(self, player_name: str, position: str = None, 
-                                     num_similar: int = 5) -> List[Dict]:
+                                     num_similar: int = 5,
+                                     years: Optional[Tuple[Optional[int], Optional[int]]] = None) -> List[Dict]:
         """
         Find players with similar percentile profiles
         
@@ -281,63 +753,72 @@ class PercentileCalculator:
             player_name: Name of the target player
             position: Position to use (if None, will use player's position)
             num_similar: Number of similar players to return
+            years: Only consider players drafted in this (first, last) window, with
+                everyone's percentiles ranked within it; all years if None
             
         Returns:
             List of similar players with their percentile profiles
         """
-        target_percentiles = self.get_player_percentiles(player_name, position)
+        target_percentiles = self.get_player_percentiles(player_name, position, years)
         
         if not target_percentiles:
             return []
         
         if position is None:
-            player_data = self.players_df[self.players_df['name'] == player_name]
-            if not player_data.empty:
-                position = player_data.iloc[0]['position']
+            player = self._get_player_row(player_name)
+            if player is not None:
+                position = player['position']
         
-        if position not in self.percentile_cache:
+        if not self._ensure_position(position):
             return []
         
-        # Get all players in the same position
-        pos_players = self.players_df[self.players_df['position'] == position]
+        if num_similar <= 0:
+            return []
         
-        similarities = []
+        # Percentiles of everyone at the position: one contiguous block of the entry matrix
+        with self._lock:
+            store, pos_rows = self.store, self.position_slices[position]
+            if years is None:
+                candidates = self.entry_percentiles[pos_rows]
+                ras_scores = self.entry_ras[pos_rows]
+            else:
+                candidates = self._window_percentiles(position, pos_rows, years)
+                ras_scores = self._ras_scores(candidates, self._weight_vector(position))
+                in_years = self._in_years(pos_rows, years)
+        target = np.array([target_percentiles.get(metric, np.nan) for metric in self.combine_metrics])
+        
+        # Average absolute difference over the metrics both have (at least 2 to compare)
+        shared = ~np.isnan(candidates) & ~np.isnan(target)
+        shared_counts = shared.sum(axis=1)
+        total_diff = np.where(shared, np.abs(candidates - target), 0.0).sum(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            similarity = np.maximum(0, 100 - total_diff / shared_counts)  # Convert to similarity score
+        names = store.identity_column('name', pos_rows)
+        eligible = (shared_counts >= 2) & (names != player_name)
+        if years is not None:
+            eligible &= in_years
+        eligible = np.flatnonzero(eligible)
+        scores = similarity[eligible]
+        
+        # Top results, highest first; ties keep table order, including at the cut-off
+        if len(eligible) > num_similar:
+            cutoff = np.partition(scores, len(scores) - num_similar)[len(scores) - num_similar]
+            eligible, scores = eligible[scores >= cutoff], scores[scores >= cutoff]
+        top = eligible[np.lexsort((eligible, -scores))[:num_similar]]
         
-        for _, player in pos_players.iterrows():
-            if player['name'] == player_name:
-                continue
-            
-            player_percentiles = self.get_player_percentiles(player['name'], position)
-            
-            if not player_percentiles:
-                continue
-            
-            # Calculate similarity based on shared metrics
-            shared_metrics = set(target_percentiles.keys()) & set(player_percentiles.keys())
-            
-            if len(shared_metrics) < 2:  # Need at least 2 metrics to compare
-                continue
-            
-            # Calculate average absolute difference in percentiles
-            total_diff = 0
-            for metric in shared_metrics:
-                diff = abs(target_percentiles[metric] - player_percentiles[metric])
-                total_diff += diff
-            
-            avg_diff = total_diff / len(shared_metrics)
-            similarity_score = max(0, 100 - avg_diff)  # Convert to similarity score
-            
+        similarities = []
+        for i in top:
+            row = pos_rows.start + i
+            player = store.player(row)
             similarities.append({
                 'name': player['name'],
                 'position': player['position'],
                 'college': player.get('college', 'N/A'),
                 'draft_year': player.get('draft_year', 'N/A'),
-                'similarity_score': similarity_score,
-                'percentiles': player_percentiles,
-                'ras_score': self.get_ras_score(player['name'], position),
-                'shared_metrics': len(shared_metrics)
+                'similarity_score': similarity[i],
+                'percentiles': self._percentile_dict(candidates[i]),
+                'ras_score': ras_scores[i],
+                'shared_metrics': int(shared_counts[i])
             })
         
-        # Sort by similarity score and return top results
-        similarities.sort(key=lambda x: x['similarity_score'], reverse=True)
-        return similarities[:num_similar] 
\ No newline at end of file
+        return similarities
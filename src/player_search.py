@@ -0,0 +1,202 @@
+import numpy as np
+import re
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence
+
+# Longest n-gram kept in the postings; longer queries intersect their n-grams and verify
+MAX_GRAM = 3
+
+# Name normalization for fuzzy search: "Ja'Marr Chase" and "A.J. Brown" match "jamarr chase", "aj brown"
+DROPPED_CHARACTERS = re.compile(r"[.'`\u2018\u2019]")
+SEPARATOR_CHARACTERS = re.compile(r"[^a-z0-9]+")
+# Fuzzy trigrams are padded at the start only, so a name's prefixes share its trigrams
+FUZZY_PADDING = "^^"
+
+
+def normalize_name(name: str) -> str:
+    """Lower-case a name, drop apostrophes and periods, and turn other punctuation into single spaces"""
+    name = DROPPED_CHARACTERS.sub('', name.lower())
+    return SEPARATOR_CHARACTERS.sub(' ', name).strip()
+
+
+def _fuzzy_trigrams(normalized: str) -> set:
+    """Distinct trigrams of a normalized name"""
+    padded = FUZZY_PADDING + normalized
+    return {padded[start:start + 3] for start in range(len(padded) - 2)}
+
+
+def prefix_edit_distances(query: bytes, names: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """
+    Levenshtein distance from a query to the closest prefix of each name (the whole name included)
+    
+    Args:
+        query: Normalized query as ASCII bytes
+        names: Normalized names as a zero-padded uint8 matrix, one row per name
+        lengths: Length of each name
+        
+    Returns:
+        Distance per name
+    """
+    columns = np.arange(names.shape[1] + 1)
+    # Row i of the DP table (query[:i] against every name prefix), for all names at once
+    row = np.broadcast_to(columns, (len(names), len(columns)))
+    for i, char in enumerate(query, 1):
+        best = np.empty_like(row)
+        best[:, 0] = i
+        # Substitution or match, and deletion
+        np.minimum(row[:, :-1] + (names != char), row[:, 1:] + 1, out=best[:, 1:])
+        # Insertions chain along the row: cell j is min over k <= j of best[k] + (j - k)
+        row = np.minimum.accumulate(best - columns, axis=1) + columns
+    # Only prefixes that exist count; padding columns are masked out
+    return np.where(columns <= lengths[:, None], row, np.iinfo(row.dtype).max).min(axis=1)
+
+
+class PlayerSearchIndex:
+    """
+    Autocomplete index over player names.
+
+    Names get ids in ranking order (most recent draft year first, then
+    alphabetical), so every id list below is already sorted by rank:
+    - a prefix index: lower-cased names sorted for bisection, with their ids
+    - n-gram postings: every 1..MAX_GRAM character substring of a name,
+      mapped to the ids of the names that contain it
+    A search ranks names that start with the query first, then names that
+    contain it elsewhere, each by recency.
+    """
+
+    def __init__(self, names: Sequence[str], draft_years: Sequence[int]):
+        """
+        Args:
+            names: Distinct player names
+            draft_years: Draft year of each name (the most recent one for shared names)
+        """
+        ranked = sorted(zip(names, draft_years), key=lambda entry: (-entry[1], entry[0].lower(), entry[0]))
+        self.names = [name for name, _ in ranked]
+        self.lower_names = [name.lower() for name in self.names]
+
+        # Prefix index: lower-cased names in alphabetical order, with the id of each
+        prefix_order = sorted(range(len(self.names)), key=lambda i: (self.lower_names[i], i))
+        self.prefix_keys = [self.lower_names[i] for i in prefix_order]
+        self.prefix_ids = np.array(prefix_order, dtype=np.int32)
+
+        # N-gram postings, filled in id order so each list comes out sorted
+        postings: Dict[str, List[int]] = {}
+        for i, name in enumerate(self.lower_names):
+            grams = {name[start:start + size]
+                     for size in range(1, MAX_GRAM + 1)
+                     for start in range(len(name) - size + 1)}
+            for gram in grams:
+                postings.setdefault(gram, []).append(i)
+        self.postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+
+        # Fuzzy trigram postings over normalized names
+        self.normalized_names = [normalize_name(name) for name in self.names]
+        fuzzy_postings: Dict[str, List[int]] = {}
+        for i, name in enumerate(self.normalized_names):
+            for gram in _fuzzy_trigrams(name):
+                fuzzy_postings.setdefault(gram, []).append(i)
+        self.fuzzy_postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in fuzzy_postings.items()}
+        # Normalized names are ASCII, so they fit a zero-padded byte matrix for the edit distance
+        self.normalized_lengths = np.array([len(name) for name in self.normalized_names], dtype=np.int32)
+        self.normalized_chars = np.zeros((len(self.names), int(self.normalized_lengths.max(initial=0))),
+                                         dtype=np.uint8)
+        for i, name in enumerate(self.normalized_names):
+            self.normalized_chars[i, :len(name)] = np.frombuffer(name.encode('ascii'), dtype=np.uint8)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _prefix_matches(self, query: str) -> np.ndarray:
+        """Ids of names starting with the query, in rank order"""
+        lo = bisect_left(self.prefix_keys, query)
+        # Every key starting with the query sorts below query + the highest code point
+        hi = bisect_left(self.prefix_keys, query + '\U0010ffff', lo)
+        return np.sort(self.prefix_ids[lo:hi])
+
+    def _substring_candidates(self, query: str) -> np.ndarray:
+        """Ids of names that may contain the query, in rank order"""
+        if len(query) <= MAX_GRAM:
+            return self.postings.get(query, np.empty(0, dtype=np.int32))
+
+        grams = {query[start:start + MAX_GRAM] for start in range(len(query) - MAX_GRAM + 1)}
+        lists = sorted((self.postings.get(gram, np.empty(0, dtype=np.int32)) for gram in grams), key=len)
+        candidates = lists[0]
+        for ids in lists[1:]:
+            if len(candidates) == 0:
+                break
+            candidates = np.intersect1d(candidates, ids, assume_unique=True)
+        return candidates
+
+    def prefix_names(self, limit: int) -> List[str]:
+        """First names in alphabetical order, for an empty search box"""
+        return [self.names[i] for i in self.prefix_ids[:limit]]
+
+    def search(self, query: str, limit: int = 50) -> List[str]:
+        """
+        Find names matching a search box query
+
+        Args:
+            query: Text typed so far (case-insensitive)
+            limit: Maximum number of names to return
+
+        Returns:
+            Matching names, prefix matches first, each group by most recent draft year
+        """
+        query = query.strip().lower()
+        if not query or limit <= 0:
+            return []
+
+        prefix = self._prefix_matches(query)[:limit]
+        results = [self.names[i] for i in prefix]
+        if len(results) >= limit:
+            return results
+
+        for i in self._substring_candidates(query):
+            name = self.lower_names[i]
+            # Prefix matches are already in; longer queries still need verifying
+            if name.startswith(query) or query not in name:
+                continue
+            results.append(self.names[i])
+            if len(results) >= limit:
+                break
+        return results
+
+    def fuzzy_search(self, query: str, limit: int = 10, max_distance: Optional[int] = None) -> List[str]:
+        """
+        Find names close to a misspelled or differently punctuated query
+
+        Names are compared after normalization, against the whole name and its
+        prefixes, so a partly typed name still matches. A trigram count filter
+        picks the candidates: each edit breaks at most three of the query's
+        trigrams, so a name within the budget shares all but 3 * max_distance of
+        them. Only those candidates get an edit distance.
+
+        Args:
+            query: Text typed so far
+            limit: Maximum number of names to return
+            max_distance: Edit budget (default: 1 up to 5 characters, 2 up to 12, then 3)
+
+        Returns:
+            Matching names, closest first, then by most recent draft year
+        """
+        query = normalize_name(query)
+        if not query or limit <= 0:
+            return []
+        if max_distance is None:
+            max_distance = 1 if len(query) <= 5 else 2 if len(query) <= 12 else 3
+
+        grams = _fuzzy_trigrams(query)
+        lists = [self.fuzzy_postings[gram] for gram in grams if gram in self.fuzzy_postings]
+        if not lists:
+            return []
+        shared = np.bincount(np.concatenate(lists), minlength=len(self.names))
+        # Names sharing no trigram at all are never candidates
+        candidates = np.flatnonzero(shared >= max(1, len(grams) - 3 * max_distance))
+
+        distances = prefix_edit_distances(query.encode('ascii'), self.normalized_chars[candidates],
+                                          self.normalized_lengths[candidates])
+        within = distances <= max_distance
+        candidates, distances = candidates[within], distances[within]
+        # Closest first; ids already follow recency
+        best = np.lexsort((candidates, distances))[:limit]
+        return [self.names[i] for i in candidates[best]]
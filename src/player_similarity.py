@@ -2,13 +2,18 @@ import pandas as pd
 import numpy as np
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics.pairwise import euclidean_distances, cosine_similarity
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
 import warnings
 from .percentile_calculator import PercentileCalculator
 warnings.filterwarnings('ignore')
 
 class PlayerSimilarityAnalyzer:
-    def __init__(self, player_data):
+    def __init__(self, player_data, lazy_percentiles: bool = False):
+        """
+        Args:
+            player_data: NFLPlayerData to compare players from
+            lazy_percentiles: Build each position's percentile tables on first use
+        """
         self.player_data = player_data
         self.scaler = StandardScaler()
         self.numeric_columns = [
@@ -17,33 +22,37 @@ class PlayerSimilarityAnalyzer:
         ]
         
         # Initialize percentile calculator
-        self.percentile_calc = PercentileCalculator(player_data.players)
+        self.percentile_calc = PercentileCalculator(player_data.get_player_store(), lazy=lazy_percentiles)
         
-    def _prepare_features(self, players_df: pd.DataFrame) -> np.ndarray:
-        """Prepare and normalize features for similarity calculation"""
-        # Select numeric features
-        features = players_df[self.numeric_columns].copy()
+    def _prepare_features(self, features: np.ndarray, positions: np.ndarray) -> np.ndarray:
+        """
+        Prepare and normalize features for similarity calculation
+
+        Args:
+            features: Candidate measurements (candidates x self.numeric_columns), NaN when missing
+            positions: Position code of each candidate (-1 when unknown)
+        """
+        # Work on a float64 copy, also when the store keeps float32 measurements
+        features = features.astype(np.float64)
         
         # Handle missing values with position-specific means
-        for col in self.numeric_columns:
-            if col in features.columns:
-                # Calculate position-specific means
-                pos_means = players_df.groupby('position')[col].mean()
-                
-                # Fill missing values with position-specific means
-                for pos in pos_means.index:
-                    mask = (players_df['position'] == pos) & (features[col].isna())
-                    features.loc[mask, col] = pos_means[pos]
-                
-                # If still have NaN values, fill with overall mean
-                if features[col].isna().any():
-                    overall_mean = features[col].mean()
-                    features[col].fillna(overall_mean, inplace=True)
+        missing = np.isnan(features)
+        for code in np.unique(positions[positions >= 0]):
+            in_position = positions == code
+            pos_means = np.nanmean(features[in_position], axis=0)
+            fill = missing & in_position[:, None]
+            features[fill] = np.broadcast_to(pos_means, features.shape)[fill]
+        
+        # If still have NaN values, fill with overall mean
+        missing = np.isnan(features)
+        if missing.any():
+            overall_means = np.nanmean(features, axis=0)
+            features[missing] = np.broadcast_to(overall_means, features.shape)[missing]
         
         # Ensure no NaN values remain
-        if features.isna().any().any():
+        if np.isnan(features).any():
             print("⚠️  Warning: NaN values detected, filling with zeros")
-            features = features.fillna(0.0)
+            features = np.nan_to_num(features, nan=0.0)
         
         # Normalize features
         features_scaled = self.scaler.fit_transform(features)
@@ -113,7 +122,8 @@ class PlayerSimilarityAnalyzer:
         return weights
     
     def find_similar_players(self, player_name: str, num_similar: int = 3, 
-                           same_position_only: bool = True, position: str = None) -> List[Dict]:
+                           same_position_only: bool = True, position: str = None,
+                           years: Optional[Tuple[Optional[int], Optional[int]]] = None) -> List[Dict]:
         """
         Find the most similar players to the given player
         
@@ -131,42 +141,41 @@ class PlayerSimilarityAnalyzer:
             num_similar: Number of similar players to return
             same_position_only: Whether to only compare within same position (default: True)
             position: Specific position to use for dual position players (e.g., 'CB' or 'WR')
+            years: Only compare against players drafted in this (first, last) window,
+                inclusive; either end may be None (e.g. (2015, None))
             
         Returns:
             List of dictionaries with player info and similarity scores
         """
-        # Get the target player's data
-        if position:
-            # For dual position players, get the specific position entry
-            player_entries = self.player_data.players[
-                (self.player_data.players['name'] == player_name) & 
-                (self.player_data.players['position'] == position)
-            ]
-            if player_entries.empty:
-                return []
-            target_player = player_entries.iloc[0].to_dict()
-        else:
-            target_player = self.player_data.get_player_stats(player_name)
-            if not target_player:
-                return []
+        store = self.player_data.get_player_store()
+        
+        # Get the target player's data (for dual position players, the specific position entry)
+        target_player = store.find(player_name, position)
+        if target_player is None:
+            return []
         
         target_position = target_player['position']
         
-        # Get all players to compare against
+        # Get all players to compare against (store rows, in load order)
         if same_position_only:
-            players_df = self.player_data.get_players_by_position(target_position)
-            # Validate that we're only comparing within the same position
-            if not players_df.empty and not all(players_df['position'] == target_position):
-                print(f"⚠️  Warning: Found players with different positions. Filtering to {target_position} only.")
-                players_df = players_df[players_df['position'] == target_position]
+            rows = np.arange(*store.position_rows(target_position).indices(len(store)))
         else:
-            players_df = self.player_data.players
+            # Every row in load order, so ties rank as they would in the unpartitioned table
+            rows = self.player_data.rows_in_load_order()
             print("⚠️  Warning: Cross-position comparisons may not be meaningful due to different physical requirements.")
         
         # Remove the target player from comparison
-        players_df = players_df[players_df['name'] != player_name].copy()
+        rows = rows[store.identity_column('name', rows) != player_name]
         
-        if players_df.empty:
+        # Keep the chosen era
+        if years is not None:
+            first, last = years
+            draft_years = store.identity_column('draft_year', rows).astype(np.float64)
+            in_era = ((draft_years >= (-np.inf if first is None else first))
+                      & (draft_years <= (np.inf if last is None else last)))
+            rows = rows[in_era]
+        
+        if len(rows) == 0:
             return []
         
         # Determine target player's data tier
@@ -174,9 +183,9 @@ class PlayerSimilarityAnalyzer:
         print(f"📊 {player_name} data tier: {target_tier}")
         
         # Categorize comparison players by data tier
-        tier_1_players = self._get_tier_1_players(players_df)
-        tier_2_players = self._get_tier_2_players(players_df)
-        tier_3_players = self._get_tier_3_players(players_df)
+        tier_1_players = self._get_tier_1_players(rows)
+        tier_2_players = self._get_tier_2_players(rows)
+        tier_3_players = self._get_tier_3_players(rows)
         
         print(f"📈 Available comparison players:")
         print(f"   Tier 1 (Complete): {len(tier_1_players)}")
@@ -207,7 +216,7 @@ class PlayerSimilarityAnalyzer:
                 similar_players.extend(additional)
         else:
             # Fallback: use whatever data is available
-            all_players = pd.concat([tier_1_players, tier_2_players, tier_3_players])
+            all_players = np.concatenate([tier_1_players, tier_2_players, tier_3_players])
             similar_players = self._find_similar_in_tier(target_player, all_players, num_similar)
         
         # Sort by similarity score and return
@@ -228,28 +237,31 @@ class PlayerSimilarityAnalyzer:
         else:  # Only height/weight available
             return 3
     
-    def _get_tier_1_players(self, players_df: pd.DataFrame) -> pd.DataFrame:
-        """Get players with complete combine data (4+ athletic tests)"""
+    def _count_athletic_stats(self, rows: np.ndarray) -> np.ndarray:
+        """Number of athletic tests each store row has a result for"""
+        store = self.player_data.get_player_store()
         combine_stats = ['forty_yard', 'vertical_jump', 'broad_jump', 'bench_press', 'shuttle', 'cone']
-        available_stats = players_df[combine_stats].notna().sum(axis=1)
-        return players_df[available_stats >= 4].copy()
+        columns = [store.metric_columns[stat] for stat in combine_stats]
+        return (~np.isnan(store.metrics[np.ix_(rows, columns)])).sum(axis=1)
     
-    def _get_tier_2_players(self, players_df: pd.DataFrame) -> pd.DataFrame:
-        """Get players with partial combine data (1-3 athletic tests)"""
-        combine_stats = ['forty_yard', 'vertical_jump', 'broad_jump', 'bench_press', 'shuttle', 'cone']
-        available_stats = players_df[combine_stats].notna().sum(axis=1)
-        return players_df[(available_stats >= 1) & (available_stats < 4)].copy()
+    def _get_tier_1_players(self, rows: np.ndarray) -> np.ndarray:
+        """Get the rows of players with complete combine data (4+ athletic tests)"""
+        return rows[self._count_athletic_stats(rows) >= 4]
     
-    def _get_tier_3_players(self, players_df: pd.DataFrame) -> pd.DataFrame:
-        """Get players with only height/weight data"""
-        combine_stats = ['forty_yard', 'vertical_jump', 'broad_jump', 'bench_press', 'shuttle', 'cone']
-        available_stats = players_df[combine_stats].notna().sum(axis=1)
-        return players_df[available_stats == 0].copy()
+    def _get_tier_2_players(self, rows: np.ndarray) -> np.ndarray:
+        """Get the rows of players with partial combine data (1-3 athletic tests)"""
+        available_stats = self._count_athletic_stats(rows)
+        return rows[(available_stats >= 1) & (available_stats < 4)]
     
-    def _find_similar_in_tier(self, target_player: Dict, players_df: pd.DataFrame, num_similar: int) -> List[Dict]:
-        """Find similar players within a specific data tier"""
-        if players_df.empty:
+    def _get_tier_3_players(self, rows: np.ndarray) -> np.ndarray:
+        """Get the rows of players with only height/weight data"""
+        return rows[self._count_athletic_stats(rows) == 0]
+    
+    def _find_similar_in_tier(self, target_player, rows: np.ndarray, num_similar: int) -> List[Dict]:
+        """Find similar players among some store rows (one data tier)"""
+        if len(rows) == 0:
             return []
+        store = self.player_data.get_player_store()
         
         # Determine which stats to use based on available data
         target_tier = self._get_player_data_tier(target_player)
@@ -270,7 +282,10 @@ class PlayerSimilarityAnalyzer:
             self.numeric_columns = ['height', 'weight']
         
         # Prepare features for this tier
-        features_scaled = self._prepare_features(players_df)
+        columns = [store.metric_columns[col] for col in self.numeric_columns]
+        candidate_features = store.metrics[np.ix_(rows, columns)].astype(np.float64)
+        position_codes = store.identities['position'][0][rows]
+        features_scaled = self._prepare_features(candidate_features, position_codes)
         
         # Get position-specific weights
         weights = self._calculate_position_weights(target_player['position'])
@@ -280,15 +295,13 @@ class PlayerSimilarityAnalyzer:
         features_weighted = features_scaled * weight_vector
         
         # Get target player features
-        target_features = np.array([target_player[col] for col in self.numeric_columns])
+        target_features = np.array([target_player[col] for col in self.numeric_columns], dtype=np.float64)
         
         # Handle NaN values in target player features
         if np.isnan(target_features).any():
-            # Fill with position-specific means
-            for i, col in enumerate(self.numeric_columns):
-                if np.isnan(target_features[i]):
-                    pos_mean = players_df[col].mean()
-                    target_features[i] = pos_mean
+            # Fill with the comparison players' means
+            candidate_means = np.nanmean(candidate_features, axis=0)
+            target_features = np.where(np.isnan(target_features), candidate_means, target_features)
         
         # Ensure no NaN values remain
         if np.isnan(target_features).any():
@@ -303,14 +316,14 @@ class PlayerSimilarityAnalyzer:
         # Calculate similarity scores (inverse of distance)
         similarity_scores = 1 / (1 + distances)
         
-        # Create results
+        # Create results for the best matches only (highest first, ties in table order)
         results = []
-        for i, (_, player) in enumerate(players_df.iterrows()):
-            # Debug: Check draft_year value
-            draft_year = player['draft_year'] if 'draft_year' in player else 'N/A'
+        for i in np.argsort(-similarity_scores, kind='stable')[:num_similar]:
+            player = store.player(int(rows[i]))
+            draft_year = player.get('draft_year', 'N/A')
             if pd.isna(draft_year):
                 draft_year = 'N/A'
-            elif isinstance(draft_year, (int, float)):
+            elif isinstance(draft_year, (int, float, np.number)):
                 draft_year = str(int(draft_year))
             
             result_dict = {
@@ -321,26 +334,13 @@ class PlayerSimilarityAnalyzer:
                 'Drafted (tm/rnd/yr)': player.get('Drafted (tm/rnd/yr)', ''),
                 'similarity_score': similarity_scores[i],
                 'data_tier': self._get_player_data_tier(player),
-                'stats': {
-                    'height': player['height'],
-                    'weight': player['weight'],
-                    'forty_yard': player['forty_yard'],
-                    'vertical_jump': player['vertical_jump'],
-                    'broad_jump': player['broad_jump'],
-                    'bench_press': player['bench_press'],
-                    'shuttle': player['shuttle'],
-                    'cone': player['cone']
-                }
+                'stats': {stat: player[stat] for stat in
+                          ['height', 'weight', 'forty_yard', 'vertical_jump',
+                           'broad_jump', 'bench_press', 'shuttle', 'cone']}
             }
-            
-
-            
             results.append(result_dict)
         
-        # Sort by similarity score (highest first)
-        results.sort(key=lambda x: x['similarity_score'], reverse=True)
-        
-        return results[:num_similar]
+        return results
     
     def get_comparison_summary(self, player_name: str, similar_players: List[Dict]) -> Dict:
         """Create a summary comparison between the target player and similar players"""
@@ -426,19 +426,33 @@ class PlayerSimilarityAnalyzer:
         
         return " ".join(explanations)
     
-    def get_player_percentiles(self, player_name: str, position: str = None) -> Dict[str, float]:
-        """Get position-specific percentiles for a player"""
-        return self.percentile_calc.get_player_percentiles(player_name, position)
+    def get_player_percentiles(self, player_name: str, position: str = None,
+                               years: Optional[Tuple[Optional[int], Optional[int]]] = None) -> Dict[str, float]:
+        """Get position-specific percentiles for a player, optionally within a draft year window"""
+        return self.percentile_calc.get_player_percentiles(player_name, position, years)
+    
+    def get_ras_score(self, player_name: str, position: str = None,
+                      years: Optional[Tuple[Optional[int], Optional[int]]] = None) -> float:
+        """Get RAS score for a player, optionally within a draft year window"""
+        return self.percentile_calc.get_ras_score(player_name, position, years)
+    
+    def evaluate_measurements(self, measurements: Dict[str, float], position: str,
+                              years: Optional[Tuple[Optional[int], Optional[int]]] = None) -> Dict:
+        """Get percentiles and RAS score of hypothetical measurements at a position"""
+        return self.percentile_calc.evaluate_measurements(measurements, position, years=years)
     
-    def get_ras_score(self, player_name: str, position: str = None) -> float:
-        """Get RAS score for a player"""
-        return self.percentile_calc.get_ras_score(player_name, position)
+    def evaluate_measurements_batch(self, measurements: pd.DataFrame, position: str = None,
+                                    years: Optional[Tuple[Optional[int], Optional[int]]] = None) -> pd.DataFrame:
+        """Get percentiles and RAS scores of many hypothetical measurement lines"""
+        return self.percentile_calc.evaluate_measurements_batch(measurements, position, years=years)
     
-    def get_percentile_explanation(self, player_name: str, position: str = None) -> str:
+    def get_percentile_explanation(self, player_name: str, position: str = None,
+                                   years: Optional[Tuple[Optional[int], Optional[int]]] = None) -> str:
         """Get detailed percentile explanation for a player"""
-        return self.percentile_calc.get_percentile_explanation(player_name, position)
+        return self.percentile_calc.get_percentile_explanation(player_name, position, years)
     
     def find_similar_percentile_players(self, player_name: str, position: str = None, 
-                                      num_similar: int = 5) -> List[Dict]:
+                                      num_similar: int = 5,
+                                      years: Optional[Tuple[Optional[int], Optional[int]]] = None) -> List[Dict]:
         """Find players with similar percentile profiles"""
-        return self.percentile_calc.get_similar_percentile_players(player_name, position, num_similar) 
\ No newline at end of file
+        return self.percentile_calc.get_similar_percentile_players(player_name, position, num_similar, years) 
\ No newline at end of file
@@ -0,0 +1,212 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+
+from .data_processor import COMBINE_STATS
+
+
+class Player:
+    """
+    Read-only view of one entry in a PlayerStore.
+
+    Supports the dict-style access the analyzers and the app use
+    (player['weight'], player.get('college'), 'shuttle' in player) without
+    copying the entry; to_dict() makes the copy when one is needed.
+    """
+
+    __slots__ = ('store', 'row')
+
+    def __init__(self, store: 'PlayerStore', row: int):
+        self.store = store
+        self.row = row
+
+    def __getitem__(self, column: str):
+        metric = self.store.metric_columns.get(column)
+        if metric is not None:
+            return self.store.metrics[self.row, metric]
+        return self.store.identity_value(column, self.row)
+
+    def __contains__(self, column: str) -> bool:
+        return column in self.store.metric_columns or column in self.store.identities
+
+    def get(self, column: str, default=None):
+        """Value of a column, or the default for unknown columns"""
+        if column not in self:
+            return default
+        return self[column]
+
+    def keys(self) -> List[str]:
+        return self.store.columns
+
+    def to_dict(self) -> Dict:
+        """Copy the entry into a dict"""
+        return {column: self[column] for column in self.store.columns}
+
+    def __repr__(self) -> str:
+        return f"Player({self['name']!r}, {self['position']!r})"
+
+
+class PlayerStore:
+    """
+    Compact read-only store of player entries.
+
+    Measurements live in one contiguous matrix (entries x metrics, in the
+    table's precision); every other column is a parallel array, with text columns
+    dictionary-encoded as codes into their distinct values. Entries keep the
+    row order of the table they were built from, so the position slices and
+    name index of a partitioned table (see partition_players) address the
+    store directly. Player views are only created on demand.
+    """
+
+    def __init__(self, players: pd.DataFrame, position_slices: Dict[str, slice],
+                 name_index: Dict[str, np.ndarray], metrics: List[str] = COMBINE_STATS,
+                 dtype=None):
+        """
+        Args:
+            players: Player table, partitioned by position
+            position_slices: Row slice of each position in players
+            name_index: Row positions of each name in players
+            metrics: Measurement columns kept in the matrix
+            dtype: Matrix dtype (default: float32 when the table's measurements already
+                are, as with the compact schema, else float64)
+        """
+        self.columns = players.columns.tolist()
+        self.position_slices = position_slices
+        self.name_index = name_index
+
+        self.metric_names = [metric for metric in metrics if metric in players.columns]
+        self.metric_columns = {metric: i for i, metric in enumerate(self.metric_names)}
+        if dtype is None:
+            # Narrowing float64 measurements would change percentiles at ties and range ends
+            dtypes = players[self.metric_names].dtypes
+            dtype = np.float32 if len(dtypes) and (dtypes == np.float32).all() else np.float64
+        self.metrics = np.ascontiguousarray(
+            players[self.metric_names].to_numpy(dtype=dtype, na_value=np.nan))
+
+        # Column -> (codes, distinct values) for text, (None, values) for numbers
+        self.identities: Dict[str, Tuple[Optional[np.ndarray], np.ndarray]] = {}
+        for column in self.columns:
+            if column in self.metric_columns:
+                continue
+            values = players[column]
+            if pd.api.types.is_numeric_dtype(values) and not isinstance(values.dtype, pd.CategoricalDtype):
+                self.identities[column] = (None, values.to_numpy())
+            else:
+                codes, uniques = pd.factorize(values)
+                self.identities[column] = (codes.astype(np.int32), np.asarray(uniques, dtype=object))
+
+    def __len__(self) -> int:
+        return len(self.metrics)
+
+    def identity_value(self, column: str, row: int):
+        """Value of a non-measurement column for one entry (NaN when missing)"""
+        codes, values = self.identities[column]
+        if codes is None:
+            return values[row]
+        code = codes[row]
+        return values[code] if code >= 0 else np.nan
+
+    def identity_column(self, column: str, rows=slice(None)) -> np.ndarray:
+        """Decoded values of a non-measurement column, optionally for some rows"""
+        codes, values = self.identities[column]
+        if codes is None:
+            return values[rows]
+        codes = codes[rows]
+        if len(values) == 0:
+            # Every value is missing, so there is nothing for the codes to index
+            return np.full(np.shape(codes), np.nan, dtype=object)
+        return np.where(codes >= 0, values[codes], np.nan)
+
+    def metric_column(self, metric: str) -> np.ndarray:
+        """Values of one measurement for every entry (a view into the matrix)"""
+        return self.metrics[:, self.metric_columns[metric]]
+
+    def player(self, row: int) -> Player:
+        """View of the entry at a row"""
+        return Player(self, row)
+
+    def position_rows(self, position: str) -> slice:
+        """Row slice of a position's entries (empty for unknown positions)"""
+        return self.position_slices.get(position, slice(0, 0))
+
+    def rows_for(self, player_name: str, position: str = None) -> np.ndarray:
+        """Rows of a player's entries, optionally only the one for a position"""
+        rows = self.name_index.get(player_name)
+        if rows is None:
+            return np.empty(0, dtype=np.intp)
+        if position:
+            block = self.position_rows(position)
+            rows = rows[(rows >= block.start) & (rows < block.stop)]
+        return rows
+
+    def find(self, player_name: str, position: str = None) -> Optional[Player]:
+        """View of a player's first entry (for a position, if given), or None if there is none"""
+        rows = self.rows_for(player_name, position)
+        if len(rows) == 0:
+            return None
+        return Player(self, int(rows[0]))
+
+    def append(self, players: pd.DataFrame) -> Tuple['PlayerStore', np.ndarray]:
+        """
+        A new store with more entries, laid out as if built from the combined table
+
+        New entries go after the existing entries of their position, where
+        partition_players puts rows added at the end of a table; positions new
+        to the store take their alphabetical place. This store is left as is.
+
+        Args:
+            players: New entries, with the store's columns
+
+        Returns:
+            The new store, and the new row of each existing entry
+        """
+        players = players.reindex(columns=self.columns).reset_index(drop=True)
+        n_old = len(self)
+        metrics = np.vstack([self.metrics, players[self.metric_names].to_numpy(dtype=self.metrics.dtype,
+                                                                               na_value=np.nan)])
+        identities = {column: self._extend_identity(column, players[column]) for column in self.identities}
+
+        # Stable sort by position, missing positions last, as partition_players lays a table out
+        position_codes, positions = identities['position']
+        alphabetical = np.argsort(positions, kind='stable')
+        ranks = np.empty(len(positions), dtype=np.intp)
+        ranks[alphabetical] = np.arange(len(positions))
+        sort_keys = np.where(position_codes >= 0, ranks[position_codes], len(positions))
+        order = np.argsort(sort_keys, kind='stable')
+        bounds = np.searchsorted(sort_keys[order], np.arange(len(positions) + 1))
+        position_slices = {positions[code]: slice(int(bounds[i]), int(bounds[i + 1]))
+                           for i, code in enumerate(alphabetical)}
+        new_rows = np.empty(len(order), dtype=np.intp)
+        new_rows[order] = np.arange(len(order))
+
+        # A name's existing entries come first, then the new ones
+        name_index = {name: new_rows[rows] for name, rows in self.name_index.items()}
+        for name, rows in players.groupby('name', sort=False).indices.items():
+            added = new_rows[n_old + rows]
+            name_index[name] = np.concatenate([name_index[name], added]) if name in name_index else added
+
+        store = PlayerStore.__new__(PlayerStore)
+        store.columns = self.columns
+        store.position_slices = position_slices
+        store.name_index = name_index
+        store.metric_names = self.metric_names
+        store.metric_columns = self.metric_columns
+        store.metrics = np.ascontiguousarray(metrics[order])
+        store.identities = {}
+        for column, (codes, values) in identities.items():
+            # Text keeps its dictionary; only codes and plain values are reordered
+            store.identities[column] = (None, values[order]) if codes is None else (codes[order], values)
+        return store, new_rows[:n_old]
+
+    def _extend_identity(self, column: str, values: pd.Series) -> Tuple[Optional[np.ndarray], np.ndarray]:
+        """A column's arrays with new values added at the end (new text values extend the dictionary)"""
+        codes, uniques = self.identities[column]
+        if codes is None:
+            return None, np.concatenate([uniques, values.to_numpy()])
+        new_codes = pd.Index(uniques).get_indexer(values).astype(np.int32)
+        unseen = (new_codes < 0) & values.notna().to_numpy()
+        if unseen.any():
+            extra_codes, extra_uniques = pd.factorize(values[unseen])
+            new_codes[unseen] = len(uniques) + extra_codes
+            uniques = np.concatenate([uniques, np.asarray(extra_uniques, dtype=object)])
+        return np.concatenate([codes, new_codes]), uniques
@@ -0,0 +1,156 @@
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from .columnar_store import read_store_schema, store_path_for
+from .nfl_player_data import NFLPlayerData
+from .player_similarity import PlayerSimilarityAnalyzer
+
+# Bump when NFLPlayerData or the analyzer change shape so old snapshots are rebuilt
+SNAPSHOT_VERSION = 7
+
+
+def snapshot_path_for(data_file: str) -> str:
+    """Snapshot file kept next to a processed CSV file"""
+    return os.path.splitext(data_file)[0] + "_snapshot.pkl"
+
+
+def source_files(data_file: str) -> List[str]:
+    """Files the player data can be loaded from: the CSV, and the columnar store when there is one"""
+    files = []
+    store_dir = store_path_for(data_file)
+    if read_store_schema(store_dir) is not None:
+        files = sorted(os.path.join(store_dir, name) for name in os.listdir(store_dir))
+    # The CSV decides whether the store is current, so an edited CSV counts as a change
+    if os.path.exists(data_file) or not files:
+        files.insert(0, data_file)
+    return files
+
+
+def stat_signature(files: List[str]) -> List[Tuple[str, int, int]]:
+    """Name, size and mtime of each source file"""
+    signature = []
+    for path in files:
+        stat = os.stat(path)
+        signature.append((os.path.basename(path), stat.st_size, stat.st_mtime_ns))
+    return signature
+
+
+def _content_hash(files: List[str]) -> str:
+    """SHA-256 over the names and contents of the source files"""
+    digest = hashlib.sha256()
+    for path in files:
+        digest.update(os.path.basename(path).encode() + b'\0')
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def _read_snapshot(snapshot_file: str, files: List[str], options: Dict) -> Optional[Tuple]:
+    """The snapshot's (player_data, analyzer) if it was built from the current source data"""
+    try:
+        with open(snapshot_file, 'rb') as f:
+            header = pickle.load(f)
+            if header.get('version') != SNAPSHOT_VERSION or header.get('options') != options:
+                return None
+            # Unchanged stats are trusted; otherwise the content decides (a copied or touched file is still current)
+            if header['files'] != stat_signature(files) and header['sha256'] != _content_hash(files):
+                return None
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"⚠️  Ignoring unreadable snapshot {snapshot_file}: {e}")
+        return None
+
+
+def _snapshot_header(files: List[str], options: Dict) -> Dict:
+    """What a snapshot is checked against: the format version, load options and source data"""
+    return {
+        'version': SNAPSHOT_VERSION,
+        'options': options,
+        'files': stat_signature(files),
+        'sha256': _content_hash(files)
+    }
+
+
+def _write_snapshot(snapshot_file: str, header: Dict, state: Tuple):
+    """Write the snapshot through a temporary file, so readers never see a partial one"""
+    directory = os.path.dirname(os.path.abspath(snapshot_file))
+    try:
+        fd, tmp_file = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_file, snapshot_file)
+        except BaseException:
+            os.unlink(tmp_file)
+            raise
+        print(f"💾 Saved snapshot to {snapshot_file}")
+    except OSError as e:
+        print(f"⚠️  Could not save snapshot to {snapshot_file}: {e}")
+
+
+def _warm_up_and_write(snapshot_file: str, header: Dict, state: Tuple):
+    """Build the remaining percentile tables, then write the snapshot (run in the background)"""
+    try:
+        state[1].percentile_calc.warm_up()
+        _write_snapshot(snapshot_file, header, state)
+    except Exception as e:
+        # The app keeps running on the built state; the next start builds again
+        print(f"⚠️  Could not save snapshot to {snapshot_file}: {e}")
+
+
+def load_app_state(data_file: str = "data/processed_combine_data.csv", snapshot_file: str = None,
+                   compact: bool = False, persist_expanded: bool = False, lazy_percentiles: bool = False
+                   ) -> Tuple[NFLPlayerData, PlayerSimilarityAnalyzer]:
+    """
+    Load the player data and similarity analyzer from a startup snapshot
+
+    The snapshot holds the fully built state (expanded table, position
+    partitions, lookup and search indexes, player store, percentile tables)
+    in one versioned file, keyed by a hash of the processed data. When the
+    processed data changes, or there is no usable snapshot, the state is
+    built from scratch and the snapshot is rewritten.
+
+    With lazy_percentiles, a fresh build returns before the percentile
+    tables are built: positions are built as they are first used, the rest
+    in a background thread, and the snapshot is written once all are done.
+
+    Args:
+        data_file: Processed CSV file (its columnar store is used when present)
+        snapshot_file: Snapshot location (default: next to data_file)
+        compact: Passed on to NFLPlayerData
+        persist_expanded: Passed on to NFLPlayerData
+        lazy_percentiles: Passed on to PlayerSimilarityAnalyzer
+
+    Returns:
+        (player_data, analyzer)
+    """
+    snapshot_file = snapshot_file or snapshot_path_for(data_file)
+    files = source_files(data_file)
+    options = {'data_file': os.path.abspath(data_file), 'compact': compact, 'persist_expanded': persist_expanded}
+
+    state = _read_snapshot(snapshot_file, files, options)
+    if state is not None:
+        print(f"📊 Loaded snapshot {snapshot_file}")
+        return state
+
+    # Taken before loading, so a change made while building invalidates the new snapshot
+    header = _snapshot_header(files, options)
+    player_data = NFLPlayerData(data_file, compact=compact, persist_expanded=persist_expanded)
+    analyzer = PlayerSimilarityAnalyzer(player_data, lazy_percentiles=lazy_percentiles)
+    # Build the lazy search index now so it is part of the snapshot
+    player_data.search_players('')
+
+    if lazy_percentiles:
+        threading.Thread(target=_warm_up_and_write, args=(snapshot_file, header, (player_data, analyzer)),
+                         name="nfl-snapshot-writer", daemon=True).start()
+    else:
+        _write_snapshot(snapshot_file, header, (player_data, analyzer))
+    return player_data, analyzer
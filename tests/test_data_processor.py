@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+"""
+Tests for the combine CSV ingestion pipeline
+"""
+
+import os
+import shutil
+import pandas as pd
+import pytest
+
+from src.data_processor import NFLDataProcessor, COMBINE_STATS
+from src.columnar_store import (ColumnarStoreWriter, load_columnar, iter_columnar, read_store_schema,
+                                save_columnar, store_path_for)
+from src.nfl_player_data import NFLPlayerData
+
+DATA_FOLDER = "data"
+
+
+def _legacy_clean(processor, df):
+    """Reference cleaning that runs the per-value helpers cell by cell"""
+    df = df.copy()
+    df['height'] = df['height'].apply(processor._convert_height_to_inches)
+    df['forty_yard'] = df['forty_yard'].apply(processor._clean_time)
+    for field in ['weight', 'vertical_jump', 'broad_jump', 'bench_press', 'shuttle', 'cone']:
+        df[field] = pd.to_numeric(df[field], errors='coerce')
+    df['position'] = df['position'].apply(processor._standardize_position)
+    return df
+
+
+def test_vectorized_cleaning_matches_per_value_cleaning():
+    """The column cleaners give the same output as the per-value helpers on every class"""
+    processor = NFLDataProcessor(DATA_FOLDER)
+    for csv_file in sorted(os.listdir(DATA_FOLDER)):
+        if not csv_file.endswith('CombineData.csv'):
+            continue
+        df = processor._standardize_columns(pd.read_csv(os.path.join(DATA_FOLDER, csv_file)))
+        expected = _legacy_clean(processor, df)
+        cleaned = processor._clean_data(df.copy())
+        pd.testing.assert_frame_equal(cleaned, expected, check_dtype=False)
+
+
+def test_vectorized_cleaning_edge_cases():
+    """Excel-mangled heights, quoted times and unmapped positions"""
+    processor = NFLDataProcessor(DATA_FOLDER)
+    df = pd.DataFrame({
+        'height': ["6'2\"", '6-0', '11-May', '4-Jun', 'Jun-00', '76', '75.5', None, 'abc', '3-June'],
+        'forty_yard': ['4.45', '"4.4"', "'4.50'", '4', None, ' 4.6 ', '4.', 'x', '5', '1.2.3'],
+        'position': ['de', ' OLB', None, 'Safety', 'CB/WR', 'xx', 'G', 'T', 'p', 'NT'],
+        'weight': [200] * 10,
+        'vertical_jump': [30] * 10,
+        'broad_jump': [110] * 10,
+        'bench_press': [20] * 10,
+        'shuttle': [4.2] * 10,
+        'cone': [7.0] * 10,
+    })
+    expected = _legacy_clean(processor, df)
+    cleaned = processor._clean_data(df.copy())
+    pd.testing.assert_frame_equal(cleaned, expected, check_dtype=False)
+    assert cleaned['height'].tolist()[:4] == [74.0, 72.0, 71.0, 76.0]
+    assert cleaned['position'].tolist()[:4] == ['EDGE', 'LB', 'Unknown', 'S']
+
+    # Numeric columns take the fast path and keep the same rules
+    numeric = pd.DataFrame({'height': [74.0, None, -3.0], 'forty_yard': [4.45, None, 1e-5]})
+    pd.testing.assert_series_equal(
+        processor._convert_height_column(numeric['height']),
+        numeric['height'].apply(processor._convert_height_to_inches).astype(float),
+        check_names=False)
+    pd.testing.assert_series_equal(
+        processor._clean_time_column(numeric['forty_yard']),
+        numeric['forty_yard'].apply(processor._clean_time).astype(float),
+        check_names=False)
+
+
+def test_parallel_load_matches_serial_load(tmp_path, capsys):
+    """Parallel ingestion keeps the year order and still reports per-file errors"""
+    for csv_file in ['2003CombineData.csv', '2001CombineData.csv', '2024CombineData.csv']:
+        shutil.copy(os.path.join(DATA_FOLDER, csv_file), tmp_path / csv_file)
+    (tmp_path / '2010CombineData.csv').write_text('')
+    # A value that breaks cleaning only drops its own file
+    malformed = pd.read_csv(os.path.join(DATA_FOLDER, '2004CombineData.csv'), dtype=str)
+    malformed.loc[0, 'Height'] = '6-99999999999999999999'
+    malformed.to_csv(tmp_path / '2004CombineData.csv', index=False)
+
+    serial = NFLDataProcessor(str(tmp_path)).load_csv_files()
+    parallel = NFLDataProcessor(str(tmp_path)).load_csv_files(parallel=True, max_workers=2)
+
+    pd.testing.assert_frame_equal(parallel, serial, check_dtype=False)
+    assert parallel['draft_year'].is_monotonic_increasing
+    output = capsys.readouterr().out
+    assert output.count("❌ Error processing 2010CombineData.csv") == 2
+    assert output.count("❌ Error processing 2004CombineData.csv") == 2
+    assert 2004 not in set(serial['draft_year']) and 2003 in set(serial['draft_year'])
+
+    # Without the bad file, the serial load cleans all files in one batch, with the same result
+    os.remove(tmp_path / '2004CombineData.csv')
+    processor = NFLDataProcessor(str(tmp_path))
+    clean_data, cleaned = processor._clean_data, []
+    processor._clean_data = lambda df: cleaned.append(len(df)) or clean_data(df)
+    batch = processor.load_csv_files()
+    pd.testing.assert_frame_equal(batch, serial, check_dtype=False)
+    assert cleaned == [len(batch)]
+    assert [entry['rows'] for entry in processor.source_files] == serial['draft_year'].value_counts(sort=False).tolist()
+
+
+def test_incremental_reload_only_reprocesses_changed_files(tmp_path):
+    """A rerun re-cleans only changed files and splices them into the processed output"""
+    data_folder = tmp_path / "data"
+    data_folder.mkdir()
+    for csv_file in ['2001CombineData.csv', '2002CombineData.csv', '2024CombineData.csv']:
+        shutil.copy(os.path.join(DATA_FOLDER, csv_file), data_folder / csv_file)
+    output_file = str(tmp_path / "processed.csv")
+
+    processor = NFLDataProcessor(str(data_folder))
+    processor.load_csv_files_incremental(output_file)
+    assert len(processor.changed_files) == 3
+    processor.save_processed_data(output_file)
+
+    # Nothing changed: no file is reprocessed
+    processor = NFLDataProcessor(str(data_folder))
+    processor.load_csv_files_incremental(output_file)
+    assert processor.changed_files == []
+
+    # Drop a player from one class and add a new class
+    df = pd.read_csv(data_folder / '2002CombineData.csv')
+    df.iloc[1:].to_csv(data_folder / '2002CombineData.csv', index=False)
+    shutil.copy(os.path.join(DATA_FOLDER, '2010CombineData.csv'), data_folder / '2010CombineData.csv')
+
+    processor = NFLDataProcessor(str(data_folder))
+    processor.load_csv_files_incremental(output_file)
+    assert processor.changed_files == ['2002CombineData.csv', '2010CombineData.csv']
+    processor.save_processed_data(output_file)
+
+    rebuilt = NFLDataProcessor(str(data_folder)).load_csv_files()
+    pd.testing.assert_frame_equal(pd.read_csv(output_file), rebuilt, check_dtype=False)
+
+    # A removed file drops its rows
+    os.remove(data_folder / '2001CombineData.csv')
+    processor = NFLDataProcessor(str(data_folder))
+    data = processor.load_csv_files_incremental(output_file)
+    assert processor.changed_files == ['2001CombineData.csv']
+    assert 2001 not in data['draft_year'].values
+
+
+def test_incremental_load_keeps_the_rows_of_a_file_that_fails(tmp_path, capsys):
+    """A changed file that fails keeps its previous rows and entry, whether or not other files changed"""
+    data_folder = tmp_path / "data"
+    data_folder.mkdir()
+    for csv_file in ['2001CombineData.csv', '2002CombineData.csv']:
+        shutil.copy(os.path.join(DATA_FOLDER, csv_file), data_folder / csv_file)
+    output_file = str(tmp_path / "processed.csv")
+    processor = NFLDataProcessor(str(data_folder))
+    before = processor.load_csv_files_incremental(output_file)
+    processor.save_processed_data(output_file)
+    old_entries = processor.source_files
+
+    (data_folder / '2002CombineData.csv').write_text('')
+    processor = NFLDataProcessor(str(data_folder))
+    alone = processor.load_csv_files_incremental(output_file)
+    assert processor.changed_files == [] and processor.source_files == old_entries
+    assert "keeping its previous rows" in capsys.readouterr().out
+    pd.testing.assert_frame_equal(alone, before, check_dtype=False)
+
+    # Alongside another change, the failed file's block and entry are kept the same way
+    shutil.copy(os.path.join(DATA_FOLDER, '2010CombineData.csv'), data_folder / '2010CombineData.csv')
+    processor = NFLDataProcessor(str(data_folder))
+    together = processor.load_csv_files_incremental(output_file)
+    assert processor.changed_files == ['2010CombineData.csv']
+    assert processor.source_files[:2] == old_entries
+    pd.testing.assert_frame_equal(together.iloc[:len(before)], before, check_dtype=False)
+    processor.save_processed_data(output_file)
+
+    # The next run retries the file
+    pd.read_csv(os.path.join(DATA_FOLDER, '2002CombineData.csv')).iloc[1:].to_csv(
+        data_folder / '2002CombineData.csv', index=False)
+    processor = NFLDataProcessor(str(data_folder))
+    data = processor.load_csv_files_incremental(output_file)
+    assert processor.changed_files == ['2002CombineData.csv']
+    pd.testing.assert_frame_equal(data, NFLDataProcessor(str(data_folder)).load_csv_files(), check_dtype=False)
+
+
+def test_incremental_load_ignores_a_stale_store(tmp_path):
+    """Unchanged rows come from the CSV when the store next to it was not written with it"""
+    data_folder = tmp_path / "data"
+    data_folder.mkdir()
+    for csv_file in ['2001CombineData.csv', '2002CombineData.csv']:
+        shutil.copy(os.path.join(DATA_FOLDER, csv_file), data_folder / csv_file)
+    output_file = str(tmp_path / "processed.csv")
+    processor = NFLDataProcessor(str(data_folder))
+    processor.load_csv_files_incremental(output_file)
+    processor.save_processed_data(output_file)
+
+    # A store left behind by an interrupted save, with other values than the CSV
+    stale = load_columnar(store_path_for(output_file))
+    stale['weight'] += 1
+    save_columnar(stale, store_path_for(output_file), {'source_csv': None})
+
+    df = pd.read_csv(data_folder / '2002CombineData.csv')
+    df.iloc[1:].to_csv(data_folder / '2002CombineData.csv', index=False)
+    data = NFLDataProcessor(str(data_folder)).load_csv_files_incremental(output_file)
+    rebuilt = NFLDataProcessor(str(data_folder)).load_csv_files()
+    pd.testing.assert_frame_equal(data, rebuilt, check_dtype=False)
+
+
+def test_incremental_save_writes_only_the_changed_blocks(tmp_path, monkeypatch):
+    """Blocks before the first changed file stay in place, and the output matches a full save"""
+    data_folder = tmp_path / "data"
+    data_folder.mkdir()
+    for csv_file in ['2001CombineData.csv', '2002CombineData.csv', '2003CombineData.csv']:
+        shutil.copy(os.path.join(DATA_FOLDER, csv_file), data_folder / csv_file)
+    output_file = str(tmp_path / "processed.csv")
+    processor = NFLDataProcessor(str(data_folder))
+    processor.load_csv_files_incremental(output_file)
+    processor.save_processed_data(output_file)
+
+    def assert_matches_full_save(processor):
+        fresh_file = str(tmp_path / "fresh" / "processed.csv")
+        fresh = NFLDataProcessor(str(data_folder))
+        fresh.load_csv_files()
+        fresh.save_processed_data(fresh_file)
+        with open(output_file, 'rb') as saved, open(fresh_file, 'rb') as expected:
+            assert saved.read() == expected.read()
+        pd.testing.assert_frame_equal(load_columnar(store_path_for(output_file)),
+                                      load_columnar(store_path_for(fresh_file)))
+        assert [entry['csv_end'] for entry in processor.source_files] == \
+            [entry['csv_end'] for entry in fresh.source_files]
+
+    # A new draft class only appends its block; the store is resumed rather than rewritten
+    shutil.copy(os.path.join(DATA_FOLDER, '2004CombineData.csv'), data_folder / '2004CombineData.csv')
+    processor = NFLDataProcessor(str(data_folder))
+    processor.load_csv_files_incremental(output_file)
+    assert processor._kept_blocks(output_file)[0] == 3
+    monkeypatch.setattr('src.data_processor.save_columnar', None)
+    processor.save_processed_data(output_file)
+    monkeypatch.undo()
+    assert_matches_full_save(processor)
+
+    # A changed file in the middle keeps only the blocks before it
+    df = pd.read_csv(data_folder / '2002CombineData.csv')
+    df.iloc[1:].to_csv(data_folder / '2002CombineData.csv', index=False)
+    processor = NFLDataProcessor(str(data_folder))
+    processor.load_csv_files_incremental(output_file)
+    assert processor._kept_blocks(output_file)[0] == 1
+    processor.save_processed_data(output_file)
+    assert_matches_full_save(processor)
+
+
+def test_malformed_manifest_triggers_full_rebuild(tmp_path, capsys):
+    """A manifest that is valid JSON of the wrong shape counts as no manifest"""
+    data_folder = tmp_path / "data"
+    data_folder.mkdir()
+    shutil.copy(os.path.join(DATA_FOLDER, '2001CombineData.csv'), data_folder / '2001CombineData.csv')
+    output_file = str(tmp_path / "processed.csv")
+    processor = NFLDataProcessor(str(data_folder))
+    processor.load_csv_files_incremental(output_file)
+    processor.save_processed_data(output_file)
+
+    manifest_file = str(tmp_path / "processed_manifest.json")
+    for contents in ['[1, 2]', '{"version": 1}', '{"version": 1, "files": 3}',
+                     '{"version": 1, "files": [{"file": "2001CombineData.csv"}]}', '{"version": 1, "files": [1]}']:
+        with open(manifest_file, 'w') as f:
+            f.write(contents)
+        capsys.readouterr()
+        processor = NFLDataProcessor(str(data_folder))
+        processor.load_csv_files_incremental(output_file)
+        assert processor.changed_files == ['2001CombineData.csv']
+        assert "No usable manifest" in capsys.readouterr().out
+
+
+def test_columnar_store_round_trip(tmp_path):
+    """The columnar store loads back the same table as the CSV, and NFLPlayerData prefers it"""
+    data_folder = tmp_path / "data"
+    data_folder.mkdir()
+    for csv_file in ['2001CombineData.csv', '2025CombineData.csv']:
+        shutil.copy(os.path.join(DATA_FOLDER, csv_file), data_folder / csv_file)
+    output_file = str(tmp_path / "processed.csv")
+
+    processor = NFLDataProcessor(str(data_folder))
+    processor.load_csv_files()
+    processor.save_processed_data(output_file)
+
+    from_store = load_columnar(store_path_for(output_file))
+    from_csv = pd.read_csv(output_file)
+    pd.testing.assert_frame_equal(from_store, from_csv, check_dtype=False)
+    assert from_store['draft_year'].dtype == 'int64'
+
+    # NFLPlayerData reads the store and falls back to the CSV without it
+    players = NFLPlayerData(output_file).players
+    shutil.rmtree(store_path_for(output_file))
+    pd.testing.assert_frame_equal(players, NFLPlayerData(output_file).players, check_dtype=False)
+
+
+def test_streaming_matches_in_memory_load(tmp_path):
+    """Chunked streaming writes the same rows as a full in-memory load and rolls back failed files"""
+    data_folder = tmp_path / "data"
+    data_folder.mkdir()
+    for csv_file in ['2001CombineData.csv', '2024CombineData.csv']:
+        shutil.copy(os.path.join(DATA_FOLDER, csv_file), data_folder / csv_file)
+    # A malformed row after the first chunk makes this file fail halfway through
+    lines = open(os.path.join(DATA_FOLDER, '2010CombineData.csv'), encoding='utf-8-sig').read().splitlines()
+    lines.insert(150, 'a,b,c,d,e,f,g,h,i,j,k,l,m,n,o,p,q')
+    (data_folder / '2010CombineData.csv').write_text('\n'.join(lines))
+    output_file = str(tmp_path / "processed.csv")
+
+    rows = NFLDataProcessor(str(data_folder)).stream_csv_files(output_file, chunksize=100)
+
+    os.remove(data_folder / '2010CombineData.csv')
+    expected = NFLDataProcessor(str(data_folder)).load_csv_files()
+    assert rows == len(expected)
+    pd.testing.assert_frame_equal(load_columnar(store_path_for(output_file)), expected, check_dtype=False)
+    pd.testing.assert_frame_equal(pd.read_csv(output_file), expected, check_dtype=False)
+
+
+def test_store_writer_caps_text_dictionaries(tmp_path):
+    """High-cardinality text switches to plain UTF-8 mid-stream and still truncates cleanly"""
+    store_dir = str(tmp_path / "store")
+    writer = ColumnarStoreWriter(store_dir, max_dictionary_size=4)
+    chunks = [
+        pd.DataFrame({'name': ['Aé', None, 'B'], 'position': ['QB', 'QB', 'WR']}),
+        pd.DataFrame({'name': ['C', 'D', 'E'], 'position': ['WR', None, 'QB']}),
+        pd.DataFrame({'name': ['F', '', None], 'position': ['QB', 'QB', 'QB']}),
+    ]
+    for chunk in chunks:
+        writer.append(chunk)
+    writer.append(pd.DataFrame({'name': ['rolled back'], 'position': ['K']}))
+    writer.truncate(9)
+    writer.close()
+
+    encodings = {column['name']: column['encoding'] for column in read_store_schema(store_dir)['columns']}
+    assert encodings == {'name': 'plain', 'position': 'dictionary'}
+    expected = pd.concat(chunks, ignore_index=True)
+    pd.testing.assert_frame_equal(load_columnar(store_dir), expected, check_dtype=False)
+    pd.testing.assert_frame_equal(pd.concat(iter_columnar(store_dir, 2), ignore_index=True), expected,
+                                  check_dtype=False)
+
+
+def test_imputation_matches_per_position_loop():
+    """Grouped imputation fills the same values as the old per-position loop and flags them"""
+    data = NFLDataProcessor(DATA_FOLDER).load_csv_files()
+    original = data.copy()
+    
+    expected = data.copy()
+    for stat in COMBINE_STATS:
+        pos_averages = expected.groupby('position')[stat].mean()
+        for pos in pos_averages.index:
+            mask = (expected['position'] == pos) & (expected[stat].isna())
+            expected.loc[mask, stat] = pos_averages[pos]
+    
+    processor = NFLDataProcessor(DATA_FOLDER)
+    imputed = processor.handle_missing_data(data)
+    pd.testing.assert_frame_equal(data, original)
+    pd.testing.assert_frame_equal(imputed[expected.columns], expected)
+    for bit, stat in enumerate(COMBINE_STATS):
+        flagged = (imputed['imputed_mask'].to_numpy() >> bit) & 1 == 1
+        assert (flagged == (data[stat].isna() & expected[stat].notna())).all()
+    
+    median = processor.handle_missing_data(data, strategy='median')
+    qb_weights = data.loc[data['position'] == 'QB', 'weight']
+    assert (median.loc[qb_weights.index[qb_weights.isna()], 'weight'] == qb_weights.median()).all()
+
+
+def test_year_window_imputation():
+    """The year window averages the same position over nearby classes only"""
+    df = pd.DataFrame({
+        'position': ['QB', 'QB', 'QB', 'QB', 'WR', 'WR'],
+        'draft_year': [2000, 2001, 2010, 2001, 2001, 2001],
+        'weight': [200.0, 220.0, 260.0, None, 180.0, None],
+    })
+    for stat in COMBINE_STATS:
+        if stat != 'weight':
+            df[stat] = 1.0
+    imputed = NFLDataProcessor(DATA_FOLDER).handle_missing_data(df, strategy='year_window', year_window=1)
+    assert imputed['weight'].tolist() == [200.0, 220.0, 260.0, 210.0, 180.0, 180.0]
+    assert imputed['imputed_mask'].tolist() == [0, 0, 0, 2, 0, 2]
+
+
+def test_compact_schema_survives_store_round_trip(tmp_path):
+    """The compact schema is applied at ingestion, kept by the store and by NFLPlayerData"""
+    data_folder = tmp_path / "data"
+    data_folder.mkdir()
+    for csv_file in ['2001CombineData.csv', '2025CombineData.csv']:
+        shutil.copy(os.path.join(DATA_FOLDER, csv_file), data_folder / csv_file)
+    output_file = str(tmp_path / "processed.csv")
+
+    processor = NFLDataProcessor(str(data_folder), compact=True)
+    compact = processor.load_csv_files()
+    processor.save_processed_data(output_file)
+    full = NFLDataProcessor(str(data_folder)).load_csv_files()
+
+    assert compact['position'].dtype == 'category'
+    assert compact['forty_yard'].dtype == 'float32'
+    assert compact['draft_year'].dtype == 'int16'
+    pd.testing.assert_frame_equal(compact, full, check_dtype=False, check_categorical=False, rtol=1e-6)
+    pd.testing.assert_frame_equal(load_columnar(store_path_for(output_file)), compact)
+
+    # Streaming builds the same compact store
+    NFLDataProcessor(str(data_folder), compact=True).stream_csv_files(output_file, chunksize=100)
+    pd.testing.assert_frame_equal(load_columnar(store_path_for(output_file)), compact,
+                                  check_categorical=False)
+
+    players = NFLPlayerData(output_file, compact=True).players
+    assert players['original_position'].dtype == 'category'
+    assert players['height'].dtype == 'float32'
+
+
+def test_schema_resolution_is_cached_per_header(tmp_path, monkeypatch):
+    """Headers resolve through the alias table once; later files with the same header skip resolution"""
+    for year in [2030, 2031]:
+        pd.DataFrame({
+            'Player Name': ['A', 'B'], 'POS': ['QB', 'WR'], 'School': ['X', 'Y'],
+            'Ht (in)': [74, 72], 'WT-LBS': [220, 190], '40 Time': [4.8, 4.4],
+        }).to_csv(tmp_path / f"{year}CombineData.csv", index=False)
+
+    processor = NFLDataProcessor(str(tmp_path))
+    resolved = []
+    resolve_header = processor._resolve_header
+    monkeypatch.setattr(processor, '_resolve_header',
+                        lambda df, height_column=None: resolved.append(1) or resolve_header(df, height_column))
+    data = processor.load_csv_files()
+
+    assert resolved == [1]
+    assert list(data.columns) == ['name', 'position', 'college', 'height', 'weight', 'forty_yard', 'draft_year']
+    assert data['forty_yard'].tolist() == [4.8, 4.4, 4.8, 4.4]
+
+
+def test_schema_cache_does_not_leak_across_files_or_processors(tmp_path):
+    """The sniffed height column and each processor's aliases are part of the cached mapping"""
+    header = ['Player', 'Pos', 'School', 'Ht', 'Wt', 'Height', '40 Time']
+    pd.DataFrame([['A', 'QB', 'X', '2001-06-01', 220, '6-2', 4.8]],
+                 columns=header).to_csv(tmp_path / "2030CombineData.csv", index=False)
+    pd.DataFrame([['B', 'WR', 'Y', 73, 190, 'n/a', 4.4]],
+                 columns=header).to_csv(tmp_path / "2031CombineData.csv", index=False)
+
+    data = NFLDataProcessor(str(tmp_path)).load_csv_files()
+    assert data['height'].tolist() == [74.0, 73.0]
+
+    processor = NFLDataProcessor(str(tmp_path))
+    processor.column_mappings['forty_yard'] = []
+    assert 'forty_yard' not in processor.load_csv_files().columns
+    assert 'forty_yard' in NFLDataProcessor(str(tmp_path)).load_csv_files().columns
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
+    print("🎉 Data processor tests passed!")
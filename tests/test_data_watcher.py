@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Tests for hot reloading the processed data
+"""
+
+import os
+import shutil
+
+import pandas as pd
+
+from src.data_processor import NFLDataProcessor
+from src.data_watcher import DataWatcher
+
+DATA_FILE = os.path.join("data", "processed_combine_data.csv")
+
+
+def test_watcher_swaps_in_rebuilt_state_once_the_change_settles(tmp_path):
+    """A changed data file is picked up on the second poll; references taken earlier keep the old data"""
+    data_file = str(tmp_path / "processed_combine_data.csv")
+    shutil.copy(DATA_FILE, data_file)
+    watcher = DataWatcher(data_file)
+    old_data, old_analyzer = watcher.current()
+    assert not watcher.check()
+
+    players = pd.read_csv(data_file)
+    players[players['position'] != 'QB'].to_csv(data_file, index=False)
+    assert not watcher.check()
+    assert watcher.check()
+    assert watcher.version == 1
+
+    new_data, new_analyzer = watcher.current()
+    assert 'QB' not in new_data.get_all_positions() and new_analyzer.player_data is new_data
+    assert 'QB' in old_data.get_all_positions() and old_analyzer.player_data is old_data
+    assert not watcher.check()
+
+
+def test_watcher_keeps_state_when_rebuild_fails(tmp_path):
+    """An unreadable data file leaves the current state in place"""
+    data_file = str(tmp_path / "processed_combine_data.csv")
+    shutil.copy(DATA_FILE, data_file)
+    watcher = DataWatcher(data_file)
+    state = watcher.current()
+
+    with open(data_file, 'w') as f:
+        f.write('')
+    watcher.check()
+    assert not watcher.check()
+    assert watcher.current() is state and watcher.version == 0
+
+    # Fixing the file brings the next rebuild
+    shutil.copy(DATA_FILE, data_file)
+    watcher.check()
+    assert watcher.check() and watcher.version == 1
+
+    watcher.start()
+    watcher.stop()
+    assert watcher._thread is None
+
+
+def test_watcher_sees_csv_edits_next_to_a_store(tmp_path):
+    """With a columnar store present, editing the processed CSV still triggers a reload"""
+    data_folder = tmp_path / "data"
+    data_folder.mkdir()
+    shutil.copy(os.path.join("data", "2025CombineData.csv"), data_folder / "2025CombineData.csv")
+    data_file = str(tmp_path / "processed_combine_data.csv")
+    processor = NFLDataProcessor(str(data_folder))
+    processor.load_csv_files()
+    processor.save_processed_data(data_file)
+    watcher = DataWatcher(data_file)
+    assert 'QB' in watcher.current()[0].get_all_positions()
+
+    players = pd.read_csv(data_file)
+    players[players['position'] != 'QB'].to_csv(data_file, index=False)
+    assert not watcher.check()
+    assert watcher.check()
+    assert 'QB' not in watcher.current()[0].get_all_positions()
+
+
+if __name__ == "__main__":
+    import pytest
+    pytest.main([__file__])
+    print("🎉 Data watcher tests passed!")
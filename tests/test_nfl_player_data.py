@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Tests for loading and looking up players in NFLPlayerData
+"""
+
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+from src.data_processor import NFLDataProcessor
+from src.nfl_player_data import NFLPlayerData
+
+DATA_FILE = os.path.join("data", "processed_combine_data.csv")
+
+
+def test_player_lookup_index():
+    """Indexed lookups return the same entries as scanning the players frame"""
+    player_data = NFLPlayerData(DATA_FILE)
+    # Lookups follow the load order, not the position partitions
+    players = player_data.players.sort_index()
+
+    for name in players['name'].iloc[::500].tolist() + ['Travis Hunter']:
+        scanned = players[players['name'] == name]
+        pd.testing.assert_series_equal(pd.Series(player_data.get_player_stats(name)), scanned.iloc[0],
+                                       check_names=False)
+        assert player_data.get_player_positions(name) == scanned['position'].unique().tolist()
+        pd.testing.assert_frame_equal(player_data.get_player_rows(name), scanned)
+
+    # Each position is one contiguous block of the table
+    for position in player_data.get_all_positions():
+        block = player_data.get_players_by_position(position)
+        pd.testing.assert_frame_equal(block, players[players['position'] == position])
+        assert player_data.players.index.get_indexer(block.index).tolist() == \
+            list(range(*player_data.position_slices[position].indices(len(players))))
+    assert player_data.get_player_names() == players['name'].tolist()
+    pd.testing.assert_frame_equal(player_data.players.iloc[player_data.rows_in_load_order()], players)
+
+    assert player_data.get_player_positions('Travis Hunter') == ['CB', 'WR']
+    assert player_data.get_player_rows('Travis Hunter', 'WR')['position'].tolist() == ['WR']
+    assert player_data.get_player_rows('Travis Hunter', 'QB').empty
+    assert player_data.get_player_stats('Nobody') is None
+
+
+def test_batch_lookups_match_single_lookups():
+    """Batch lookups return what the single-name accessors return, in request order"""
+    player_data = NFLPlayerData(DATA_FILE)
+    names = player_data.players['name'].iloc[::97].tolist() + ['Nobody', 'Travis Hunter', 'Travis Hunter']
+
+    batch = player_data.get_player_stats_batch(names)
+    assert batch['requested_name'].tolist() == names
+    for (_, row), name in zip(batch.iterrows(), names):
+        stats = player_data.get_player_stats(name)
+        if stats is None:
+            assert row.drop('requested_name').isna().all()
+        else:
+            pd.testing.assert_series_equal(row.drop('requested_name'), pd.Series(stats),
+                                           check_names=False, check_dtype=False)
+
+    positions = player_data.get_player_positions_batch(names)
+    assert positions == {name: player_data.get_player_positions(name) for name in names}
+
+    pairs = player_data.get_player_stats_batch(['Travis Hunter', 'Travis Hunter', 'Travis Hunter', 'Nobody'],
+                                               ['WR', None, 'QB', 'WR'])
+    assert pairs['requested_name'].tolist() == ['Travis Hunter'] * 3 + ['Nobody']
+    assert pairs['position'].tolist()[:2] == ['WR', 'CB'] and pairs['name'].iloc[2:].isna().all()
+    assert player_data.get_player_stats_batch([]).empty
+    with pytest.raises(ValueError):
+        player_data.get_player_stats_batch(['Travis Hunter'], [])
+
+
+def test_query_players_matches_frame_filter():
+    """Range queries return the same entries as filtering the players frame"""
+    player_data = NFLPlayerData(DATA_FILE)
+    players = player_data.players
+
+    def in_range(column, low, high, keep_missing):
+        return players[column].between(low, high) | (players[column].isna() & keep_missing)
+
+    for missing in ['include', 'exclude']:
+        keep_missing = missing == 'include'
+        result = player_data.query_players(ranges={'height': (70, 75), 'forty_yard': (4.5, 5.0)},
+                                           sort_by='forty_yard', ascending=False, missing=missing)
+        expected = players[in_range('height', 70, 75, keep_missing) & in_range('forty_yard', 4.5, 5.0, keep_missing)]
+        pd.testing.assert_frame_equal(
+            result, expected.sort_values('forty_yard', ascending=False, na_position='last', kind='stable'))
+        # Missing values sort last in both directions
+        assert not result['forty_yard'].iloc[:result['forty_yard'].notna().sum()].isna().any()
+
+    result = player_data.query_players(position='WR', draft_year=2024, ranges={'weight': (None, 190)},
+                                       missing='exclude')
+    expected = players[(players['position'] == 'WR') & (players['draft_year'] == 2024) & (players['weight'] <= 190)]
+    pd.testing.assert_frame_equal(result, expected)
+
+    assert player_data.query_players(position='QB', draft_year=1900).empty
+    with pytest.raises(ValueError):
+        player_data.query_players(missing='ignore')
+
+
+def test_dual_position_expansion_is_persisted(tmp_path, capsys):
+    """Dual positions explode into one entry each, and the expansion is reused until the data changes"""
+    data_file = str(tmp_path / "processed.csv")
+    pd.DataFrame({
+        'name': ['A', 'B', 'C', 'D'],
+        'position': ['QB', 'CB/WR', None, ' EDGE / LB'],
+        'weight': [220.0, 190.0, 200.0, 250.0],
+    }).to_csv(data_file, index=False)
+
+    players = NFLPlayerData(data_file, persist_expanded=True).players.sort_index()
+    assert players['name'].tolist() == ['A', 'B', 'B', 'C', 'D', 'D']
+    assert players['position'].tolist()[:3] == ['QB', 'CB', 'WR']
+    assert players['position'].tolist()[4:] == ['EDGE', 'LB']
+    assert players['original_position'].tolist()[:3] == ['QB', 'CB/WR', 'CB/WR']
+    assert players.index.tolist() == list(range(6))
+
+    capsys.readouterr()
+    player_data = NFLPlayerData(data_file, persist_expanded=True)
+    pd.testing.assert_frame_equal(player_data.players.sort_index(), players)
+    assert "Loading expanded data" in capsys.readouterr().out
+
+    # New processed data invalidates the persisted expansion, and a reload rebuilds the partitions
+    pd.read_csv(data_file).iloc[:1].to_csv(data_file, index=False)
+    player_data.reload()
+    assert len(player_data.players) == 1
+    assert player_data.get_all_positions() == ['QB']
+    assert player_data.get_player_stats('B') is None
+
+
+def test_store_is_ignored_once_the_csv_changes(tmp_path, capsys):
+    """The columnar store is only used while the processed CSV is the one it was written with"""
+    data_folder = tmp_path / "data"
+    data_folder.mkdir()
+    shutil.copy(os.path.join("data", "2025CombineData.csv"), data_folder / "2025CombineData.csv")
+    output_file = str(tmp_path / "processed.csv")
+    processor = NFLDataProcessor(str(data_folder))
+    processor.load_csv_files()
+    processor.save_processed_data(output_file)
+
+    capsys.readouterr()
+    stored = NFLPlayerData(output_file).players
+    assert "processed_columns" in capsys.readouterr().out
+    # Rewriting the same content (a copy or checkout) keeps the store
+    csv = pd.read_csv(output_file)
+    csv.to_csv(output_file, index=False)
+    NFLPlayerData(output_file)
+    assert "changed after" not in capsys.readouterr().out
+
+    csv[csv['position'] != 'QB'].to_csv(output_file, index=False)
+    players = NFLPlayerData(output_file).players
+    assert "changed after" in capsys.readouterr().out
+    assert len(players) < len(stored) and 'QB' not in set(players['position'])
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
+    print("🎉 Player data tests passed!")
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Tests for position-specific percentiles
+"""
+
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from src.nfl_player_data import NFLPlayerData
+from src.percentile_calculator import PercentileCalculator
+
+DATA_FILE = os.path.join("data", "processed_combine_data.csv")
+
+
+def _players():
+    return pd.DataFrame({
+        'name': ['A', 'B', 'C', 'D', 'E', 'F'],
+        'position': ['WR', 'WR', 'WR', 'WR', 'WR', 'QB'],
+        'height': [70.0, 72.0, 72.0, 75.0, np.nan, 76.0],
+        'forty_yard': [4.4, 4.5, 4.5, 4.6, 4.7, 4.9]
+    })
+
+
+def test_percentile_lookup_keeps_rank_ties_and_direction():
+    """Tied values share their average rank; lower-is-better metrics are inverted"""
+    calc = PercentileCalculator(_players())
+
+    # Heights 70, 72, 72, 75: ranks 1, 2.5, 2.5, 4 of 4
+    assert calc.percentile_of('WR', 'height', 72.0) == 62.5
+    assert calc.percentile_of('WR', 'height', [70.0, 75.0]).tolist() == [25.0, 100.0]
+    assert calc.percentile_of('WR', 'forty_yard', 4.4) == 100 - 20.0
+    assert calc.get_player_percentiles('B') == {'height': 62.5, 'forty_yard': 50.0}
+    assert calc.get_position_stats('WR')['height']['count'] == 4
+
+
+def test_percentile_lookup_of_values_not_in_the_data():
+    """Other values take the closest value's percentile, or interpolate between neighbors"""
+    calc = PercentileCalculator(_players())
+
+    assert calc.percentile_of('WR', 'height', 73.9) == 100.0
+    assert calc.percentile_of('WR', 'height', 73.0) == 62.5  # equally close: the lower value
+    assert calc.percentile_of('WR', 'height', 60.0) == 25.0
+    assert calc.percentile_of('WR', 'height', 73.5, interpolate=True) == 81.25
+    assert calc.percentile_of('WR', 'height', [60.0, 90.0], interpolate=True).tolist() == [25.0, 100.0]
+    assert calc.percentile_of('TE', 'height', 72.0) is None
+    assert calc.percentile_of('QB', 'bench_press', 20.0) is None
+
+
+def test_percentile_lookup_matches_closest_value_scan():
+    """Binary search agrees with scanning every value of the position for the closest one"""
+    player_data = NFLPlayerData(DATA_FILE)
+    calc = PercentileCalculator(player_data.get_player_store())
+    players = player_data.players
+
+    for position, metric in [('WR', 'forty_yard'), ('OT', 'bench_press'), ('CB', 'height'), ('QB', 'cone')]:
+        values = players.loc[players['position'] == position, metric].dropna()
+        ranks = values.rank(pct=True) * 100
+        if metric in calc.lower_is_better:
+            ranks = 100 - ranks
+        for value in values.iloc[::7]:
+            expected = ranks.to_numpy()[np.argmin(np.abs(values.to_numpy() - value))]
+            assert calc.percentile_of(position, metric, value) == expected
+
+
+def test_precomputed_entry_percentiles_match_per_position_ranks():
+    """Every entry's stored percentiles and RAS score match ranking its position's values directly"""
+    player_data = NFLPlayerData(DATA_FILE)
+    calc = PercentileCalculator(player_data.get_player_store())
+    players = player_data.players
+
+    for position, rows in player_data.position_slices.items():
+        block = players.iloc[rows]
+        for i, metric in enumerate(calc.combine_metrics):
+            ranks = block[metric].rank(pct=True) * 100
+            if metric in calc.lower_is_better:
+                ranks = 100 - ranks
+            np.testing.assert_array_equal(calc.entry_percentiles[rows, i], np.round(ranks.to_numpy(), 1))
+        for row in range(rows.start, rows.stop, 11):
+            assert calc.entry_ras[row] == calc._weighted_score(calc._entry_percentiles(row), position)
+
+    # A name shared by players at different positions reads the entry at the requested position
+    for name, position in [('Travis Hunter', 'WR'), ('Travis Hunter', 'CB')]:
+        row = players.index.get_loc(player_data.get_player_rows(name, position).index[0])
+        assert calc.get_player_percentiles(name, position) == calc._entry_percentiles(row)
+        assert calc.get_ras_score(name, position) == calc.entry_ras[row]
+    assert calc.get_player_percentiles('Nobody') == {} and calc.get_ras_score('Nobody') == 0.0
+    assert calc.get_ras_score('Travis Hunter', 'XX') == 0.0
+    # Without an entry at the position, the first entry is ranked there
+    assert calc.get_ras_score('Travis Hunter', 'K') == \
+        calc._weighted_score(calc.get_player_percentiles('Travis Hunter', 'K'), 'K') > 0
+
+
+def test_similar_percentile_players_match_pairwise_loop():
+    """The vectorized search ranks the same players as comparing the target with each entry in turn"""
+    player_data = NFLPlayerData(DATA_FILE)
+    calc = PercentileCalculator(player_data.get_player_store())
+    players = player_data.players
+
+    for name, position in [('Travis Hunter', 'WR'), ('Travis Hunter', 'CB'), (players['name'].iloc[4000], None)]:
+        target = calc.get_player_percentiles(name, position)
+        position = position or player_data.get_player_stats(name)['position']
+        rows = player_data.position_slices[position]
+        expected = []
+        for row in range(rows.start, rows.stop):
+            percentiles = calc._entry_percentiles(row)
+            shared = [metric for metric in calc.combine_metrics if metric in target and metric in percentiles]
+            if players['name'].iloc[row] == name or len(shared) < 2:
+                continue
+            diff = sum(abs(target[metric] - percentiles[metric]) for metric in shared) / len(shared)
+            expected.append((max(0, 100 - diff), players['name'].iloc[row], len(shared)))
+        expected.sort(key=lambda entry: entry[0], reverse=True)
+
+        found = calc.get_similar_percentile_players(name, position, num_similar=10)
+        assert [(player['name'], player['shared_metrics']) for player in found] == \
+            [(entry[1], entry[2]) for entry in expected[:10]]
+        np.testing.assert_allclose([player['similarity_score'] for player in found],
+                                   [entry[0] for entry in expected[:10]])
+
+    assert calc.get_similar_percentile_players('Travis Hunter', 'WR', num_similar=0) == []
+    assert calc.get_similar_percentile_players('Nobody') == []
+
+
+def test_era_window_percentiles_match_ranking_the_window():
+    """Percentiles within a draft year window match ranking only that window's entries"""
+    player_data = NFLPlayerData(DATA_FILE)
+    calc = PercentileCalculator(player_data.get_player_store())
+    players = player_data.players
+
+    for years, (first, last) in [((2015, 2025), (2015, 2025)), ((None, 2005), (-np.inf, 2005))]:
+        for position in ['WR', 'OT', 'QB']:
+            block = players[(players['position'] == position) & players['draft_year'].between(first, last)]
+            for metric in ['forty_yard', 'bench_press', 'height']:
+                ranks = block[metric].rank(pct=True) * 100
+                if metric in calc.lower_is_better:
+                    ranks = 100 - ranks
+                got = calc.percentile_of(position, metric, block[metric].dropna().to_numpy(), years=years)
+                np.testing.assert_array_equal(got, ranks.dropna().to_numpy())
+
+    # The whole range is the default ranking; other windows rank and compare within the era
+    assert calc.get_player_percentiles('Travis Kelce', 'TE', (None, None)) == calc.get_player_percentiles('Travis Kelce', 'TE')
+    assert calc.get_ras_score('Travis Kelce', 'TE', (None, None)) == calc.get_ras_score('Travis Kelce', 'TE')
+    similar = calc.get_similar_percentile_players('Travis Kelce', 'TE', num_similar=5, years=(2015, 2025))
+    assert len(similar) == 5 and all(2015 <= player['draft_year'] <= 2025 for player in similar)
+    for player in similar:
+        assert player['percentiles'] == calc.get_player_percentiles(player['name'], 'TE', (2015, 2025))
+    assert calc.percentile_of('QB', 'height', 75.0, years=(1990, 1995)) is None
+
+
+def test_evaluate_measurements_ranks_hypothetical_lines():
+    """Hypothetical measurements rank like an entry compared against another position"""
+    calc = PercentileCalculator(_players())
+
+    result = calc.evaluate_measurements({'height': 72.4, 'forty_yard': 4.45, 'cone': None, 'team': 'X'}, 'WR')
+    assert result['percentiles'] == {'height': 62.5, 'forty_yard': 80.0}
+    assert result['ras_score'] == round((62.5 * 1.1 + 80.0 * 1.5) / 2.6, 1)
+    assert calc.evaluate_measurements({'height': 72.0}, 'TE') == {'percentiles': {}, 'ras_score': 0.0}
+
+    # Batch lines score like single lines, each against its own position when none is given
+    grid = pd.DataFrame({'position': ['WR', 'QB', 'WR', 'TE'],
+                         'height': [72.4, 80.0, np.nan, 70.0],
+                         'forty_yard': [4.45, 4.5, 4.8, np.nan]}, index=[10, 11, 12, 13])
+    batch = calc.evaluate_measurements_batch(grid)
+    assert batch.index.tolist() == [10, 11, 12, 13]
+    for label, line in grid.iterrows():
+        single = calc.evaluate_measurements(line.to_dict(), line['position'])
+        scored = batch.loc[label]
+        assert {metric: scored[metric] for metric in calc.combine_metrics if not np.isnan(scored[metric])} == single['percentiles']
+        assert scored['ras_score'] == single['ras_score']
+    assert (calc.evaluate_measurements_batch(grid, 'WR')['height'].tolist()[:2]) == [62.5, 100.0]
+
+
+def test_lazy_calculator_builds_positions_on_first_use():
+    """A lazy calculator builds only the positions it is asked about, with the eager results"""
+    store = NFLPlayerData(DATA_FILE).get_player_store()
+    eager = PercentileCalculator(store)
+    lazy = PercentileCalculator(store, lazy=True)
+    assert not lazy.percentile_cache
+
+    assert lazy.get_player_percentiles('Travis Kelce', 'TE') == eager.get_player_percentiles('Travis Kelce', 'TE')
+    assert lazy.get_ras_score('Travis Kelce', 'TE') == eager.get_ras_score('Travis Kelce', 'TE')
+    assert lazy.percentile_of('WR', 'forty_yard', 4.4) == eager.percentile_of('WR', 'forty_yard', 4.4)
+    assert set(lazy.percentile_cache) == {'TE', 'WR'}
+    assert lazy.get_position_stats('XX') == {}
+
+    # A pickled partial build keeps what was built and builds the rest later
+    restored = pickle.loads(pickle.dumps(lazy))
+    assert set(restored.percentile_cache) == {'TE', 'WR'}
+    assert restored.get_similar_percentile_players('Caleb Williams', 'QB') == \
+        eager.get_similar_percentile_players('Caleb Williams', 'QB')
+
+    lazy.warm_up(background=True).join()
+    assert lazy.percentile_cache.keys() == eager.percentile_cache.keys()
+    np.testing.assert_array_equal(lazy.entry_percentiles, eager.entry_percentiles)
+    np.testing.assert_array_equal(lazy.entry_ras, eager.entry_ras)
+
+
+def test_adding_a_class_matches_full_rebuild():
+    """Adding a draft class incrementally gives exactly what building from the combined table gives"""
+    players = NFLPlayerData(DATA_FILE).players.sort_index()
+    history, new_class = players[players['draft_year'] < 2025], players[players['draft_year'] == 2025].copy()
+    # One position the history has never seen
+    new_class.loc[new_class.index[:2], 'position'] = 'KR'
+
+    calc = PercentileCalculator(history)
+    before = calc.get_player_percentiles('Travis Kelce', 'TE')
+    old_store, old_entries, old_cache, old_years = calc.store, calc.entry_percentiles, calc.percentile_cache, calc.year_counts
+    old_te = {metric: cache['values'] for metric, cache in old_cache['TE'].items()}
+    moved = calc.add_players(new_class)
+    rebuilt = PercentileCalculator(pd.concat([history, new_class]))
+
+    # The grown state is built aside and published in one step; the old one is left whole
+    assert calc.store is not old_store and len(old_entries) == len(old_store)
+    assert 'KR' not in old_cache and 'KR' not in old_years
+    assert all(old_cache['TE'][metric]['values'] is values for metric, values in old_te.items())
+
+    np.testing.assert_array_equal(calc.entry_percentiles, rebuilt.entry_percentiles)
+    np.testing.assert_array_equal(calc.entry_ras, rebuilt.entry_ras)
+    assert calc.position_slices == rebuilt.position_slices
+    assert calc.name_index.keys() == rebuilt.name_index.keys()
+    for name, rows in rebuilt.name_index.items():
+        np.testing.assert_array_equal(calc.name_index[name], rows)
+    for column in ['name', 'college', 'draft_year']:
+        np.testing.assert_array_equal(calc.store.identity_column(column), rebuilt.store.identity_column(column))
+    np.testing.assert_array_equal(calc.store.metrics, rebuilt.store.metrics)
+    for position, metrics in rebuilt.percentile_cache.items():
+        assert calc.percentile_cache[position].keys() == metrics.keys()
+        for metric, cache in metrics.items():
+            for key, value in cache.items():
+                np.testing.assert_array_equal(calc.percentile_cache[position][metric][key], value)
+    for position, counts in rebuilt.year_counts.items():
+        np.testing.assert_array_equal(calc.year_counts[position]['years'], counts['years'])
+        for metric, cumulative in counts['cumulative'].items():
+            np.testing.assert_array_equal(calc.year_counts[position]['cumulative'][metric], cumulative)
+
+    # Moves are reported for existing entries only, with their old and new percentiles
+    kelce = moved[(moved['name'] == 'Travis Kelce') & (moved['position'] == 'TE')].set_index('metric')
+    after = calc.get_player_percentiles('Travis Kelce', 'TE')
+    assert not kelce.empty
+    for metric, row in kelce.iterrows():
+        assert (row['old_percentile'], row['new_percentile']) == (before[metric], after[metric])
+    assert {metric for metric in after if after[metric] != before[metric]} == set(kelce.index)
+    assert not moved['name'].isin(set(new_class['name']) - set(history['name'])).any()
+    assert moved['position'].isin(set(new_class['position'])).all()
+
+
+if __name__ == "__main__":
+    import pytest
+    pytest.main([__file__])
+    print("🎉 Percentile calculator tests passed!")
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Tests for the player name search index
+"""
+
+import os
+
+import numpy as np
+
+from src.player_search import PlayerSearchIndex, normalize_name, prefix_edit_distances
+from src.nfl_player_data import NFLPlayerData
+
+DATA_FILE = os.path.join("data", "processed_combine_data.csv")
+
+
+def test_search_ranks_prefix_matches_then_recency():
+    """Names starting with the query come first, each group newest class first"""
+    index = PlayerSearchIndex(
+        ['Mike Williams', 'Williams Jr.', 'Will Smith', 'Tyler Williams', 'Bill Wills'],
+        [2017, 2001, 2024, 2010, 2015])
+
+    assert index.search('will') == ['Will Smith', 'Williams Jr.', 'Mike Williams', 'Bill Wills', 'Tyler Williams']
+    assert index.search('  WILLIAMS ', limit=2) == ['Williams Jr.', 'Mike Williams']
+    assert index.search('ams j') == ['Williams Jr.']
+    assert index.search('xyz') == []
+    assert index.search('') == []
+
+
+def test_search_matches_substring_scan():
+    """Every query returns the same matches as a case-insensitive substring scan, up to the limit"""
+    player_data = NFLPlayerData(DATA_FILE)
+    names = sorted(set(player_data.get_player_names()))
+
+    for query in ['a', 'jo', "d'", 'wil', 'smith', 'son j', 'mike w', 'q', 'zz']:
+        expected = [name for name in names if query in name.lower()]
+        found = player_data.search_players(query, limit=50)
+        assert len(found) == len(set(found)) == min(50, len(expected))
+        assert set(found) <= set(expected)
+
+    assert player_data.search_players('travis hu', limit=5) == ['Travis Hunter']
+    assert player_data.search_players('', limit=3) == names[:3]
+
+
+def _edit_distance(a, b):
+    """Plain Levenshtein distance"""
+    row = list(range(len(b) + 1))
+    for i, char in enumerate(a, 1):
+        previous, row[0] = row[0], i
+        for j in range(1, len(b) + 1):
+            previous, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, previous + (char != b[j - 1]))
+    return row[-1]
+
+
+def test_prefix_edit_distances_match_levenshtein():
+    """The vectorized distance is the best Levenshtein distance over the name and its prefixes"""
+    names = ['jamarr chase', 'caleb williams', 'aj brown', 'a', '']
+    lengths = np.array([len(name) for name in names])
+    chars = np.zeros((len(names), lengths.max()), dtype=np.uint8)
+    for i, name in enumerate(names):
+        chars[i, :len(name)] = np.frombuffer(name.encode('ascii'), dtype=np.uint8)
+
+    for query in ['jamar chase', 'calab', 'ajbrown', 'x', 'williams']:
+        expected = [min(_edit_distance(query, name[:end]) for end in range(len(name) + 1)) for name in names]
+        assert prefix_edit_distances(query.encode('ascii'), chars, lengths).tolist() == expected
+
+
+def test_fuzzy_search_tolerates_typos_and_punctuation():
+    """Misspelled and unpunctuated queries find the player, closest first"""
+    player_data = NFLPlayerData(DATA_FILE)
+
+    assert normalize_name("  Ja'Marr  Chase-Jr. ") == 'jamarr chase jr'
+    assert player_data.fuzzy_search_players('Jamar Chase')[0] == "Ja'Marr Chase"
+    assert player_data.fuzzy_search_players('Calab Wiliams')[0] == 'Caleb Williams'
+    assert player_data.fuzzy_search_players('aj brown')[0] == 'A.J. Brown'
+    assert player_data.fuzzy_search_players('Travs Huntr', limit=1) == ['Travis Hunter']
+    assert player_data.fuzzy_search_players('qqqqqq') == []
+    assert player_data.fuzzy_search_players('') == []
+
+
+def test_fuzzy_search_matches_brute_force():
+    """The trigram filter never drops a name within the edit budget"""
+    index = NFLPlayerData(DATA_FILE)._get_search_index()
+
+    for query, budget in [('jamar chase', 2), ('smth', 1), ('brwn', 1), ('mike wiliams', 2), ('devonta smith', 3)]:
+        distances = {name: min(_edit_distance(query, normalized[:end]) for end in range(len(normalized) + 1))
+                     for name, normalized in zip(index.names, index.normalized_names)}
+        expected = sorted((name for name in index.names if distances[name] <= budget),
+                          key=lambda name: (distances[name], index.names.index(name)))
+        assert index.fuzzy_search(query, limit=len(index), max_distance=budget) == expected
+
+
+if __name__ == "__main__":
+    import pytest
+    pytest.main([__file__])
+    print("🎉 Player search tests passed!")
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Tests for the array-backed player store
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.nfl_player_data import NFLPlayerData
+from src.percentile_calculator import PercentileCalculator
+from src.player_similarity import PlayerSimilarityAnalyzer
+from src.player_store import PlayerStore
+
+DATA_FILE = os.path.join("data", "processed_combine_data.csv")
+
+
+def test_player_views_match_table_rows():
+    """Every view reads back its table row, and lookups follow the name and position indexes"""
+    player_data = NFLPlayerData(DATA_FILE)
+    store = player_data.get_player_store()
+    players = player_data.players
+
+    assert len(store) == len(players)
+    assert store.metrics.dtype == np.float64 and store.metrics.flags['C_CONTIGUOUS']
+    for row in range(0, len(players), 250):
+        pd.testing.assert_series_equal(pd.Series(store.player(row).to_dict()), players.iloc[row],
+                                       check_names=False)
+    for column in ['name', 'college', 'draft_year']:
+        pd.testing.assert_series_equal(pd.Series(store.identity_column(column)), players[column],
+                                       check_names=False, check_index=False, check_dtype=False)
+
+    hunter = player_data.get_player('Travis Hunter', 'WR')
+    assert hunter['position'] == 'WR' and hunter.get('missing column', 'N/A') == 'N/A'
+    assert 'shuttle' in hunter and 'missing column' not in hunter
+    assert player_data.get_player('Travis Hunter')['position'] == 'CB'
+    assert player_data.get_player('Travis Hunter', 'QB') is None
+    assert player_data.get_player('Nobody') is None
+
+
+def test_percentiles_from_store_match_table():
+    """Calculators built on a store or a table rank the table's float64 values, as pandas does"""
+    player_data = NFLPlayerData(DATA_FILE)
+    players = player_data.players
+    store = PlayerStore(players, player_data.position_slices, player_data.name_index)
+    from_store = PercentileCalculator(store)
+    from_table = PercentileCalculator(players.sort_index())
+
+    assert store.metrics.dtype == np.float64
+    for calc in [from_store, from_table]:
+        assert calc.get_position_stats('WR')['forty_yard']['min'] == players.loc[players['position'] == 'WR', 'forty_yard'].min()
+        assert calc.get_player_percentiles('Tim Hasselbeck', 'WR')['forty_yard'] == 0.0
+
+    for name in players['name'].iloc[::300].tolist() + ['Travis Hunter']:
+        for position in player_data.get_player_positions(name):
+            block = players[players['position'] == position]
+            entry = player_data.get_player_rows(name, position).index[0]
+            expected = {}
+            for metric in from_store.combine_metrics:
+                ranks = block[metric].rank(pct=True) * 100
+                if metric in from_store.lower_is_better:
+                    ranks = 100 - ranks
+                if not pd.isna(ranks[entry]):
+                    expected[metric] = round(ranks[entry], 1)
+            assert from_store.get_player_percentiles(name, position) == expected
+            assert from_table.get_player_percentiles(name, position) == expected
+            assert from_store.get_ras_score(name, position) == from_table.get_ras_score(name, position)
+
+    # The compact schema's float32 measurements stay float32
+    compact = players.astype({metric: np.float32 for metric in store.metric_names})
+    assert PlayerStore(compact, player_data.position_slices, player_data.name_index).metrics.dtype == np.float32
+
+
+def test_similar_players_come_from_store_rows():
+    """Similarity candidates are read from the store: same position, target excluded, era kept"""
+    player_data = NFLPlayerData(DATA_FILE)
+    analyzer = PlayerSimilarityAnalyzer(player_data)
+
+    similar = analyzer.find_similar_players('Travis Hunter', num_similar=5, position='WR', years=(2015, 2020))
+    assert len(similar) == 5
+    assert [player['similarity_score'] for player in similar] == sorted(
+        (player['similarity_score'] for player in similar), reverse=True)
+    for player in similar:
+        assert player['position'] == 'WR' and player['name'] != 'Travis Hunter'
+        assert 2015 <= int(player['draft_year']) <= 2020
+        row = player_data.get_player_rows(player['name'], 'WR').iloc[0]
+        assert player['stats'] == pytest.approx({stat: row[stat] for stat in player['stats']}, nan_ok=True)
+
+    assert analyzer.find_similar_players('Nobody') == []
+    assert analyzer.find_similar_players('Travis Hunter', position='QB') == []
+
+def test_cross_position_ties_keep_load_order(tmp_path):
+    """Cross-position scans rank tied players in file order, not in the position partitions' order"""
+    data_file = str(tmp_path / "processed.csv")
+    pd.DataFrame({
+        'name': ['Target', 'A', 'B', 'C', 'D'],
+        'position': ['QB', 'WR', 'QB', 'CB', 'DT'],
+        'college': ['X'] * 5,
+        'draft_year': [2020] * 5,
+        'height': [72.0, 72.0, 72.0, 72.0, 78.0],
+        'weight': [200.0, 200.0, 200.0, 200.0, 300.0],
+        **{stat: [np.nan] * 5 for stat in ['forty_yard', 'vertical_jump', 'broad_jump',
+                                           'bench_press', 'shuttle', 'cone']},
+    }).to_csv(data_file, index=False)
+    player_data = NFLPlayerData(data_file)
+    assert player_data.players['name'].tolist() != ['Target', 'A', 'B', 'C', 'D']
+
+    similar = PlayerSimilarityAnalyzer(player_data).find_similar_players('Target', num_similar=4,
+                                                                         same_position_only=False)
+    assert [player['name'] for player in similar] == ['A', 'B', 'C', 'D']
+    assert similar[0]['similarity_score'] == similar[1]['similarity_score'] == similar[2]['similarity_score']
+
+
+
+def test_identity_column_of_an_all_missing_text_column():
+    """A text column with no values at all decodes to NaN rather than indexing an empty dictionary"""
+    players = pd.DataFrame({'name': ['A', 'B'], 'position': ['QB', 'WR'],
+                            'college': pd.Series([None, None], dtype=object), 'height': [72.0, 74.0]})
+    store = PlayerStore(players, {'QB': slice(0, 1), 'WR': slice(1, 2)},
+                        {'A': np.array([0]), 'B': np.array([1])})
+
+    assert pd.isna(store.identity_column('college')).all()
+    assert len(store.identity_column('college', slice(1, 2))) == 1
+    assert pd.isna(store.identity_value('college', 0))
+
+if __name__ == "__main__":
+    pytest.main([__file__])
+    print("🎉 Player store tests passed!")
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Tests for the startup snapshot
+"""
+
+import os
+import shutil
+
+import pandas as pd
+
+from src.snapshot import load_app_state, snapshot_path_for
+
+DATA_FILE = os.path.join("data", "processed_combine_data.csv")
+
+
+def test_snapshot_is_reused_until_the_data_changes(tmp_path, capsys):
+    """The second start loads the snapshot; touching the data keeps it, editing the data rebuilds it"""
+    data_file = str(tmp_path / "processed_combine_data.csv")
+    shutil.copy(DATA_FILE, data_file)
+
+    built_data, built_analyzer = load_app_state(data_file)
+    assert os.path.exists(snapshot_path_for(data_file))
+    capsys.readouterr()
+
+    player_data, analyzer = load_app_state(data_file)
+    assert "Loaded snapshot" in capsys.readouterr().out
+    pd.testing.assert_frame_equal(player_data.players, built_data.players)
+    assert player_data.search_players('travis hu') == ['Travis Hunter']
+    assert analyzer.get_player_percentiles('Travis Hunter', 'WR') == \
+        built_analyzer.get_player_percentiles('Travis Hunter', 'WR')
+    assert analyzer.percentile_calc.store is player_data.get_player_store()
+
+    # Same content with a new mtime is still current
+    os.utime(data_file, ns=(0, 0))
+    load_app_state(data_file)
+    assert "Loaded snapshot" in capsys.readouterr().out
+
+    players = pd.read_csv(data_file)
+    players.iloc[:-1].to_csv(data_file, index=False)
+    player_data, _ = load_app_state(data_file)
+    assert "Loaded snapshot" not in capsys.readouterr().out
+    assert len(player_data.players) == len(built_data.players) - 1
+
+    # Other load options get their own build
+    player_data, _ = load_app_state(data_file, compact=True)
+    assert "Loaded snapshot" not in capsys.readouterr().out
+    assert player_data.compact
+
+
+if __name__ == "__main__":
+    import pytest
+    pytest.main([__file__])
+    print("🎉 Snapshot tests passed!")